@@ -1,7 +1,7 @@
 import numpy as np
 import scipy
+import scipy.fftpack
 import scipy.ndimage
-from tqdm import tqdm_notebook
 
 import xarray as xr
 from arpes.fits.fit_models import gaussian
@@ -9,7 +9,7 @@ from arpes.provenance import update_provenance
 from arpes.typing import DataType
 from arpes.utilities import normalize_to_spectrum
 
-__all__ = ('deconvolve_ice', 'deconvolve_rl', 'make_psf1d',)
+__all__ = ('deconvolve_ice', 'deconvolve_rl', 'make_psf1d', 'make_psf',)
 
 
 @update_provenance('Approximate Iterative Deconvolution')
@@ -53,18 +53,123 @@ def deconvolve_ice(data: DataType, psf, n_iterations=5, deg=None):
     return result
 
 
+# boundary modes of scipy.ndimage.convolve, and the np.pad modes which extend data in the same way
+_PAD_MODES = {
+    'reflect': 'symmetric',
+    'mirror': 'reflect',
+    'nearest': 'edge',
+    'wrap': 'wrap',
+    'constant': 'constant',
+}
+
+
+class _FFTConvolver:
+    """
+    Convolves arrays of a fixed shape with a fixed kernel along some of their axes, giving the same result as
+    `scipy.ndimage.convolve` with the same boundary mode. The data is extended past its boundaries by the
+    size of the kernel before convolving with FFTs, and the transformed kernel is reused between calls.
+    """
+    def __init__(self, shape, kernel: np.ndarray, axes, mode='reflect'):
+        if mode not in _PAD_MODES:
+            raise ValueError('Unsupported boundary mode {}, use one of {}'.format(mode, list(_PAD_MODES)))
+
+        self.axes = tuple(axes)
+        self.mode = _PAD_MODES[mode]
+        self.pad_width = [(0, 0)] * len(shape)
+        self.window = [slice(None)] * len(shape)
+
+        kernel_shape = [1] * len(shape)
+        for axis, size in zip(self.axes, kernel.shape):
+            kernel_shape[axis] = size
+            self.pad_width[axis] = (size, size)
+            self.window[axis] = slice(size + size // 2, size + size // 2 + shape[axis])
+
+        self.window = tuple(self.window)
+        self.fft_shape = [scipy.fftpack.next_fast_len(shape[axis] + 3 * size - 1)
+                          for axis, size in zip(self.axes, kernel.shape)]
+        self.kernel_fft = np.fft.rfftn(kernel.reshape(kernel_shape), s=self.fft_shape, axes=self.axes)
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        padded = np.pad(values, self.pad_width, mode=self.mode)
+        transformed = np.fft.rfftn(padded, s=self.fft_shape, axes=self.axes)
+        transformed *= self.kernel_fft
+        return np.fft.irfftn(transformed, s=self.fft_shape, axes=self.axes)[self.window]
+
+
+def _richardson_lucy(values: np.ndarray, kernel: np.ndarray, axes, n_iterations: int, mode='reflect') -> np.ndarray:
+    """
+    Richardson-Lucy iterations for all of `values` at once, convolving along `axes` only.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    convolve = _FFTConvolver(values.shape, kernel, axes, mode)
+    correlate = _FFTConvolver(values.shape, np.flip(kernel, tuple(range(kernel.ndim))), axes, mode)
+
+    estimate = values.copy()
+    ratio = np.empty_like(estimate)
+    for _ in range(n_iterations):
+        np.divide(values, convolve(estimate), out=ratio)
+        estimate *= correlate(ratio)
+
+    return estimate
+
+
+def _psf_kernel(psf, dims, ndim, axis=None):
+    """
+    Determines the axes of the data a point spread function applies along, and the kernel over those axes, which
+    have to be in increasing order.
+    :param psf: A 1D psf, a dict of 1D psfs for a separable psf, or a psf with the dimension of the data
+    :param dims: The dimension names of the data, if it has any
+    :param ndim:
+    :param axis: Name or index of the axis 1D psfs of multidimensional data apply along
+    :return: (kernel, axes)
+    """
+    def axis_index(name):
+        return name if isinstance(name, int) else list(dims).index(name)
+
+    if isinstance(psf, dict):
+        factors = sorted((axis_index(name), np.asarray(factor, dtype=np.float64)) for name, factor in psf.items())
+        kernel = factors[0][1]
+        for _, factor in factors[1:]:
+            kernel = np.multiply.outer(kernel, factor)
+
+        return kernel, [a for a, _ in factors]
+
+    if isinstance(psf, xr.DataArray) and (psf.ndim > 1 or ndim > 1):
+        if psf.ndim == 1 and axis is not None:
+            return psf.values.astype(np.float64), [axis_index(axis)]
+
+        axes = [axis_index(d) for d in psf.dims]
+        order = np.argsort(axes)
+        return psf.transpose(*[psf.dims[i] for i in order]).values.astype(np.float64), sorted(axes)
+
+    kernel = np.asarray(psf, dtype=np.float64)
+    if kernel.ndim == ndim:
+        return kernel, list(range(ndim))
+
+    if kernel.ndim == 1 and axis is not None:
+        return kernel, [axis_index(axis)]
+
+    raise ValueError('Provide the axis a one dimensional point spread function should be applied along, '
+                     'or a point spread function with the dimension of the data.')
+
+
 @update_provenance('Lucy Richardson Deconvolution')
 def deconvolve_rl(data: DataType, psf=None, n_iterations=10, axis=None,
                   sigma=None, mode='reflect', progress=True):
     """Deconvolves data by a given point spread function using the Richardson-Lucy method.
 
+    The point spread function can be one dimensional, in which case every one dimensional slice of the data along
+    `axis` is deconvolved, a dictionary of one dimensional point spread functions for each of several dimensions
+    when the point spread function is separable, or have the dimension of the data. All slices are deconvolved
+    at once using FFT convolutions, with the boundary handling of `scipy.ndimage.convolve`.
+
     :param data:
     :param psf -- for 1d, if not specified, must specify axis and sigma:
     :param n_iterations -- the number of convolutions to use for the fit (default 50):
     :param axis:
     :param sigma:
     :param mode:
-    :param progress:
+    :param progress -- unused, kept for compatibility:
     :return DataArray or numpy.ndarray -- based on input type:
     """
 
@@ -75,99 +180,15 @@ def deconvolve_rl(data: DataType, psf=None, n_iterations=10, axis=None,
         # note: this assumes gaussian psf
         psf = make_psf1d(data=arr, dim=axis, sigma=sigma)
 
-    if len(data.dims) > 1:
-        if axis is not None:
-            # perform one-dimensional deconvolution of multidimensional data
-
-            # support for progress bars
-            wrap_progress = lambda x, *args, **kwargs: x
-            if progress:
-                wrap_progress = tqdm_notebook
-
-            # dimensions over which to iterate
-            other_dim = list(data.dims)
-            other_dim.remove(axis)
-
-            if len(other_dim) == 1:
-                # two-dimensional data
-                other_dim = other_dim[0]
-                result = arr.copy(deep=True).transpose(other_dim,
-                                                       axis)  # not sure why the dims only seems to work in this order. seems like I should be able to swap it to (axis,other_dim) and also change the data collection to result[x_ind,y_ind], but this gave different results
-
-                for i, (od, iteration) in wrap_progress(enumerate(arr.T.iterate_axis(other_dim)),
-                                                        desc="Iterating " + other_dim,
-                                                        total=len(arr[other_dim])):  # TODO tidy this gross-looking loop
-                    # indices of data being deconvolved
-                    x_ind = xr.DataArray(list(range(len(arr[axis]))), dims=[axis])
-                    y_ind = xr.DataArray([i] * len(x_ind), dims=[other_dim])
-                    # perform deconvolution on this one-dimensional piece
-                    deconv = deconvolve_rl(data=iteration, psf=psf, n_iterations=n_iterations, axis=None, mode=mode)
-                    # build results out of these pieces
-                    result[y_ind, x_ind] = deconv.values
-            elif len(other_dim) == 2:
-                # three-dimensional data
-                result = arr.copy(deep=True).transpose(*other_dim,
-                                                       axis)  # not sure why the dims only seems to work in this order. seems like I should be able to swap it to (axis,*other_dim) and also change the data collection to result[x_ind,y_ind,z_ind], but this gave different results
-                for i, (od0, iteration0) in wrap_progress(enumerate(arr.T.iterate_axis(other_dim[0])),
-                                                          desc="Iterating " + other_dim[0], total=len(
-                                arr[other_dim[0]])):  # TODO tidy this gross-looking loop
-                    for j, (od1, iteration1) in wrap_progress(enumerate(iteration0.T.iterate_axis(other_dim[1])),
-                                                              desc="Iterating " + other_dim[1],
-                                                              total=len(arr[other_dim[1]]),
-                                                              leave=False):  # TODO tidy this gross-looking loop
-                        # indices of data being deconvolved
-                        x_ind = xr.DataArray(list(range(len(arr[axis]))), dims=[axis])
-                        y_ind = xr.DataArray([i] * len(x_ind), dims=[other_dim[0]])
-                        z_ind = xr.DataArray([j] * len(x_ind), dims=[other_dim[1]])
-                        # perform deconvolution on this one-dimensional piece
-                        deconv = deconvolve_rl(data=iteration1, psf=psf, n_iterations=n_iterations, axis=None,
-                                               mode=mode)
-                        # build results out of these pieces
-                        result[y_ind, z_ind, x_ind] = deconv.values
-            elif len(other_dim) >= 3:
-                # four- or higher-dimensional data
-                # TODO find way to compactify the different dimensionalities rather than having separate code
-                raise NotImplementedError("high-dimensional data not yet supported")
-
-        elif axis is None:
-            # crude attempt to perform multidimensional deconvolution. not clear if this is currently working
-            # TODO may be able to do this as a sequence of one-dimensional deconvolutions, assuming that the psf is separable (which I think it should be, if we assume it is a multivariate gaussian with principle axes aligned with the dimensions)
-            raise NotImplementedError("multi-dimensional convolutions not yet supported")
-
-            if not isinstance(arr, np.ndarray):
-                arr = arr.values
-
-            u = [arr]
-
-            for i in range(n_iterations):
-                c = scipy.ndimage.convolve(u[-1], psf, mode=mode)
-                u.append(u[-1] * scipy.ndimage.convolve(arr / c, np.flip(psf, None),
-                                                        mode=mode))  # careful about which axis (axes) to flip here...! need to explicitly specify for some versions of numpy
-
-            result = u[-1]
-    else:
-        if type(arr) is not np.ndarray:
-            arr = arr.values
-
-        u = [arr]
+    values = arr if isinstance(arr, np.ndarray) else arr.values
+    kernel, axes = _psf_kernel(psf, getattr(arr, 'dims', None), values.ndim, axis)
+    deconvolved = _richardson_lucy(values, kernel, axes, n_iterations, mode=mode)
 
-        for i in range(n_iterations):
-            c = scipy.ndimage.convolve(u[-1], psf, mode=mode)
-            u.append(u[-1] * scipy.ndimage.convolve(arr / c, np.flip(psf, 0),
-                                                    mode=mode))  # not yet tested to ensure flip correct for asymmetric psf
-            # note: need to explicitly specify axis number in np.flip in lower versions of numpy
-
-        if type(data) is np.ndarray:
-            result = u[-1].copy()
-        else:
-            result = normalize_to_spectrum(data).copy(deep=True)
-            result.values = u[-1]
-
-    try:
-        result = result.transpose(*arr.dims)
-    except:
-        pass
+    if isinstance(data, np.ndarray):
+        return deconvolved
 
+    result = arr.copy(deep=True)
+    result.values = deconvolved
     return result
 
 
@@ -199,16 +220,13 @@ def make_psf1d(data: DataType, dim, sigma):
 
 @update_provenance('Make Point Spread Function')
 def make_psf(data: DataType, sigmas):
-    """Not yet operational; produces an n-dimensional gaussian point spread function for use in deconvolve_rl.
+    """Produces an n-dimensional gaussian point spread function for use in deconvolve_rl.
 
     :param data:
-    :param dim:
-    :param sigma:
+    :param sigmas: The width of the gaussian along each dimension, a width of zero leaves the dimension unbroadened
     :return DataArray:
     """
 
-    raise NotImplementedError()
-
     arr = normalize_to_spectrum(data)
     dims = arr.dims
 
@@ -226,7 +244,7 @@ def make_psf(data: DataType, sigmas):
             # TODO may need to do subpixel correction for when the dimension has an even length
             psf1d = psf1d * 0
             # psf1d[{dim:np.mean(psf1d.coords[dim])}] = 1
-            psf1d[{dim: len(psf1d.coords[dim]) / 2}] = 1
+            psf1d[{dim: len(psf1d.coords[dim]) // 2}] = 1
         else:
             psf1d = psf1d * gaussian(psf1d.coords[dim], np.mean(psf1d.coords[dim]), sigmas[dim])
 
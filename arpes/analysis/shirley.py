@@ -25,6 +25,48 @@ def remove_shirley_background(xps: DataType, **kwargs):
     return xps - calculate_shirley_background(xps, **kwargs)
 
 
+def _shirley_backgrounds(spectra: np.ndarray, eps=1e-7, max_iters=50, n_samples=5):
+    """
+    Iterates Shirley backgrounds for a stack of spectra along the last axis of `spectra` at once. Each spectrum
+    stops being updated once its own background has converged.
+    :return: The backgrounds, the number of iterations each took, and their final relative errors
+    """
+    cumulative_xps = np.cumsum(spectra, axis=-1)
+    total_xps = cumulative_xps[..., -1:]
+
+    i_left = np.mean(spectra[..., :n_samples], axis=-1, keepdims=True)
+    i_right = np.mean(spectra[..., -n_samples:], axis=-1, keepdims=True)
+    k = i_left - i_right
+
+    background = np.array(spectra, dtype=np.float64)
+    rel_error = np.full(spectra.shape[0], np.inf)
+    iterations = np.zeros(spectra.shape[0], dtype=int)
+    active = np.arange(spectra.shape[0])
+
+    for _ in range(max_iters):
+        current = background[active]
+        cumulative_background = np.cumsum(current, axis=-1)
+        total_background = cumulative_background[..., -1:]
+
+        new_background = i_right[active] + k[active] * (
+            (total_xps[active] - cumulative_xps[active] - (total_background - cumulative_background)) /
+            (total_xps[active] - total_background + 1e-5)
+        )
+
+        error = (np.abs(np.sum(new_background, axis=-1) - total_background[..., 0]) /
+                 total_background[..., 0])
+
+        background[active] = new_background
+        rel_error[active] = error
+        iterations[active] += 1
+
+        active = active[~(error < eps)]
+        if not len(active):
+            break
+
+    return background, iterations, rel_error
+
+
 @update_provenance('Calculate full range Shirley background')
 def calculate_shirley_background_full_range(xps: DataType, eps=1e-7, max_iters=50, n_samples=5):
     """
@@ -43,46 +85,31 @@ def calculate_shirley_background_full_range(xps: DataType, eps=1e-7, max_iters=5
 
     In practice, what we can do is to calculate the cumulative sum of the data along the energy axis of
     both the data and the current estimate of the background
+
+    Data with dimensions besides `eV`, such as a spatial map or a series of spectra along `hv`, is treated as a
+    collection of spectra. A background is calculated for each, and convergence is tracked separately for each.
     :param xps:
     :param eps:
     :return:
     """
 
     xps = normalize_to_spectrum(xps)
-    background = xps.copy(deep=True)
-    cumulative_xps = np.cumsum(xps.values)
-    total_xps = np.sum(xps.values)
-
-    rel_error = np.inf
-
-    i_left = np.mean(xps.values[:n_samples])
-    i_right = np.mean(xps.values[-n_samples:])
-
-    iter_count = 0
-
-    k = i_left - i_right
-    for iter_count in range(max_iters):
-        cumulative_background = np.cumsum(background.values)
-        total_background = np.sum(background.values)
+    energy_axis = xps.dims.index('eV')
 
-        new_bkg = background.copy(deep=True)
+    spectra = np.moveaxis(xps.values, energy_axis, -1)
+    stacked_shape = spectra.shape
+    spectra = spectra.reshape(-1, stacked_shape[-1])
 
-        for i in range(len(new_bkg)):
-            new_bkg.values[i] = i_right + k * (
-                (total_xps - cumulative_xps[i] - (total_background - cumulative_background[i])) / (total_xps - total_background + 1e-5)
-            )
+    backgrounds, iterations, rel_error = _shirley_backgrounds(spectra, eps, max_iters, n_samples)
 
-        rel_error = np.abs(np.sum(new_bkg.values) - total_background) / (total_background)
-
-        background = new_bkg
-
-        if rel_error < eps:
-            break
-
-    if (iter_count + 1) == max_iters:
+    unconverged = ~(rel_error < eps)
+    if np.any(unconverged):
         warnings.warn('Shirley background calculation did not converge ' +
-                      'after {} steps with relative error {}!'.format(max_iters, rel_error))
+                      'after {} steps for {} of {} spectra with relative error {}!'.format(
+                          max_iters, np.sum(unconverged), len(spectra), np.max(rel_error[unconverged])))
 
+    background = xps.copy(deep=True)
+    background.values = np.moveaxis(backgrounds.reshape(stacked_shape), -1, energy_axis)
     return background
 
 
@@ -102,14 +129,18 @@ def calculate_shirley_background(xps: DataType, energy_range: slice=None, eps=1e
     xps = normalize_to_spectrum(xps)
     xps_for_calc = xps.sel(eV=energy_range)
 
-    bkg = calculate_shirley_background_full_range(xps_for_calc, eps, max_iters)
+    bkg = calculate_shirley_background_full_range(xps_for_calc, eps, max_iters, n_samples)
     full_bkg = xps * 0
 
     left_idx = np.searchsorted(full_bkg.eV.values, bkg.eV.values[0], side='left')
-    right_idx = left_idx + len(bkg)
+    right_idx = left_idx + len(bkg.eV)
+
+    energy_axis = full_bkg.dims.index('eV')
+    full_values = np.moveaxis(full_bkg.values, energy_axis, -1)
+    bkg_values = np.moveaxis(bkg.transpose(*full_bkg.dims).values, energy_axis, -1)
 
-    full_bkg.values[:left_idx] = bkg.values[0]
-    full_bkg.values[left_idx:right_idx] = bkg.values
-    full_bkg.values[right_idx:] = bkg.values[-1]
+    full_values[..., :left_idx] = bkg_values[..., :1]
+    full_values[..., left_idx:right_idx] = bkg_values
+    full_values[..., right_idx:] = bkg_values[..., -1:]
 
     return full_bkg
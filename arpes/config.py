@@ -10,14 +10,35 @@ between different projects.
 import json
 import logging
 import os.path
-import pint
 
 from pathlib import Path
 from typing import Any, Optional
 
 from arpes.exceptions import ConfigurationError
 
-ureg = pint.UnitRegistry()
+
+class _LazyUnitRegistry:
+    """
+    Builds the pint unit registry the first time it is used, as building it takes a large share of the time
+    to import PyARPES.
+    """
+    _registry = None
+
+    def _get_registry(self):
+        if _LazyUnitRegistry._registry is None:
+            import pint
+            _LazyUnitRegistry._registry = pint.UnitRegistry()
+
+        return _LazyUnitRegistry._registry
+
+    def __getattr__(self, item):
+        return getattr(self._get_registry(), item)
+
+    def __call__(self, *args, **kwargs):
+        return self._get_registry()(*args, **kwargs)
+
+
+ureg = _LazyUnitRegistry()
 
 # ARPES_ROOT SHOULD BE PROVIDED THROUGH ENVIRONMENT VARIABLES, or via `setup`
 DATA_PATH = None
@@ -31,6 +52,19 @@ SETTINGS = {
     },
     'xarray_repr_mod': False,
     'use_tex': False,
+    'load_cache': {
+        'enabled': False,
+        'path': None,  # defaults to a folder in DATASET_CACHE_PATH
+        'max_bytes': 10 * 1024 ** 3,
+    },
+    'dataset_tables': {
+        'persist': True,
+        'path': None,  # defaults to a folder in DATASET_CACHE_PATH
+    },
+    'pipeline_cache': {
+        'max_bytes': None,  # evicts the least recently used pipeline results once they take up more than this
+        'max_age': None,  # evicts pipeline results not used for this many seconds
+    },
 }
 
 # these are all set by ``update_configuration``
@@ -39,7 +73,10 @@ FIGURE_PATH = None
 DATASET_PATH = None
 
 DATASET_CACHE_PATH = None
-DATASET_CACHE_RECORD = None # .json file that holds normalized files
+DATASET_CACHE_RECORD = None # .json file that holds normalized files, superseded by RECORD_DATABASE
+
+# SQLite database holding the records of normalized files and cached pipeline results, see ``arpes.records``
+RECORD_DATABASE = None
 
 # .json file that records which files are linked to the same physical sample, currently unused
 CLEAVE_RECORD = None
@@ -49,10 +86,9 @@ PIPELINE_JSON_SHELF = None
 
 
 def generate_cache_files() -> None:
-    global DATASET_CACHE_RECORD
     global CLEAVE_RECORD
 
-    for record_file in [DATASET_CACHE_RECORD, CLEAVE_RECORD]:
+    for record_file in [CLEAVE_RECORD]:
         if not Path(record_file).exists():
             with open(record_file, 'w+') as f:
                 json.dump({}, f)
@@ -65,6 +101,7 @@ def update_configuration(user_path: Optional[str] = None) -> None:
     global DATASET_CACHE_PATH
     global DATASET_CACHE_RECORD
     global CLEAVE_RECORD
+    global RECORD_DATABASE
     global PIPELINE_SHELF
     global PIPELINE_JSON_SHELF
 
@@ -81,6 +118,7 @@ def update_configuration(user_path: Optional[str] = None) -> None:
 
         DATASET_CACHE_RECORD = os.path.join(user_path, 'datasets', 'cache.json')
         CLEAVE_RECORD = os.path.join(user_path, 'datasets', 'cleaves.json')
+        RECORD_DATABASE = os.path.join(user_path, 'datasets', 'records.sqlite')
 
         PIPELINE_SHELF = os.path.join(user_path, 'datasets', 'pipeline.shelf')
         PIPELINE_JSON_SHELF = os.path.join(user_path, 'datasets', 'pipeline.shelf.json')
@@ -275,4 +313,7 @@ def setup_logging():
 
 setup_logging()
 update_configuration()
-load_plugins()
+
+# registers the data accessors (.S, .T, .F, ...) which most of PyARPES relies on, plugins are instead imported
+# as they are needed, see `arpes.endstations.plugin.PLUGIN_MANIFEST`
+import arpes.xarray_extensions # pylint: disable=unused-import, wrong-import-position
@@ -2,17 +2,18 @@
 Plugin facility to read and normalize information from different sources to a common format
 """
 import warnings
-import re
 
 import numpy as np
 import h5py
 import xarray as xr
-from astropy.io import fits
 
 from pathlib import Path
 import typing
 from typing import Any, Dict
 import copy
+import functools
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 import arpes.config
 import arpes.constants
 import os.path
@@ -21,7 +22,10 @@ from arpes.load_pxt import read_single_pxt, find_ses_files_associated
 from arpes.utilities.dict import case_insensitive_get, rename_dataarray_attrs
 from arpes.preparation import replace_coords
 from arpes.provenance import provenance_from_file
-from arpes.endstations.fits_utils import find_clean_coords
+from arpes.endstations.cache import cached_load
+from arpes.endstations.file_index import compiled_search_pattern, directory_index
+from arpes.endstations.fits_utils import MemmapBinTable, binary_table_layout, find_clean_coords
+from arpes.endstations.hdf5_utils import read_hdf5_dataset
 from arpes.endstations.igor_utils import shim_wave_note
 from arpes.repair import negate_energy
 
@@ -78,6 +82,12 @@ class EndstationBase:
     # phi because this happens sometimes at BL4 with core level scans
     SUMMABLE_NULL_DIMS = ['phi', 'cycle']
 
+    # frames are read concurrently on at most this many threads, set to 1 for readers which are not thread safe
+    MAX_FRAME_LOADING_THREADS = 8
+
+    # whether frames are written into a preallocated array rather than concatenated with xr.concat
+    PREALLOCATE_FRAMES = False
+
     RENAME_KEYS = {}
 
     @classmethod
@@ -91,8 +101,7 @@ class EndstationBase:
                 return False
 
             for pattern in cls._SEARCH_PATTERNS:
-                regex = re.compile(pattern.format(r'[0-9]+'))
-                if regex.match(p.stem):
+                if compiled_search_pattern(pattern, r'[0-9]+').match(p.stem):
                     return True
 
             return False
@@ -106,6 +115,16 @@ class EndstationBase:
     def files_for_search(cls, directory):
         return list(filter(lambda f: os.path.splitext(f)[1] in cls._TOLERATED_EXTENSIONS, os.listdir(directory)))
 
+    @classmethod
+    def search_signature(cls, directory) -> typing.Tuple[int, ...]:
+        """
+        Modification times which change whenever the result of `files_for_search` on ``directory`` could.
+        Plugins searching subdirectories should include their modification times as well.
+        :param directory:
+        :return:
+        """
+        return (os.stat(directory).st_mtime_ns,)
+
     @classmethod
     def find_first_file(cls, file, scan_desc, allow_soft_match=False):
         workspace = arpes.config.CONFIG['WORKSPACE']
@@ -119,30 +138,12 @@ class EndstationBase:
         # to install regexes for particular endstations, if this is needed in the future it might be a good way
         # of preventing clashes where there is ambiguity in file naming scheme across endstations
 
-        patterns = [re.compile(m.format(file)) for m in cls._SEARCH_PATTERNS]
-
         for dir in dir_options:
             try:
-                files = cls.files_for_search(dir)
-
-                if cls._USE_REGEX:
-                    for p in patterns:
-                        for f in files:
-                            m = p.match(os.path.splitext(f)[0])
-                            if m is not None:
-                                if m.string == os.path.splitext(f)[0]:
-                                    return os.path.join(dir, f)
-                else:
-                    for f in files:
-                        if os.path.splitext(file)[0] == os.path.splitext(f)[0]:
-                            return os.path.join(dir, f)
-                        if allow_soft_match:
-                            matcher = os.path.splitext(f)[0].split('_')[-1]
-                            try:
-                                if int(matcher) == int(file):
-                                    return os.path.join(dir, f)  # soft match
-                            except ValueError:
-                                pass
+                found = directory_index(cls, dir).find(file, use_regex=cls._USE_REGEX,
+                                                       allow_soft_match=allow_soft_match)
+                if found is not None:
+                    return found
             except FileNotFoundError:
                 pass
 
@@ -151,7 +152,15 @@ class EndstationBase:
 
         raise ValueError('Could not find file associated to {}'.format(file))
 
-    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None):
+    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None, preallocate=None):
+        """
+        Stacks frames along the coordinate which varies most between them.
+        :param frames:
+        :param scan_desc:
+        :param preallocate: Whether to write frames into a preallocated array rather than concatenating them,
+        by default ``PREALLOCATE_FRAMES``
+        :return:
+        """
         if not frames:
             raise ValueError('Could not read any frames.')
 
@@ -174,6 +183,15 @@ class EndstationBase:
             f.coords[scan_coord] = f.attrs[scan_coord]
 
         frames.sort(key=lambda x: x.coords[scan_coord])
+
+        if preallocate is None:
+            preallocate = self.PREALLOCATE_FRAMES
+
+        if preallocate:
+            concatenated = _concatenate_preallocated(frames, scan_coord)
+            if concatenated is not None:
+                return concatenated
+
         return xr.concat(frames, scan_coord)
 
     def resolve_frame_locations(self, scan_desc: dict = None) -> typing.List[str]:
@@ -274,20 +292,46 @@ class EndstationBase:
             'location': self.PRINCIPAL_NAME,
         })
 
-    def load(self, scan_desc: dict = None, **kwargs):
+    def load_frames(self, frame_locations: typing.List[str], scan_desc: dict = None, n_workers=None, **kwargs):
+        """
+        Loads and postprocesses each frame. Frames are read concurrently on a thread pool, since reading
+        spends most of its time in I/O and in readers which release the GIL.
+
+        :param frame_locations:
+        :param scan_desc:
+        :param n_workers: Number of threads to use, by default up to ``MAX_FRAME_LOADING_THREADS``
+        :param kwargs:
+        :return: The frames in the order of ``frame_locations``
+        """
+        def load_frame(frame_path):
+            return self.postprocess(self.load_single_frame(frame_path, scan_desc, **kwargs))
+
+        if n_workers is None:
+            n_workers = self.MAX_FRAME_LOADING_THREADS
+
+        n_workers = min(n_workers, len(frame_locations))
+        if n_workers <= 1:
+            return [load_frame(fpath) for fpath in frame_locations]
+
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            return list(pool.map(load_frame, frame_locations))
+
+    def load(self, scan_desc: dict = None, n_workers=None, preallocate=None, **kwargs):
         """
         Loads a scan from a single file or a sequence of files.
 
         :param scan_desc:
+        :param n_workers: Number of threads on which frames are read, see `load_frames`
+        :param preallocate: Whether to write frames into a preallocated array rather than concatenating them,
+        by default ``PREALLOCATE_FRAMES``
         :param kwargs:
         :return:
         """
         resolved_frame_locations = self.resolve_frame_locations(scan_desc)
         resolved_frame_locations = [f if isinstance(f, str) else str(f) for f in resolved_frame_locations]
 
-        frames = [self.load_single_frame(fpath, scan_desc, **kwargs) for fpath in resolved_frame_locations]
-        frames = [self.postprocess(f) for f in frames]
-        concatted = self.concatenate_frames(frames, scan_desc)
+        frames = self.load_frames(resolved_frame_locations, scan_desc, n_workers=n_workers, **kwargs)
+        concatted = self.concatenate_frames(frames, scan_desc, preallocate=preallocate)
         concatted = self.postprocess_final(concatted, scan_desc)
 
         if 'id' in scan_desc:
@@ -296,6 +340,71 @@ class EndstationBase:
         return concatted
 
 
+def _attrs_agree(first: Any, second: Any) -> bool:
+    if isinstance(first, np.ndarray) or isinstance(second, np.ndarray):
+        return np.array_equal(first, second)
+
+    if first is second:
+        return True
+
+    try:
+        return bool(first == second) or (bool(np.isnan(first)) and bool(np.isnan(second)))
+    except (TypeError, ValueError):
+        return False
+
+
+def _concatenate_preallocated(frames: typing.List[xr.Dataset], dim: str) -> typing.Optional[xr.Dataset]:
+    """
+    Stacks frames along a new dimension ``dim``, which each frame has as a scalar coordinate, by writing
+    them into preallocated arrays. This gives the same result as ``xr.concat(frames, dim)``, without the
+    intermediate copies made while aligning and concatenating.
+    :return: The stacked frames, or None if the frames do not share variables, shapes, and dimension
+    coordinates, or hold lazily loaded data, in which case they should be concatenated with ``xr.concat``.
+    """
+    first = frames[0]
+    if dim in first.dims:
+        return None
+
+    # writing lazily loaded frames into an array would read all of them into memory
+    if any(hasattr(v.data, 'dask') for f in frames for v in f.variables.values()):
+        return None
+
+    for frame in frames[1:]:
+        if set(frame.data_vars) != set(first.data_vars) or set(frame.coords) != set(first.coords):
+            return None
+
+        for name, variable in first.variables.items():
+            other = frame.variables[name]
+            if other.dims != variable.dims or other.shape != variable.shape:
+                return None
+
+            if name in first.dims and not other.equals(variable):
+                return None
+
+    def stack(name, variable):
+        values = np.empty((len(frames),) + variable.shape,
+                          dtype=np.result_type(*[f.variables[name].dtype for f in frames]))
+        for i, frame in enumerate(frames):
+            values[i] = frame.variables[name].values
+
+        # like xr.concat, only keep attributes which agree between all frames
+        attrs = {k: v for k, v in variable.attrs.items()
+                 if all(k in f.variables[name].attrs and _attrs_agree(f.variables[name].attrs[k], v)
+                        for f in frames[1:])}
+        return xr.Variable((dim,) + variable.dims, values, attrs=attrs)
+
+    coords = {}
+    for name in first.coords:
+        variable = first.variables[name]
+        if name in first.dims or all(f.variables[name].equals(variable) for f in frames[1:]):
+            coords[name] = variable
+        else:
+            coords[name] = stack(name, variable)
+
+    data_vars = {name: stack(name, first.variables[name]) for name in first.data_vars}
+    return xr.Dataset(data_vars, coords=coords, attrs=first.attrs)
+
+
 class SingleFileEndstation(EndstationBase):
     """
     Abstract endstation which loads data from a single file. This just specializes
@@ -355,7 +464,7 @@ class SESEndstation(EndstationBase):
         frame = super().postprocess(frame)
         return frame.assign_attrs(frame.S.spectrum.attrs)
 
-    def load_SES_nc(self, scan_desc: dict = None, robust_dimension_labels=False, **kwargs):
+    def load_SES_nc(self, scan_desc: dict = None, robust_dimension_labels=False, lazy=False, **kwargs):
         """
         Imports an hdf5 dataset exported from Igor that was originally generated by a Scienta spectrometer
         in the SESb format. In order to understand the structure of these files have a look at Conrad's
@@ -364,6 +473,7 @@ class SESEndstation(EndstationBase):
         :param scan_desc: Dictionary with extra information to attach to the xr.Dataset, must contain the location
         of the file
         :param robust_dimension_labels: safety control, used to load despite possibly malformed dimension names
+        :param lazy: If True, the spectrum is a chunked dask array which is only read from the file as needed
         :return:
         """
 
@@ -375,14 +485,15 @@ class SESEndstation(EndstationBase):
             data_loc = os.path.join(arpes.config.DATA_PATH, data_loc)
 
         wave_note = shim_wave_note(data_loc)
-        f = h5py.File(data_loc, 'r')
+        with h5py.File(data_loc, 'r') as f:
+            primary_dataset_name = list(f)[0]
+            # This is bugged for the moment in h5py due to an inability to read fixed length unicode strings
+            # wave_note = f['/' + primary_dataset_name].attrs['IGORWaveNote']
 
-        primary_dataset_name = list(f)[0]
-        # This is bugged for the moment in h5py due to an inability to read fixed length unicode strings
-        # wave_note = f['/' + primary_dataset_name].attrs['IGORWaveNote']
+            # Use dimension labels instead of
+            dimension_labels = list(f['/' + primary_dataset_name].attrs['IGORWaveDimensionLabels'][0])
+            scaling = f['/' + primary_dataset_name].attrs['IGORWaveScaling'][-len(dimension_labels):]
 
-        # Use dimension labels instead of
-        dimension_labels = list(f['/' + primary_dataset_name].attrs['IGORWaveDimensionLabels'][0])
         if any(x == '' for x in dimension_labels):
             print(dimension_labels)
 
@@ -397,8 +508,7 @@ class SESEndstation(EndstationBase):
 
                 print(dimension_labels)
 
-        scaling = f['/' + primary_dataset_name].attrs['IGORWaveScaling'][-len(dimension_labels):]
-        raw_data = f['/' + primary_dataset_name][:]
+        raw_data = read_hdf5_dataset(data_loc, '/' + primary_dataset_name, lazy=lazy)
 
         scaling = [np.linspace(scale[1], scale[1] + scale[0] * raw_data.shape[i], raw_data.shape[i])
                    for i, scale in enumerate(scaling)]
@@ -505,11 +615,8 @@ class FITSEndstation(EndstationBase):
 
         return [original_data_loc]
 
-    def load_single_frame(self, frame_path: str=None, scan_desc: dict = None, **kwargs):
-        # Use dimension labels instead of
-        hdulist = fits.open(frame_path, ignore_missing_end=True)
-        primary_dataset_name = None
-
+    @staticmethod
+    def clean_hdulist(hdulist):
         # Clean the header because sometimes out LabView produces improper FITS files
         for i in range(len(hdulist)):
             # This looks a little stupid, but because of confusing astropy internals actually works
@@ -528,11 +635,36 @@ class FITSEndstation(EndstationBase):
             # This actually requires substantially more work because it is lossy to information
             # on the unit that was encoded
 
-        hdu = hdulist[1]
+        return hdulist
+
+    def open_frame(self, frame_path: str):
+        """
+        Opens a FITS frame, returning its primary header and its binary table. Cleaning and parsing the headers
+        dominates the cost of reading a frame, so the cleaned headers and the layout of the table are cached for
+        each file, and the table is served as views onto a memory map of the file whenever possible.
+        :param frame_path:
+        :return: (primary header, binary table)
+        """
+        stat = os.stat(frame_path)
+        primary_header, table_header, layout = _fits_frame_headers(
+            type(self).clean_hdulist, os.path.abspath(frame_path), stat.st_size, stat.st_mtime_ns)
+
+        if layout is not None:
+            return dict(primary_header), MemmapBinTable(frame_path, dict(table_header), layout)
+
+        from astropy.io import fits
+
+        hdulist = self.clean_hdulist(fits.open(frame_path, ignore_missing_end=True))
+        return dict(hdulist[0].header), hdulist[1]
+
+    def load_single_frame(self, frame_path: str=None, scan_desc: dict = None, **kwargs):
+        # Use dimension labels instead of
+        primary_header, hdu = self.open_frame(frame_path)
+        primary_dataset_name = None
 
         scan_desc = copy.deepcopy(scan_desc)
         attrs = scan_desc.pop('note', scan_desc)
-        attrs.update(dict(hdulist[0].header))
+        attrs.update(primary_header)
 
         drop_attrs = ['COMMENT', 'HISTORY', 'EXTEND', 'SIMPLE', 'SCANPAR', 'SFKE_0']
         for dropped_attr in drop_attrs:
@@ -686,6 +818,25 @@ class FITSEndstation(EndstationBase):
         )
 
 
+# The cleaned headers of recently read FITS files, these are small and reading them is slow
+MAX_CACHED_FITS_HEADERS = 256
+
+
+@functools.lru_cache(maxsize=MAX_CACHED_FITS_HEADERS)
+def _fits_frame_headers(clean_hdulist, path: str, size: int, mtime_ns: int):
+    """
+    Cleans and reads the headers of a FITS frame, along with the layout of its binary table. Cached on
+    the size and modification time of the file, so that modified files are read again.
+    :return: (primary header, table header, table layout or None)
+    """
+    from astropy.io import fits
+
+    with fits.open(path, ignore_missing_end=True, memmap=True) as hdulist:
+        clean_hdulist(hdulist)
+        layout = binary_table_layout(hdulist, 1)
+        return dict(hdulist[0].header), dict(hdulist[1].header), layout
+
+
 class SynchrotronEndstation(EndstationBase):
     """
     Synchrotron endstations have somewhat complicated light source metadata.
@@ -709,12 +860,36 @@ class HemisphericalEndstation(EndstationBase):
     PIXELS_PER_DEG = None
 
 
+def _register_plugin(entry) -> None:
+    """
+    Imports the plugin module providing a manifest entry, and registers the endstations the manifest lists
+    for it under their names.
+    :param entry: See `arpes.endstations.plugin.PLUGIN_MANIFEST`
+    :return:
+    """
+    from arpes.endstations.plugin import PLUGIN_MANIFEST
+
+    module = importlib.import_module('arpes.endstations.plugin.{}'.format(entry.module))
+    for other_entry in PLUGIN_MANIFEST:
+        if other_entry.module == entry.module:
+            for name in other_entry.names:
+                _ENDSTATION_ALIASES.setdefault(name, getattr(module, other_entry.endstation))
+
+
 def endstation_from_alias(alias: str) -> type:
     """
-    Lookup the data loading class from an alias.
+    Lookup the data loading class from an alias. Plugins in the plugin manifest are imported
+    the first time one of their aliases is requested.
     :param alias:
     :return:
     """
+    if alias not in _ENDSTATION_ALIASES:
+        from arpes.endstations.plugin import plugin_for_alias
+
+        entry = plugin_for_alias(alias)
+        if entry is not None:
+            _register_plugin(entry)
+
     return _ENDSTATION_ALIASES[alias]
 
 
@@ -777,13 +952,16 @@ def resolve_endstation(retry=True, **kwargs):
                              'in the endstations module.')
 
 
-def load_scan(scan_desc: Dict[str, str], retry=True, **kwargs: Any) -> xr.Dataset:
+def load_scan(scan_desc: Dict[str, str], retry=True, cache=None, **kwargs: Any) -> xr.Dataset:
     """
     Determines which data loading class is appropriate for the data,
     shuffles a bit of metadata, and calls the .load function on the
     retrieved class to start the data loading process.
+
+    Loaded scans are kept in an on-disk cache if it is enabled, see `arpes.endstations.cache`.
     :param scan_desc:
     :param retry: Used to attempt a reload of plugins and subsequent data load attempt.
+    :param cache: Whether to use the load cache, by default as set in the ``load_cache`` settings
     :param kwargs:
     :return:
     """
@@ -804,4 +982,4 @@ def load_scan(scan_desc: Dict[str, str], retry=True, **kwargs: Any) -> xr.Datase
     except ValueError:
         pass
 
-    return endstation_cls().load(scan_desc, **kwargs)
\ No newline at end of file
+    return cached_load(endstation_cls, scan_desc, endstation_cls().load, cache=cache, **kwargs)
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+An on-disk cache of loaded scans, used transparently by `arpes.endstations.load_scan`.
+
+Parsing raw data, cleaning headers, and normalizing the result in the endstation plugins is often
+far slower than reading an already loaded scan back from disk. When enabled, ``load_scan`` stores
+each post-processed ``xr.Dataset`` in a binary (pickle) file, keyed by
+
+1. The absolute path, size, and modification time of every file the scan is read from
+2. The endstation class, the scan description, and the loader keyword arguments
+3. The PyARPES version
+
+so that a scan is parsed again whenever its files or the loading code change. The least recently
+used entries are evicted to keep the cache below a size budget.
+
+The cache is disabled by default and can be enabled with
+
+arpes.config.override_settings({'load_cache': {'enabled': True, 'max_bytes': 20 * 1024 ** 3}})
+
+or for a single call with ``load_scan(scan_desc, cache=True)``. Cached files are only ever read by
+PyARPES itself and should not be shared, as unpickling untrusted data is unsafe.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import xarray as xr
+from typing import Any, Callable, Dict, List, Optional
+
+import arpes.config
+
+__all__ = ('cached_load', 'load_cache_key', 'clear_load_cache', 'load_cache_directory',)
+
+# bumped whenever the layout of cache entries changes
+LOAD_CACHE_FORMAT = 1
+
+CACHE_SUFFIX = '.pickle'
+
+
+def _settings() -> Dict[str, Any]:
+    return arpes.config.SETTINGS.get('load_cache', {})
+
+
+def load_cache_directory() -> Optional[Path]:
+    """
+    The directory holding cached scans: the ``path`` of the ``load_cache`` settings if provided, otherwise a
+    folder inside the dataset cache of the current configuration.
+    :return:
+    """
+    path = _settings().get('path')
+    if path is None and arpes.config.DATASET_CACHE_PATH is not None:
+        path = os.path.join(arpes.config.DATASET_CACHE_PATH, 'loads')
+
+    return None if path is None else Path(path)
+
+
+def _file_signature(path: str) -> List[Any]:
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def load_cache_key(frame_locations: List[str], endstation_cls: type, scan_desc: Dict[str, Any],
+                   kwargs: Dict[str, Any]) -> str:
+    """
+    Computes the cache key of a load.
+    :param frame_locations: The files the scan is read from
+    :param endstation_cls:
+    :param scan_desc:
+    :param kwargs: Keyword arguments to the endstation's ``load``
+    :return:
+    """
+    import arpes
+
+    description = {
+        'format': LOAD_CACHE_FORMAT,
+        'version': arpes.VERSION,
+        'files': [_file_signature(str(f)) for f in frame_locations],
+        'endstation': '{}.{}'.format(endstation_cls.__module__, endstation_cls.__qualname__),
+        'scan_desc': scan_desc,
+        'kwargs': kwargs,
+    }
+    serialized = json.dumps(description, sort_keys=True, default=repr)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def _read(path: Path) -> Optional[xr.Dataset]:
+    try:
+        with open(str(path), 'rb') as f:
+            data = pickle.load(f)
+
+        _touch(path)
+        return data
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        warnings.warn('Discarding unreadable load cache entry {}: {}'.format(path, e))
+        _remove(path)
+        return None
+
+
+def _touch(path: Path) -> None:
+    """
+    Marks an entry as recently used. Timestamps are set explicitly rather than left to the file system clock,
+    which can be too coarse to order entries written in quick succession.
+    """
+    now = int(time.time() * 1e9)
+    os.utime(str(path), ns=(now, now))
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _write(path: Path, data: xr.Dataset) -> None:
+    """
+    Writes an entry atomically, so that concurrent loads never observe a partially written file.
+    """
+    # a shallow copy drops accessors cached on the Dataset, which cannot be pickled, and loading it
+    # detaches the entry from any file it is lazily read from
+    data = data.copy(deep=False).load()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temporary_path, str(path))
+        _touch(path)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        # some plugins attach attributes which cannot be pickled, such scans are not cached
+        os.remove(temporary_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def _enforce_budget(directory: Path, max_bytes: Optional[int]) -> None:
+    if max_bytes is None:
+        return
+
+    entries = []
+    for path in directory.glob('*' + CACHE_SUFFIX):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+
+        _remove(path)
+        total -= size
+
+
+def clear_load_cache() -> None:
+    directory = load_cache_directory()
+    if directory is None or not directory.exists():
+        return
+
+    for path in directory.glob('*' + CACHE_SUFFIX):
+        _remove(path)
+
+
+def cached_load(endstation_cls: type, scan_desc: Dict[str, Any], load: Callable[..., xr.Dataset],
+                cache: Optional[bool] = None, **kwargs: Any) -> xr.Dataset:
+    """
+    Calls ``load(scan_desc, **kwargs)``, reading the result from the load cache if possible and otherwise
+    storing it there.
+    :param endstation_cls:
+    :param scan_desc:
+    :param load: Performs the uncached load
+    :param cache: Overrides whether the cache is enabled in the settings
+    :param kwargs:
+    :return:
+    """
+    settings = _settings()
+    enabled = settings.get('enabled', False) if cache is None else cache
+    directory = load_cache_directory()
+
+    if not enabled or directory is None:
+        return load(scan_desc, **kwargs)
+
+    try:
+        frame_locations = endstation_cls().resolve_frame_locations(scan_desc)
+        key = load_cache_key(frame_locations, endstation_cls, scan_desc, kwargs)
+    except (OSError, ValueError, NotImplementedError):
+        # the scan cannot be identified without loading it
+        return load(scan_desc, **kwargs)
+
+    path = directory / (key + CACHE_SUFFIX)
+    data = _read(path)
+    if data is not None:
+        return data
+
+    data = load(scan_desc, **kwargs)
+    if any(hasattr(v.data, 'dask') for v in data.variables.values()):
+        # lazily loaded scans are cheap to open, and caching them would read them in full
+        return data
+
+    _write(path, data)
+    _enforce_budget(directory, settings.get('max_bytes'))
+    return data
@@ -0,0 +1,170 @@
+"""
+Indices of the files in data directories, used by endstations to resolve scan numbers to files.
+
+Resolving a scan number means listing each of an endstation's search directories and trying each of
+its search patterns against every file. On large or networked data directories, repeating this for
+every load is slow. Instead, a ``DirectoryIndex`` keeps the listing of a directory for a given
+endstation class, along with
+
+1. The files by stem, for exact and soft matching
+2. The file each scan number resolves to, filled in as numbers are looked up
+
+and is only refreshed when the modification time of the directory changes. Files added to or removed
+from the directory are then applied to the index, rather than rebuilding it.
+"""
+
+import functools
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from typing import Any, Optional
+
+__all__ = ('DirectoryIndex', 'directory_index', 'clear_directory_indices', 'compiled_search_pattern',)
+
+# Directory modification times are only trusted once they are this old, since files written within
+# the resolution of the file system clock may not change the time
+MTIME_SETTLE_SECONDS = 2
+
+_INDICES = {}
+_INDICES_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=4096)
+def compiled_search_pattern(pattern: str, file: str):
+    return re.compile(pattern.format(file))
+
+
+def _split_stem(filename: str) -> str:
+    return os.path.splitext(filename)[0]
+
+
+class DirectoryIndex:
+    """
+    The files in one search directory of an endstation, and the files which scan numbers resolve to.
+    """
+    def __init__(self, endstation_cls: type, directory: str):
+        self.endstation_cls = endstation_cls
+        self.directory = directory
+        self.signature = None
+        self.refreshed_at = None
+
+        self.files = []
+        self.stems = defaultdict(list)
+        self.soft_matches = defaultdict(list)
+        self._resolved = {}
+
+    def _add(self, filename: str) -> None:
+        stem = _split_stem(filename)
+        self.stems[stem].append(filename)
+
+        try:
+            self.soft_matches[int(stem.split('_')[-1])].append(filename)
+        except ValueError:
+            pass
+
+    def _remove(self, filename: str) -> None:
+        stem = _split_stem(filename)
+        self.stems[stem].remove(filename)
+        if not self.stems[stem]:
+            del self.stems[stem]
+
+        try:
+            soft_key = int(stem.split('_')[-1])
+            self.soft_matches[soft_key].remove(filename)
+            if not self.soft_matches[soft_key]:
+                del self.soft_matches[soft_key]
+        except ValueError:
+            pass
+
+    def refresh(self) -> None:
+        """
+        Relists the directory if it has changed since the index was last refreshed.
+        :return:
+        """
+        signature = self.endstation_cls.search_signature(self.directory)
+        settled = self.refreshed_at is not None and self.refreshed_at - max(signature) > MTIME_SETTLE_SECONDS * 1e9
+        if signature == self.signature and settled:
+            return
+
+        refreshed_at = int(time.time() * 1e9)
+        files = sorted(self.endstation_cls.files_for_search(self.directory))
+        current, previous = set(files), set(self.files)
+
+        for filename in previous - current:
+            self._remove(filename)
+
+        for filename in files:
+            if filename not in previous:
+                self._add(filename)
+
+        if current != previous:
+            self._resolved = {}
+
+        self.files = files
+        self.signature = signature
+        self.refreshed_at = refreshed_at
+
+    def _search(self, file: str) -> Optional[str]:
+        patterns = [compiled_search_pattern(p, file) for p in self.endstation_cls._SEARCH_PATTERNS]
+
+        # a file matching a pattern for this number has to contain it, unless the number is itself a pattern
+        candidates = self.files
+        if re.escape(file) == file:
+            candidates = [f for f in self.files if file in f]
+
+        for pattern in patterns:
+            for filename in candidates:
+                if pattern.match(_split_stem(filename)) is not None:
+                    return filename
+
+        return None
+
+    def find(self, file: Any, use_regex: bool = True, allow_soft_match: bool = False) -> Optional[str]:
+        """
+        Finds the file in this directory matching a scan number or file name, as
+        `arpes.endstations.EndstationBase.find_first_file` would.
+        :param file:
+        :param use_regex: Whether to match against the search patterns of the endstation, or only by stem
+        :param allow_soft_match: Whether to allow matching by the number after the last underscore of a stem
+        :return: The path of the matching file, or None
+        """
+        file = str(file)
+        if use_regex:
+            if file not in self._resolved:
+                self._resolved[file] = self._search(file)
+
+            found = self._resolved[file]
+        else:
+            found = next(iter(self.stems.get(_split_stem(file), [])), None)
+            if found is None and allow_soft_match:
+                try:
+                    found = next(iter(self.soft_matches.get(int(file), [])), None)
+                except ValueError:
+                    pass
+
+        return None if found is None else os.path.join(self.directory, found)
+
+
+def directory_index(endstation_cls: type, directory: str) -> DirectoryIndex:
+    """
+    Retrieves the up to date index of ``directory`` for an endstation class.
+    :param endstation_cls:
+    :param directory:
+    :return:
+    """
+    key = (endstation_cls, os.path.abspath(directory))
+    with _INDICES_LOCK:
+        index = _INDICES.get(key)
+        if index is None:
+            index = _INDICES[key] = DirectoryIndex(endstation_cls, directory)
+
+        index.refresh()
+        return index
+
+
+def clear_directory_indices() -> None:
+    with _INDICES_LOCK:
+        _INDICES.clear()
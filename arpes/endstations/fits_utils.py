@@ -4,13 +4,12 @@ from ast import literal_eval
 from collections import Iterable
 
 import numpy as np
-from astropy.io.fits.hdu.table import BinTableHDU
 from numpy import ndarray
 
 from arpes.utilities.funcutils import collect_leaves, iter_leaves
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-__all__ = ('extract_coords', 'find_clean_coords',)
+__all__ = ('extract_coords', 'find_clean_coords', 'MemmapBinTable', 'binary_table_layout',)
 
 DEFAULT_DIMENSION_RENAMINGS = {
     'Beta': 'beta',
@@ -118,7 +117,7 @@ def extract_coords(attrs: Dict[str, Any], dimension_renamings: Dict[str, str] =
     return scan_coords, scan_dimension, scan_shape
 
 
-def find_clean_coords(hdu: BinTableHDU, attrs: Dict[str, Any], spectra: Optional[Any] = None, mode: str = 'ToF',
+def find_clean_coords(hdu: 'BinTableHDU', attrs: Dict[str, Any], spectra: Optional[Any] = None, mode: str = 'ToF',
                       dimension_renamings: Optional[Any] = None) \
         -> Tuple[CoordsDict, Dict[str, List[Dimension]], Dict[str, Any]]:
     """
@@ -381,3 +380,81 @@ def find_clean_coords(hdu: BinTableHDU, attrs: Dict[str, Any], spectra: Optional
         extra_coords = dict(iter_leaves(extra_coords))
 
     return extra_coords, dimensions_for_spectra, spectrum_shapes
+
+
+def binary_table_layout(hdulist, index: int = 1) -> Optional[Dict[str, Any]]:
+    """
+    Determines where each column of a binary table lives in the file: the offset of the table data, the width of
+    a row, the number of rows, and the type, shape, and offset within a row of every column. This is read from an
+    opened (and if necessary cleaned) astropy ``HDUList``.
+    :return: The layout, or None if some column cannot be read as a plain view of the file, because it is scaled,
+    logical, or of variable length
+    """
+    hdu = hdulist[index]
+    data = hdu.data
+    if data is None:
+        return None
+
+    columns = []
+    for column in hdu.columns:
+        field_dtype, field_offset = data.dtype.fields[column.name][:2]
+        scaled = column.bscale not in (None, 1) or column.bzero not in (None, 0)
+        if scaled or field_dtype.base.kind not in 'fiuc' or 'P' in str(column.format) or 'Q' in str(column.format):
+            return None
+
+        columns.append((column.name, field_dtype.base.str, tuple(field_dtype.shape), field_offset))
+
+    return {
+        'data_offset': hdulist.fileinfo(index)['datLoc'],
+        'row_bytes': data.dtype.itemsize,
+        'n_rows': len(data),
+        'columns': columns,
+    }
+
+
+class _Column:
+    def __init__(self, array: ndarray):
+        self.array = array
+
+
+class _Columns:
+    def __init__(self, arrays: Dict[str, ndarray]):
+        self._arrays = arrays
+        self.names = list(arrays)
+
+    def __getitem__(self, name: str) -> _Column:
+        return _Column(self._arrays[name])
+
+
+class MemmapBinTable:
+    """
+    A binary table whose columns are strided views onto a memory mapped FITS file, so that no column is copied
+    until it is used. This provides the parts of astropy's ``BinTableHDU`` needed to load data: ``header``,
+    ``columns.names``, ``data.columns[name].array``, and ``data.field(index)``.
+    """
+    def __init__(self, path: str, header: Dict[str, Any], layout: Dict[str, Any]):
+        """
+        :param path:
+        :param header: The (cleaned) header of the table
+        :param layout: As determined by `binary_table_layout`
+        """
+        self.header = header
+
+        buffer = np.memmap(path, dtype=np.uint8, mode='c')
+        arrays = {}
+        for name, dtype, shape, offset in layout['columns']:
+            dtype = np.dtype(dtype)
+            inner_strides = tuple(int(np.prod(shape[i + 1:])) * dtype.itemsize for i in range(len(shape)))
+            arrays[name] = np.ndarray((layout['n_rows'],) + shape, dtype=dtype, buffer=buffer,
+                                      offset=layout['data_offset'] + offset,
+                                      strides=(layout['row_bytes'],) + inner_strides)
+
+        self.columns = _Columns(arrays)
+
+    @property
+    def data(self) -> 'MemmapBinTable':
+        return self
+
+    def field(self, index: Union[int, str]) -> ndarray:
+        name = self.columns.names[index] if isinstance(index, int) else index
+        return self.columns[name].array
@@ -0,0 +1,104 @@
+"""
+Utilities for reading datasets out of HDF5 files lazily.
+
+Loaders normally read the primary dataset of a file into memory in full. For large scans, such as
+spatial maps, ``lazy_hdf5_dataset`` instead provides a chunked dask array over the dataset, so that
+selecting a region of interest only reads the chunks which overlap it.
+
+No file handle is held by the lazy array: each chunk is read by opening the file, reading the
+chunk, and closing the file again. Lazily loaded data can therefore outlive the loader, be
+pickled, and be read from several threads, without leaking handles.
+"""
+
+import uuid
+
+import h5py
+import numpy as np
+from typing import Any, Optional, Tuple
+
+__all__ = ('lazy_hdf5_dataset', 'read_hdf5_dataset',)
+
+# Target size of the chunks of lazily read datasets which are not chunked on disk
+LAZY_CHUNK_BYTES = 64 * 1024 ** 2
+
+
+class HDF5DatasetSlicer:
+    """
+    An array-like view of a dataset in an HDF5 file which reads only the requested slice on indexing.
+    """
+    def __init__(self, path: str, name: str):
+        self.path = str(path)
+        self.name = name
+
+        with h5py.File(self.path, 'r') as f:
+            dataset = f[name]
+            self.shape = dataset.shape
+            self.dtype = dataset.dtype
+            self.chunks = dataset.chunks
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __getitem__(self, item: Any) -> np.ndarray:
+        with h5py.File(self.path, 'r') as f:
+            return f[self.name][item]
+
+
+def _chunk_shape(slicer: HDF5DatasetSlicer, chunk_bytes: int) -> Tuple[int, ...]:
+    """
+    Chunks are whole multiples of the on-disk chunks if the dataset is chunked. Otherwise the dataset
+    is split along its leading axes, so that each chunk is a contiguous block of the file.
+    """
+    itemsize = np.dtype(slicer.dtype).itemsize
+    if slicer.chunks is not None:
+        chunk = list(slicer.chunks)
+        for axis in range(len(chunk)):
+            while (chunk[axis] * 2 <= slicer.shape[axis]
+                   and int(np.prod(chunk)) * 2 * itemsize <= chunk_bytes):
+                chunk[axis] *= 2
+
+        return tuple(chunk)
+
+    chunk = list(slicer.shape)
+    for axis in range(len(chunk)):
+        row_bytes = int(np.prod(chunk[axis + 1:])) * itemsize
+        if row_bytes * chunk[axis] <= chunk_bytes:
+            break
+
+        chunk[axis] = max(1, chunk_bytes // max(row_bytes, 1))
+        if chunk[axis] > 1:
+            break
+
+    return tuple(chunk)
+
+
+def lazy_hdf5_dataset(path: str, name: str, chunk_bytes: Optional[int] = None):
+    """
+    Opens a dataset in an HDF5 file as a chunked dask array, read on demand.
+    :param path:
+    :param name: Path of the dataset inside the file
+    :param chunk_bytes: Approximate size of each chunk, defaults to ``LAZY_CHUNK_BYTES``
+    :return:
+    """
+    import dask.array as da
+
+    slicer = HDF5DatasetSlicer(path, name)
+    chunks = _chunk_shape(slicer, chunk_bytes or LAZY_CHUNK_BYTES)
+    return da.from_array(slicer, chunks=chunks, name='hdf5-{}'.format(uuid.uuid4().hex),
+                         meta=np.empty((0,) * slicer.ndim, dtype=slicer.dtype))
+
+
+def read_hdf5_dataset(path: str, name: str, lazy: bool = False):
+    """
+    Reads a dataset from an HDF5 file, either in full or lazily, closing the file afterwards.
+    :param path:
+    :param name:
+    :param lazy: If True, a dask array is returned, see `lazy_hdf5_dataset`
+    :return:
+    """
+    if lazy:
+        return lazy_hdf5_dataset(path, name)
+
+    with h5py.File(str(path), 'r') as f:
+        return f[name][:]
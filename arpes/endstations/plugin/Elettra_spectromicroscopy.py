@@ -125,6 +125,12 @@ class SpectromicroscopyElettraEndstation(HemisphericalEndstation, SynchrotronEnd
 
         return list(filter(lambda f: os.path.splitext(f)[1] in cls._TOLERATED_EXTENSIONS, base_files))
 
+    @classmethod
+    def search_signature(cls, directory):
+        # scans are also found in subdirectories, whose contents can change without touching the directory
+        subdirectories = sorted(e.path for e in os.scandir(directory) if e.is_dir())
+        return (os.stat(directory).st_mtime_ns,) + tuple(os.stat(p).st_mtime_ns for p in subdirectories)
+
     ANALYZER_INFORMATION = {
         'analyzer': 'Custom: in vacuum hemispherical',
         'analyzer_name': 'Spectromicroscopy analyzer',
@@ -159,7 +165,7 @@ class SpectromicroscopyElettraEndstation(HemisphericalEndstation, SynchrotronEnd
 
     CONCAT_COORDS = ['T', 'P']
 
-    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None):
+    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None, preallocate=None):
         if not frames:
             raise ValueError('Could not read any frames.')
 
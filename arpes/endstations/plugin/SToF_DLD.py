@@ -8,6 +8,7 @@ import numpy as np
 import arpes.config
 import xarray as xr
 from arpes.endstations import EndstationBase
+from arpes.endstations.hdf5_utils import read_hdf5_dataset
 from arpes.provenance import provenance_from_file
 
 __all__ = ('SToFDLDEndstation',)
@@ -16,13 +17,14 @@ __all__ = ('SToFDLDEndstation',)
 class SToFDLDEndstation(EndstationBase):
     PRINCIPAL_NAME = 'ALG-SToF-DLD'
 
-    def load(self, scan_desc: dict=None, **kwargs):
+    def load(self, scan_desc: dict=None, lazy=False, **kwargs):
         """
         Imports a FITS file that contains all of the information from a run of Ping
         and Anton's delay line detector ARToF
 
         :param scan_desc: Dictionary with extra information to attach to the xarray.Dataset, must contain the location
         of the file
+        :param lazy: If True, the detector image is a chunked dask array which is only read from the file as needed
         :return: xarray.Dataset
         """
 
@@ -35,17 +37,18 @@ class SToFDLDEndstation(EndstationBase):
         data_loc = metadata['file']
         data_loc = data_loc if data_loc.startswith('/') else os.path.join(arpes.config.DATA_PATH, data_loc)
 
-        f = h5py.File(data_loc, 'r')
+        with h5py.File(data_loc, 'r') as f:
+            primary_attrs = dict(f['/PRIMARY'].attrs.items())
 
         dataset_contents = dict()
-        raw_data = f['/PRIMARY/DATA'][:]
+        raw_data = read_hdf5_dataset(data_loc, '/PRIMARY/DATA', lazy=lazy)
         raw_data = raw_data[:, ::-1]  # Reverse the timing axis
         dataset_contents['raw'] = xr.DataArray(
             raw_data,
             coords={'x_pixels': np.linspace(0, 511, 512),
                     't_pixels': np.linspace(0, 511, 512)},
             dims=('x_pixels', 't_pixels'),
-            attrs=f['/PRIMARY'].attrs.items(),
+            attrs=primary_attrs,
         )
 
         provenance_from_file(dataset_contents['raw'], data_loc, {
@@ -2,3 +2,50 @@
 Plugins for data loading, we could hook other code in here too, but this is the
 only obvious thing that users might want to add a lot of code around at the moment
 """
+
+from collections import namedtuple
+
+__all__ = ('PLUGIN_MANIFEST', 'PluginEntry', 'plugin_for_alias',)
+
+PluginEntry = namedtuple('PluginEntry', ('module', 'endstation', 'names', 'extensions'))
+
+# The endstations provided by each plugin module, the names they are resolved from, and the file
+# extensions they accept. Plugins are only imported once one of their names is requested, so this
+# should be kept in sync with the plugins themselves. Plugins not listed here are still found, at the
+# cost of importing every plugin, see `arpes.config.load_plugins`.
+PLUGIN_MANIFEST = (
+    PluginEntry('ALG_main', 'ALGMainChamber', ('ALG-Main', 'MC', 'ALG-MC', 'ALG-Hemisphere', 'ALG-Main Chamber'),
+                ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    PluginEntry('ALG_spin_ToF', 'SpinToFEndstation', ('ALG-SToF', 'SToF', 'Spin-ToF', 'ALG-SpinToF'),
+                ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    PluginEntry('ANTARES', 'ANTARESEndstation', ('ANTARES',), ('.nxs',)),
+    PluginEntry('Elettra_spectromicroscopy', 'SpectromicroscopyElettraEndstation',
+                ('Spectromicroscopy Elettra', 'Spectromicroscopy', 'nano-ARPES Elettra'), ('.hdf5',)),
+    PluginEntry('HERS', 'HERSEndstation', ('ALS-BL1001', 'HERS', 'ALS-HERS', 'BL1001'),
+                ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    PluginEntry('MAESTRO', 'MAESTROMicroARPESEndstation', ('ALS-BL7', 'BL7', 'BL7.0.2', 'ALS-BL7.0.2', 'MAESTRO'),
+                ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    PluginEntry('MAESTRO', 'MAESTRONanoARPESEndstation',
+                ('ALS-BL7-nano', 'BL7-nano', 'BL7.0.2-nano', 'ALS-BL7.0.2-nano', 'MAESTRO-nano'),
+                ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    PluginEntry('MBS', 'MBSEndstation', ('MBS', 'MB Scientific'), ('.txt',)),
+    PluginEntry('SToF_DLD', 'SToFDLDEndstation', ('ALG-SToF-DLD',), ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    PluginEntry('fallback', 'FallbackEndstation', ('fallback',), ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    # the principal name of the Igor export endstation, 'Igor', is shadowed by the Igor endstation
+    PluginEntry('igor_export', 'IgorExportEndstation', ('igor', 'igor-export'),
+                ('.fits', '.h5', '.nc', '.nxs', '.pxt', '.txt')),
+    PluginEntry('igor_plugin', 'IgorEndstation', ('Igor', 'IGOR', 'pxt', 'pxp', 'Wave', 'wave'), ('.pxt',)),
+    PluginEntry('kaindl', 'KaindlEndstation', ('Kaindl',), ('.pxt',)),
+    PluginEntry('merlin', 'BL403ARPESEndstation', ('ALS-BL403', 'BL403', 'BL4', 'BL4.0.3', 'ALS-BL4'), ('.pxt',)),
+)
+
+_MANIFEST_BY_NAME = {name: entry for entry in PLUGIN_MANIFEST for name in entry.names}
+
+
+def plugin_for_alias(alias: str):
+    """
+    Looks up the manifest entry of the endstation resolved from ``alias``, without importing it.
+    :param alias:
+    :return: The entry, or None if no plugin in the manifest provides the alias
+    """
+    return _MANIFEST_BY_NAME.get(alias)
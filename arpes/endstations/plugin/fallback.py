@@ -1,6 +1,8 @@
+import os.path
 import warnings
 
 from arpes.endstations import EndstationBase, resolve_endstation
+from arpes.endstations.plugin import plugin_for_alias
 
 __all__ = ('FallbackEndstation',)
 
@@ -32,10 +34,13 @@ class FallbackEndstation(EndstationBase):
 
     @classmethod
     def determine_associated_loader(cls, file, scan_desc):
-        import arpes.config  # pylint: disable=redefined-outer-name
-        arpes.config.load_plugins()
-
+        suffix = os.path.splitext(str(file))[1]
         for location in cls.ATTEMPT_ORDER:
+            entry = plugin_for_alias(location)
+            if suffix and entry is not None and suffix not in entry.extensions:
+                # avoids importing plugins which cannot accept the file
+                continue
+
             try:
                 endstation_cls = resolve_endstation(False, location=location)
                 if endstation_cls.is_file_accepted(file, scan_desc):
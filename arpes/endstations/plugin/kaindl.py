@@ -58,9 +58,9 @@ class KaindlEndstation(HemisphericalEndstation, SESEndstation):
         p = Path(original_data_loc)
         return find_kaindl_files_associated(p)
 
-    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None):
+    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None, preallocate=None):
         if len(frames) < 2:
-            return super().concatenate_frames(frames)
+            return super().concatenate_frames(frames, preallocate=preallocate)
 
         # determine which axis to stitch them together along, and then do this
         original_filename = scan_desc.get('path', scan_desc.get('file'))
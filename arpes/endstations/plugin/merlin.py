@@ -88,9 +88,9 @@ class BL403ARPESEndstation(SynchrotronEndstation, HemisphericalEndstation, SESEn
         }
     }
 
-    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None):
+    def concatenate_frames(self, frames=typing.List[xr.Dataset], scan_desc: dict = None, preallocate=None):
         if len(frames) < 2:
-            return super().concatenate_frames(frames)
+            return super().concatenate_frames(frames, preallocate=preallocate)
 
         # determine which axis to stitch them together along, and then do this
         original_filename = scan_desc.get('file', scan_desc.get('path'))
@@ -129,7 +129,7 @@ class BL403ARPESEndstation(SynchrotronEndstation, HemisphericalEndstation, SESEn
             if internal_match.groups():
                 return xr.merge(frames)
 
-        return super().concatenate_frames(frames)
+        return super().concatenate_frames(frames, preallocate=preallocate)
 
     def load_single_frame(self, frame_path: str = None, scan_desc: dict = None, **kwargs):
         import copy
@@ -1,5 +1,7 @@
 from .fit_models import *
 from .utilities import *
+from .batch import *
+from .result_store import *
 
 # evaluates our monkeypatching code
 from .lmfit_html_repr import *
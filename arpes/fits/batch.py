@@ -0,0 +1,621 @@
+"""
+Vectorised curve fitting of many independent marginals at once.
+
+`broadcast_model` normally performs one `lmfit` fit per marginal. For models built only from
+elementwise functions (`lorentzian`, `gaussian`, `fermi_dirac`, `affine_bkg`, ...) every marginal
+can instead be evaluated at the same time by broadcasting parameter vectors of shape ``(n_fits, 1)``
+against the shared independent coordinate of shape ``(1, n_points)``. This module uses that to run a
+Levenberg-Marquardt minimisation on all fits together: Jacobians are stacked into an array of shape
+``(n_fits, n_points, n_params)`` and the damped normal equations are solved for every fit in a
+single batched linear solve.
+
+Parameter bounds are treated with the same MINUIT style transformation that `lmfit` uses, and
+uncertainties are scaled by the reduced chi-square, so results closely match those of the default
+backend. Each fit is reported as a `BatchFitResult`, which exposes ``params``, ``eval``, ``residual``
+and friends in the same way as `lmfit.model.ModelResult`.
+"""
+
+import operator
+from collections import OrderedDict, namedtuple
+
+import lmfit as lf
+import numpy as np
+from asteval import Interpreter
+from scipy.special import erfc, wofz  # pylint: disable=no-name-in-module
+from tqdm import tqdm_notebook
+
+from arpes.fits import fit_models
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = ('BatchFitResult', 'BatchParameter', 'fit_batch', 'fit_batch_arrays', 'supports_batch_fit',)
+
+BatchParameter = namedtuple('BatchParameter', ['name', 'value', 'stderr', 'min', 'max', 'vary', 'expr'])
+
+# Roughly the number of bytes of stacked Jacobian we are willing to hold at once
+DEFAULT_CHUNK_BYTES = 64 * 1024 ** 2
+
+_TINY = np.finfo(np.float64).eps
+_S2PI = np.sqrt(2 * np.pi)
+_S2 = np.sqrt(2.0)
+
+_OPERATORS = (operator.add, operator.sub, operator.mul, operator.truediv,)
+
+
+def _lmfit_gaussian(x, amplitude=1.0, center=0.0, sigma=1.0):
+    return ((amplitude / np.maximum(_TINY, _S2PI * sigma)) *
+            np.exp(-(1.0 * x - center) ** 2 / np.maximum(_TINY, 2 * sigma ** 2)))
+
+
+def _lmfit_lorentzian(x, amplitude=1.0, center=0.0, sigma=1.0):
+    return ((amplitude / (1 + ((1.0 * x - center) / np.maximum(_TINY, sigma)) ** 2)) /
+            np.maximum(_TINY, np.pi * sigma))
+
+
+def _lmfit_voigt(x, amplitude=1.0, center=0.0, sigma=1.0, gamma=None):
+    if gamma is None:
+        gamma = sigma
+    z = (x - center + 1j * gamma) / np.maximum(_TINY, sigma * _S2)
+    return amplitude * wofz(z).real / np.maximum(_TINY, sigma * _S2PI)
+
+
+def _lmfit_constant(x, c=0.0):
+    return c * np.ones_like(x)
+
+
+def _lmfit_linear(x, slope=1.0, intercept=0.0):
+    return slope * x + intercept
+
+
+def _function_key(f: Callable) -> str:
+    return '{}.{}'.format(getattr(f, '__module__', None), getattr(f, '__qualname__', None))
+
+
+# Functions which broadcast elementwise over their arguments and can therefore be evaluated for
+# many parameter sets at once. Functions which reduce over x or convolve (`gstepb`,
+# `affine_broadened_fd`, ...) are deliberately absent.
+BATCHED_FUNCTIONS = {_function_key(f): f for f in (
+    fit_models.affine_bkg,
+    fit_models.quadratic,
+    fit_models.gstep,
+    fit_models.gstep_stdev,
+    fit_models.exponential_decay_c,
+    fit_models.lorentzian,
+    fit_models.twolorentzian,
+    fit_models.fermi_dirac,
+    fit_models.fermi_dirac_bkg,
+    fit_models.fermi_dirac_affine,
+    fit_models.band_edge_bkg,
+    fit_models.lorentzian_affine,
+    fit_models.gaussian,
+    fit_models.twogaussian,
+    fit_models.twolorentzian_gstep,
+    fit_models.log_renormalization,
+    fit_models.fermi_velocity_renormalization_mfl,
+    fit_models.dirac_dispersion,
+)}
+
+BATCHED_FUNCTIONS.update({
+    'lmfit.lineshapes.gaussian': _lmfit_gaussian,
+    'lmfit.lineshapes.lorentzian': _lmfit_lorentzian,
+    'lmfit.lineshapes.voigt': _lmfit_voigt,
+    'lmfit.lineshapes.linear': _lmfit_linear,
+    'lmfit.models.ConstantModel.__init__.<locals>.constant': _lmfit_constant,
+})
+
+
+class BatchFitResult:
+    """
+    The result of a single fit performed by `fit_batch`. Mirrors the parts of the
+    `lmfit.model.ModelResult` interface used throughout PyARPES.
+
+    ``params`` is a real `lmfit.Parameters`, built the first time it is used since building one per fit
+    costs more than the fit itself, while ``batch_params`` holds the same fitted values as `BatchParameter`s.
+    """
+    def __init__(self, model: lf.Model, params: Dict[str, BatchParameter], x: np.ndarray,
+                 data: np.ndarray, weights: Optional[np.ndarray], best_fit: np.ndarray, residual: np.ndarray,
+                 covar: Optional[np.ndarray], var_names: List[str], chisqr: float, nfev: int, success: bool,
+                 init_values: Dict[str, float]):
+        self.model = model
+        self.batch_params = params
+        self._params = None
+        self.data = data
+        self.weights = weights
+        self.best_fit = best_fit
+        self.residual = residual
+        self.covar = covar
+        self.var_names = var_names
+        self.init_values = init_values
+        self.independent = {model.independent_vars[0]: x}
+        self.independent_order = None
+
+        self.chisqr = chisqr
+        self.nfev = nfev
+        self.success = success
+        self.ndata = int(np.isfinite(residual).sum())
+        self.nvarys = len(var_names)
+        self.nfree = self.ndata - self.nvarys
+        self.redchi = chisqr / max(1, self.nfree)
+        self.errorbars = covar is not None and bool(np.all(np.isfinite(covar)))
+        self.method = 'batch_leastsq'
+        self.message = 'Fit succeeded.' if success else 'Fit did not converge.'
+
+    @property
+    def params(self) -> lf.Parameters:
+        if self._params is None:
+            params = lf.Parameters()
+            params.add_many(*[(p.name, p.value, p.vary, p.min, p.max, p.expr) for p in self.batch_params.values()])
+            for p in self.batch_params.values():
+                params[p.name].stderr = None if p.stderr is None or np.isnan(p.stderr) else float(p.stderr)
+
+            self._params = params
+
+        return self._params
+
+    @params.setter
+    def params(self, params: lf.Parameters):
+        self._params = params
+
+    @property
+    def best_values(self) -> Dict[str, float]:
+        return {name: p.value for name, p in self.batch_params.items() if p.expr is None}
+
+    def eval(self, params=None, **kwargs) -> np.ndarray:
+        return self.model.eval(params or self.params, **{**self.independent, **kwargs})
+
+    def eval_components(self, params=None, **kwargs) -> Dict[str, np.ndarray]:
+        return self.model.eval_components(params=params or self.params, **{**self.independent, **kwargs})
+
+    def __repr__(self):
+        return '<BatchFitResult: {}>'.format(self.model.name)
+
+
+def supports_batch_fit(model: lf.Model) -> bool:
+    """
+    Determines whether a model can be evaluated for many parameter sets at once,
+    i.e. whether it is built from elementwise functions joined by arithmetic operators.
+    :param model:
+    :return:
+    """
+    if getattr(model, 'n_dims', 1) != 1:
+        return False
+
+    if isinstance(model, lf.CompositeModel):
+        return model.op in _OPERATORS and supports_batch_fit(model.left) and supports_batch_fit(model.right)
+
+    return len(model.independent_vars) == 1 and _function_key(model.func) in BATCHED_FUNCTIONS
+
+
+def _evaluate(model: lf.Model, x: np.ndarray, values: Dict[str, np.ndarray]) -> np.ndarray:
+    if isinstance(model, lf.CompositeModel):
+        return model.op(_evaluate(model.left, x, values), _evaluate(model.right, x, values))
+
+    kwargs = dict(model.opts)
+    for name in model.param_names:
+        root_name = model._strip_prefix(name)
+        if root_name in model._func_allargs:
+            kwargs[root_name] = values[name][:, None]
+
+    kwargs[model.independent_vars[0]] = x[None, :]
+    return BATCHED_FUNCTIONS[_function_key(model.func)](**kwargs)
+
+
+def _expression_interpreter() -> Interpreter:
+    interpreter = Interpreter()
+
+    # constraint expressions are written for scalars, make the reductions elementwise
+    interpreter.symtable['max'] = np.maximum
+    interpreter.symtable['min'] = np.minimum
+    interpreter.symtable['erfc'] = erfc
+    return interpreter
+
+
+def _evaluate_expressions(interpreter: Interpreter, exprs: Dict[str, str], values: Dict[str, np.ndarray],
+                          n: int) -> None:
+    pending = dict(exprs)
+    while pending:
+        progressed = False
+        for name, expr in list(pending.items()):
+            interpreter.symtable.update(values)
+            result = interpreter.eval(expr, show_errors=False)
+            if interpreter.error:
+                interpreter.error = []
+                continue
+
+            values[name] = np.broadcast_to(np.asarray(result, dtype=np.float64), (n,)).copy()
+            del pending[name]
+            progressed = True
+
+        if not progressed:
+            raise ValueError('Could not evaluate constraint expressions for {}'.format(list(pending.keys())))
+
+
+def _to_internal(value: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """
+    MINUIT style transformation from bounded to unbounded parameters, as used in `lmfit`.
+    """
+    value = np.clip(value, lower, upper)
+    has_lower, has_upper = np.isfinite(lower), np.isfinite(upper)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        both = np.arcsin(np.clip(2 * (value - lower) / (upper - lower) - 1, -1, 1))
+        lower_only = np.sqrt((value - lower + 1.0) ** 2 - 1)
+        upper_only = np.sqrt((upper - value + 1.0) ** 2 - 1)
+
+    return np.where(has_lower & has_upper, both,
+                    np.where(has_lower, lower_only, np.where(has_upper, upper_only, value)))
+
+
+def _from_internal(internal: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    has_lower, has_upper = np.isfinite(lower), np.isfinite(upper)
+    with np.errstate(invalid='ignore'):
+        both = lower + (np.sin(internal) + 1) * (upper - lower) / 2.0
+        lower_only = lower - 1.0 + np.sqrt(internal ** 2 + 1)
+        upper_only = upper + 1 - np.sqrt(internal ** 2 + 1)
+
+    return np.where(has_lower & has_upper, both,
+                    np.where(has_lower, lower_only, np.where(has_upper, upper_only, internal)))
+
+
+def _gradient_scale(internal: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    has_lower, has_upper = np.isfinite(lower), np.isfinite(upper)
+    with np.errstate(invalid='ignore'):
+        both = np.cos(internal) * (upper - lower) / 2.0
+        one_sided = internal / np.sqrt(internal ** 2 + 1)
+
+    return np.where(has_lower & has_upper, both,
+                    np.where(has_lower, one_sided, np.where(has_upper, -one_sided, 1.0)))
+
+
+def _solve(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    try:
+        return np.linalg.solve(a, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return np.einsum('npq,nq->np', np.linalg.pinv(a), b)
+
+
+def _invert(a: np.ndarray) -> np.ndarray:
+    try:
+        return np.linalg.inv(a)
+    except np.linalg.LinAlgError:
+        inverted = np.full(a.shape, np.nan)
+        for i, single in enumerate(a):
+            try:
+                inverted[i] = np.linalg.inv(single)
+            except np.linalg.LinAlgError:
+                pass
+
+        return inverted
+
+
+def _jacobian(residual: Callable, theta: np.ndarray, rows: np.ndarray, r0: np.ndarray) -> np.ndarray:
+    """
+    Forward difference Jacobian of the residuals with respect to the internal parameters,
+    stacked over fits: the result has shape (n_fits, n_points, n_params).
+    """
+    # parameters which pass through zero (peak centers, backgrounds) still need a usable step
+    step = np.sqrt(_TINY) * np.maximum(np.abs(theta), 1e-3)
+
+    jacobian = np.empty(r0.shape + (theta.shape[1],))
+    for j in range(theta.shape[1]):
+        shifted = theta.copy()
+        shifted[:, j] += step[:, j]
+        jacobian[:, :, j] = (residual(shifted, rows) - r0) / step[:, j, None]
+
+    return jacobian
+
+
+def _levenberg_marquardt(residual: Callable, theta: np.ndarray, max_nfev: int, ftol: float = 1e-7,
+                         xtol: float = 1e-7) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Minimises the sum of squared residuals independently for each row of ``theta``.
+    :param residual: Maps (internal parameters of shape (n, P), row indices) to residuals of shape (n, M)
+    :param theta: Initial internal parameters, shape (n_fits, P)
+    :return: (parameters, residuals, Jacobian at the solution, function evaluation counts, success flags)
+    """
+    n_fits, n_params = theta.shape
+    rows = np.arange(n_fits)
+
+    r = residual(theta, rows)
+    cost = np.sum(r ** 2, axis=1)
+    jacobian = _jacobian(residual, theta, rows, r)
+    nfev = np.full(n_fits, 1 + n_params)
+    damping = np.full(n_fits, 1e-3)
+
+    success = np.isfinite(cost)
+    active = success.copy()
+    eye = np.eye(n_params)
+
+    while active.any():
+        idx = np.flatnonzero(active)
+        j, ri = jacobian[idx], r[idx]
+
+        jtj = np.einsum('nmp,nmq->npq', j, j)
+        gradient = np.einsum('nmp,nm->np', j, ri)
+        diagonal = np.maximum(np.diagonal(jtj, axis1=1, axis2=2), 1e-12)
+
+        step = _solve(jtj + damping[idx, None, None] * diagonal[:, :, None] * eye, -gradient)
+        trial = theta[idx] + step
+        r_trial = residual(trial, idx)
+        cost_trial = np.sum(r_trial ** 2, axis=1)
+        nfev[idx] += 1
+
+        improved = np.isfinite(cost_trial) & (cost_trial < cost[idx])
+        small_reduction = improved & ((cost[idx] - cost_trial) <= ftol * cost[idx])
+        small_step = np.all(np.abs(step) <= xtol * (np.abs(theta[idx]) + xtol), axis=1)
+
+        accepted = idx[improved]
+        theta[accepted] = trial[improved]
+        r[accepted] = r_trial[improved]
+        cost[accepted] = cost_trial[improved]
+        damping[accepted] = np.maximum(damping[accepted] * 0.1, 1e-12)
+        damping[idx[~improved]] *= 10
+
+        if len(accepted):
+            jacobian[accepted] = _jacobian(residual, theta[accepted], accepted, r[accepted])
+            nfev[accepted] += n_params
+
+        stalled = damping[idx] > 1e12
+        exhausted = nfev[idx] >= max_nfev
+        success[idx[exhausted & ~(small_reduction | small_step | stalled)]] = False
+        active[idx[small_reduction | small_step | stalled | exhausted]] = False
+
+    return theta, r, jacobian, nfev, success
+
+
+def _initial_parameters(model: lf.Model, x: np.ndarray, data: np.ndarray, params: Dict[str, Dict[str, Any]],
+                        guess: bool) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, Dict[str, str],
+                                              Dict[str, bool], np.ndarray]:
+    """
+    Collects initial values, bounds, and constraints for each fit into dense arrays.
+    Guesses, if requested, are made per fit on the finite points of each marginal, after which
+    parameter hints are applied exactly as `XModelMixin.guess_fit` does.
+    """
+    template = model.make_params()
+    names = list(template.keys())
+    n_fits = data.shape[0]
+
+    values = np.tile([template[name].value for name in names], (n_fits, 1)).astype(np.float64)
+    lower = np.tile([template[name].min for name in names], (n_fits, 1)).astype(np.float64)
+    upper = np.tile([template[name].max for name in names], (n_fits, 1)).astype(np.float64)
+    exprs = {name: template[name].expr for name in names if template[name].expr}
+    vary = {name: bool(template[name].vary) and name not in exprs for name in names}
+    failed = np.zeros(n_fits, dtype=bool)
+
+    if guess:
+        for i, row in enumerate(data):
+            mask = np.isfinite(row)
+            try:
+                guessed = model.guess(row[mask], x=x[mask])
+            except Exception:
+                failed[i] = True
+                continue
+
+            for k, name in enumerate(names):
+                values[i, k] = guessed[name].value
+                lower[i, k] = guessed[name].min
+                upper[i, k] = guessed[name].max
+
+    for name, hints in params.items():
+        if isinstance(hints, lf.Parameter):
+            hints = {'value': hints.value, 'min': hints.min, 'max': hints.max, 'vary': hints.vary,
+                     'expr': hints.expr}
+
+        if not isinstance(hints, dict):
+            continue
+
+        k = names.index(name)
+        for field, target in (('value', values), ('min', lower), ('max', upper)):
+            if hints.get(field) is not None:
+                target[:, k] = hints[field]
+
+        if hints.get('vary') is not None:
+            vary[name] = bool(np.all(hints['vary']))
+
+        if hints.get('expr') is not None:
+            if hints['expr']:
+                exprs[name] = hints['expr']
+                vary[name] = False
+            else:
+                exprs.pop(name, None)
+
+    lower[np.isnan(lower)] = -np.inf
+    upper[np.isnan(upper)] = np.inf
+    values = np.clip(values, lower, upper)
+    return names, values, lower, upper, exprs, vary, failed
+
+
+def _function_arguments(model: lf.Model) -> set:
+    if isinstance(model, lf.CompositeModel):
+        return _function_arguments(model.left) | _function_arguments(model.right)
+
+    return {name for name in model.param_names if model._strip_prefix(name) in model._func_allargs}
+
+
+def _fit_chunk(model: lf.Model, x: np.ndarray, data: np.ndarray, weights: Optional[np.ndarray],
+               names: List[str], values: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+               exprs: Dict[str, str], vary: Dict[str, bool], max_nfev: int) -> Dict[str, np.ndarray]:
+    n_fits = data.shape[0]
+    interpreter = _expression_interpreter()
+    arguments = _function_arguments(model)
+
+    var_index = [k for k, name in enumerate(names) if vary[name]]
+    var_lower, var_upper = lower[:, var_index], upper[:, var_index]
+
+    mask = np.isfinite(data)
+    target = np.where(mask, data, 0)
+    scale = np.where(mask, 1.0 if weights is None else weights, 0)
+
+    def parameter_values(external: np.ndarray, rows: np.ndarray, derived: bool = False) -> Dict[str, np.ndarray]:
+        current = {name: values[rows, k] for k, name in enumerate(names)}
+        for i, k in enumerate(var_index):
+            current[names[k]] = external[:, i]
+
+        needed = exprs if derived else {k: v for k, v in exprs.items() if k in arguments}
+        _evaluate_expressions(interpreter, needed, current, len(rows))
+        return current
+
+    def residual(theta: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        external = _from_internal(theta, var_lower[rows], var_upper[rows])
+        evaluated = np.broadcast_to(_evaluate(model, x, parameter_values(external, rows)), (len(rows), len(x)))
+        return (evaluated - target[rows]) * scale[rows]
+
+    theta = _to_internal(values[:, var_index], var_lower, var_upper)
+    max_nfev = max_nfev or 2000 * (len(var_index) + 1)
+    with np.errstate(all='ignore'):
+        theta, r, jacobian, nfev, success = _levenberg_marquardt(residual, theta, max_nfev)
+
+        rows = np.arange(n_fits)
+        external = _from_internal(theta, var_lower, var_upper)
+        final = parameter_values(external, rows, derived=True)
+        best_fit = np.broadcast_to(_evaluate(model, x, final), data.shape).copy()
+
+        chisqr = np.sum(r ** 2, axis=1)
+        nfree = np.maximum(mask.sum(axis=1) - len(var_index), 1)
+        grad = _gradient_scale(theta, var_lower, var_upper)
+        covar = (_invert(np.einsum('nmp,nmq->npq', jacobian, jacobian)) * grad[:, :, None] * grad[:, None, :] *
+                 (chisqr / nfree)[:, None, None])
+
+        stderr = np.full((n_fits, len(names)), np.nan)
+        variances = np.diagonal(covar, axis1=1, axis2=2)
+        for i, k in enumerate(var_index):
+            stderr[:, k] = np.sqrt(variances[:, i])
+
+        # propagate uncertainties to constrained parameters through a linearisation of their expressions
+        if exprs and var_index:
+            gradients = np.zeros((n_fits, len(exprs), len(var_index)))
+            for i in range(len(var_index)):
+                h = np.sqrt(_TINY) * np.maximum(np.abs(external[:, i]), 1)
+                shifted = external.copy()
+                shifted[:, i] += h
+                perturbed = parameter_values(shifted, rows, derived=True)
+                for e, name in enumerate(exprs):
+                    gradients[:, e, i] = (perturbed[name] - final[name]) / h
+
+            for e, name in enumerate(exprs):
+                g = gradients[:, e]
+                stderr[:, names.index(name)] = np.sqrt(np.einsum('np,npq,nq->n', g, covar, g))
+
+    residual_values = np.where(mask, (best_fit - data) * (1 if weights is None else weights), np.nan)
+    return {
+        'values': np.stack([final[name] for name in names], axis=1),
+        'stderr': stderr,
+        'covar': covar,
+        'chisqr': chisqr,
+        'nfev': nfev,
+        'success': success & np.all(np.isfinite(external), axis=1),
+        'best_fit': best_fit,
+        'residual': residual_values,
+    }
+
+
+def fit_batch_arrays(model: lf.Model, x: np.ndarray, data: np.ndarray, params: Dict[str, Dict[str, Any]] = None,
+                     weights: Optional[np.ndarray] = None, guess: bool = True, chunk_size: Optional[int] = None,
+                     max_nfev: Optional[int] = None, progress: bool = False) -> Dict[str, Any]:
+    """
+    Fits ``model`` independently to every row of ``data`` using a vectorised Levenberg-Marquardt,
+    collecting the results into dense arrays with one row per fit.
+
+    :param model: An lmfit model for which `supports_batch_fit` is True
+    :param x: The independent coordinate shared by all fits, shape (n_points,)
+    :param data: The data to fit, shape (n_fits, n_points). NaN entries are excluded from the fits.
+    :param params: Parameter hints as in `broadcast_model`. Values, bounds, and ``vary`` may be scalars
+    or arrays with one entry per fit.
+    :param weights: Optional weights with the same shape as ``data``
+    :param guess: Whether to use `model.guess` on each marginal to seed the fit
+    :param chunk_size: Number of fits solved together, by default chosen to bound memory use
+    :param max_nfev: Maximum number of function evaluations per fit
+    :param progress: Whether to display a progress bar over chunks
+    :return: A dictionary with parameter ``names`` and arrays ``values``, ``stderr``, ``covar`` (over all
+    parameters, NaN for those which were not varied), ``chisqr``, ``redchi``, ``nfev``, ``success``,
+    ``best_fit``, and ``residual``, along with the initial ``init_values`` and bounds of each fit.
+    Fits whose guess failed are NaN throughout and flagged in ``failed``.
+    """
+    if not supports_batch_fit(model):
+        raise ValueError('{} cannot be fit in batch, it is not composed of elementwise functions.'.format(model))
+
+    x = np.asarray(x, dtype=np.float64)
+    data = np.atleast_2d(np.asarray(data, dtype=np.float64))
+    if weights is not None:
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), data.shape)
+
+    names, values, lower, upper, exprs, vary, failed = _initial_parameters(model, x, data, params or {}, guess)
+    n_fits, n_points = data.shape
+    n_params = len(names)
+    var_index = [k for k, name in enumerate(names) if vary[name]]
+
+    if chunk_size is None:
+        chunk_size = max(1, DEFAULT_CHUNK_BYTES // (8 * n_points * (len(var_index) + 2)))
+
+    fits = {
+        'names': names,
+        'var_names': [names[k] for k in var_index],
+        'exprs': exprs,
+        'vary': vary,
+        'x': x,
+        'data': data,
+        'weights': weights,
+        'init_values': values,
+        'min': lower,
+        'max': upper,
+        'failed': failed,
+        'values': np.full((n_fits, n_params), np.nan),
+        'stderr': np.full((n_fits, n_params), np.nan),
+        'covar': np.full((n_fits, n_params, n_params), np.nan),
+        'chisqr': np.full(n_fits, np.nan),
+        'redchi': np.full(n_fits, np.nan),
+        'nfev': np.zeros(n_fits, dtype=np.int64),
+        'success': np.zeros(n_fits, dtype=bool),
+        'best_fit': np.full(data.shape, np.nan),
+        'residual': np.full(data.shape, np.nan),
+    }
+
+    starts = range(0, n_fits, chunk_size)
+    if progress:
+        starts = tqdm_notebook(starts, desc='Fitting', total=len(starts))
+
+    for start in starts:
+        rows = np.arange(start, min(start + chunk_size, n_fits))
+        rows = rows[~failed[rows]]
+        if not len(rows):
+            continue
+
+        chunk = _fit_chunk(model, x, data[rows], None if weights is None else weights[rows], names,
+                           values[rows], lower[rows], upper[rows], exprs, vary, max_nfev)
+
+        for k in ('values', 'stderr', 'chisqr', 'nfev', 'success', 'best_fit', 'residual'):
+            fits[k][rows] = chunk[k]
+
+        fits['covar'][np.ix_(rows, var_index, var_index)] = chunk['covar']
+        fits['redchi'][rows] = chunk['chisqr'] / np.maximum(
+            np.isfinite(chunk['residual']).sum(axis=1) - len(var_index), 1)
+
+    return fits
+
+
+def fit_batch(model: lf.Model, x: np.ndarray, data: np.ndarray, params: Dict[str, Dict[str, Any]] = None,
+              weights: Optional[np.ndarray] = None, guess: bool = True, chunk_size: Optional[int] = None,
+              max_nfev: Optional[int] = None, progress: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fits ``model`` independently to every row of ``data`` using a vectorised Levenberg-Marquardt.
+    Arguments are as for `fit_batch_arrays`.
+    :return: (object array of `BatchFitResult` or None for failed guesses, best fits, residuals)
+    """
+    fits = fit_batch_arrays(model, x, data, params=params, weights=weights, guess=guess, chunk_size=chunk_size,
+                            max_nfev=max_nfev, progress=progress)
+
+    names, vary, exprs, weights = fits['names'], fits['vary'], fits['exprs'], fits['weights']
+    var_index = [names.index(name) for name in fits['var_names']]
+
+    results = np.empty(len(fits['failed']), dtype=object)
+    for row in np.flatnonzero(~fits['failed']):
+        fit_params = OrderedDict(
+            (name, BatchParameter(name, fits['values'][row, k], fits['stderr'][row, k], fits['min'][row, k],
+                                  fits['max'][row, k], vary[name], exprs.get(name)))
+            for k, name in enumerate(names))
+
+        results[row] = BatchFitResult(
+            model, fit_params, fits['x'], fits['data'][row], None if weights is None else weights[row],
+            fits['best_fit'][row], fits['residual'][row], fits['covar'][row][np.ix_(var_index, var_index)],
+            fits['var_names'], float(fits['chisqr'][row]), int(fits['nfev'][row]), bool(fits['success'][row]),
+            {name: fits['init_values'][row, k] for k, name in enumerate(names)})
+
+    return results, fits['best_fit'], fits['residual']
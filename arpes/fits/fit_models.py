@@ -121,7 +121,9 @@ class XModelMixin(lf.Model):
                         guessed_params[self.prefix + k].set(**v)
                     else:
                         guessed_params[k].set(**v)
-            guessed_params.update({self.prefix + k: v for k, v in params.items() if isinstance(v, lf.model.Parameter)})
+            for k, v in params.items():
+                if isinstance(v, lf.model.Parameter):
+                    guessed_params[self.prefix + k] = v
 
         result = None
         try:
@@ -136,6 +138,17 @@ class XModelMixin(lf.Model):
         finally:
             return result
 
+    def __reduce_ex__(self, protocol):
+        """
+        lmfit builds composite models around a locally defined function, which cannot be pickled.
+        Composites are instead pickled by their components, so that models and fit results can
+        be sent to worker processes.
+        """
+        if isinstance(self, lf.CompositeModel):
+            return type(self), (self.left, self.right, self.op), {'n_dims': self.n_dims}
+
+        return super().__reduce_ex__(protocol)
+
     def xguess(self, data, **kwargs):
         x = kwargs.pop('x', None)
 
@@ -0,0 +1,278 @@
+"""
+A compact, array backed representation of the results of `broadcast_model`.
+
+By default `broadcast_model` keeps one `lmfit.model.ModelResult` per marginal in an object array.
+These are convenient to inspect, but for large fits they use a lot of memory, are slow to pickle,
+and cannot be written to netCDF. With ``broadcast_model(..., compact=True)`` the ``results`` are
+instead a float DataArray of parameter values with an additional ``param`` dimension. The
+uncertainties and fit statistics are attached to it as coordinates:
+
+- ``stderr``: parameter uncertainties, with the same dimensions as the values
+- ``chisqr``, ``redchi``, ``nfev``, ``success``: one entry per marginal
+
+and the returned Dataset additionally contains the covariance of the parameters as ``covar``.
+The model is recorded in the ``fit_model`` attribute as a JSON description, so that full
+`ModelResult` instances can be rebuilt for individual marginals, or for all of them with
+`expand_results`, whenever they are needed.
+
+The ``.F`` accessors work on both representations.
+"""
+
+import functools
+import importlib
+import json
+import operator
+
+import lmfit as lf
+import numpy as np
+
+import xarray as xr
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = ('is_compact_results', 'compact_results', 'expand_results', 'rebuild_model_result',
+           'describe_model', 'model_from_description',)
+
+# Coordinates of a compact results array which are not dimensions of the broadcast
+COMPACT_RESULT_COORDS = ('param', 'stderr', 'chisqr', 'redchi', 'nfev', 'success',)
+
+_OPERATOR_NAMES = ('add', 'sub', 'mul', 'truediv',)
+
+
+def _model_description(model: lf.Model) -> Dict[str, Any]:
+    if isinstance(model, lf.CompositeModel):
+        if model.op.__name__ not in _OPERATOR_NAMES:
+            raise ValueError('Cannot describe a model combined with {}'.format(model.op.__name__))
+
+        return {
+            'op': model.op.__name__,
+            'left': _model_description(model.left),
+            'right': _model_description(model.right),
+        }
+
+    return {
+        'model': '{}.{}'.format(type(model).__module__, type(model).__qualname__),
+        'prefix': model.prefix,
+        'nan_policy': model.nan_policy,
+    }
+
+
+def describe_model(model: lf.Model) -> str:
+    """
+    Describes a model built from model classes and arithmetic operators as a JSON string,
+    which `model_from_description` can use to build the model again. Models which cannot be
+    described this way are described by the empty string.
+    :param model:
+    :return:
+    """
+    try:
+        return json.dumps(_model_description(model))
+    except ValueError:
+        return ''
+
+
+def _build_model(description: Dict[str, Any]) -> lf.Model:
+    if 'op' in description:
+        return getattr(operator, description['op'])(_build_model(description['left']),
+                                                    _build_model(description['right']))
+
+    module_name, class_name = description['model'].rsplit('.', 1)
+    model_cls = getattr(importlib.import_module(module_name), class_name)
+    return model_cls(prefix=description['prefix'], nan_policy=description['nan_policy'])
+
+
+@functools.lru_cache(maxsize=32)
+def model_from_description(description: str) -> lf.Model:
+    if not description:
+        raise ValueError('This fit does not record its model, so its results cannot be rebuilt.')
+
+    return _build_model(json.loads(description))
+
+
+def is_compact_results(arr: xr.DataArray) -> bool:
+    return isinstance(arr, xr.DataArray) and 'param' in arr.dims and arr.dtype != object
+
+
+def summarize_result(result, names: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float, float, int, bool]:
+    """
+    Flattens a single fit result, either an `lmfit.model.ModelResult` or a `BatchFitResult`, into
+    dense arrays over ``names``.
+    :return: (values, stderr, covariance, chisqr, redchi, nfev, success)
+    """
+    n_params = len(names)
+    values, stderr = np.full(n_params, np.nan), np.full(n_params, np.nan)
+    covar = np.full((n_params, n_params), np.nan)
+
+    if result is None:
+        return values, stderr, covar, np.nan, np.nan, 0, False
+
+    # the parameters of batch fits are read without building an lmfit.Parameters for each of them
+    params = getattr(result, 'batch_params', None) or result.params
+    for k, name in enumerate(names):
+        param = params.get(name)
+        if param is None:
+            continue
+
+        values[k] = param.value
+        stderr[k] = np.nan if param.stderr is None else param.stderr
+
+    if getattr(result, 'covar', None) is not None:
+        var_index = [names.index(name) for name in result.var_names]
+        covar[np.ix_(var_index, var_index)] = result.covar
+
+    return values, stderr, covar, result.chisqr, result.redchi, result.nfev, bool(result.success)
+
+
+def build_compact_results(template: xr.DataArray, names: List[str], values: np.ndarray, stderr: np.ndarray,
+                          covar: np.ndarray, chisqr: np.ndarray, redchi: np.ndarray, nfev: np.ndarray,
+                          success: np.ndarray, model: lf.Model, fit_dims: List[str]) -> Tuple[xr.DataArray,
+                                                                                             xr.DataArray]:
+    """
+    Assembles the compact results and covariance arrays from dense arrays with one row per marginal of
+    ``template``, in the order of ``template.values.ravel()``.
+    :return: (results, covariance)
+    """
+    dims = list(template.dims)
+    shape = template.shape
+    coords = {d: template.coords[d] for d in dims}
+    n_params = len(names)
+
+    results = xr.DataArray(
+        values.reshape(shape + (n_params,)),
+        coords={
+            **coords,
+            'param': names,
+            'stderr': (dims + ['param'], stderr.reshape(shape + (n_params,))),
+            'chisqr': (dims, np.asarray(chisqr, dtype=np.float64).reshape(shape)),
+            'redchi': (dims, np.asarray(redchi, dtype=np.float64).reshape(shape)),
+            'nfev': (dims, np.asarray(nfev, dtype=np.int64).reshape(shape)),
+            'success': (dims, np.asarray(success, dtype=bool).reshape(shape)),
+        },
+        dims=dims + ['param'],
+        attrs={'fit_model': describe_model(model), 'fit_dims': ','.join(fit_dims)},
+    )
+
+    covariance = xr.DataArray(
+        covar.reshape(shape + (n_params, n_params)),
+        coords={**coords, 'param': names, 'covar_param': names},
+        dims=dims + ['param', 'covar_param'],
+    )
+    return results, covariance
+
+
+def compact_results(results: xr.DataArray, model: Optional[lf.Model] = None,
+                    fit_dims: Optional[List[str]] = None) -> Tuple[xr.DataArray, xr.DataArray]:
+    """
+    Converts an object array of fit results into the compact representation.
+    :param results: An array of `lmfit.model.ModelResult` (or `BatchFitResult`) instances
+    :param model: The model which was fit, by default that of the first successful fit
+    :param fit_dims: The dimensions along which each fit was performed
+    :return: (results, covariance)
+    """
+    flat = results.values.ravel()
+    first = next((r for r in flat if r is not None), None)
+    if model is None:
+        if first is None:
+            raise ValueError('Cannot determine the model of a fit without any results.')
+        model = first.model
+
+    if fit_dims is None:
+        fit_dims = list(getattr(first, 'independent_order', None) or []) if first is not None else []
+
+    names = list(model.make_params().keys())
+    summaries = [summarize_result(r, names) for r in flat]
+    values, stderr, covar, chisqr, redchi, nfev, success = [np.array(v) for v in zip(*summaries)]
+    return build_compact_results(results, names, values, stderr, covar, chisqr, redchi, nfev, success,
+                                 model, fit_dims)
+
+
+def rebuild_model_result(results: xr.DataArray, data: xr.DataArray, covariance: Optional[xr.DataArray] = None,
+                         weights: Optional[xr.DataArray] = None, **coords) -> Optional[lf.model.ModelResult]:
+    """
+    Rebuilds the `lmfit.model.ModelResult` of a single marginal from compact results.
+    :param results: Compact results, as produced by `broadcast_model(..., compact=True)`
+    :param data: The data which was fit
+    :param covariance: The ``covar`` variable of the fit Dataset, if available
+    :param weights: The weights used in the fit, if any
+    :param coords: The coordinates of the marginal along the broadcast dimensions
+    :return: The rebuilt result, or None if the fit failed
+    """
+    model = model_from_description(results.attrs.get('fit_model', ''))
+    single = results.sel(**coords)
+    if np.all(np.isnan(single.values)):
+        return None
+
+    cut_data = data.sel(**coords)
+    if getattr(model, 'n_dims', 1) == 1:
+        independent = {'x': cut_data.coords[cut_data.dims[0]].values}
+        flat_data = cut_data.values
+    else:
+        independent = {k: v.values for k, v in cut_data.coords.items() if k in cut_data.dims}
+        flat_data = cut_data.values.ravel()
+
+    names = list(single.coords['param'].values)
+    params = model.make_params()
+    for name, value, stderr in zip(names, single.values, single.coords['stderr'].values):
+        params[name].stderr = None if np.isnan(stderr) else float(stderr)
+        if not params[name].expr:
+            params[name].value = float(value)
+
+    var_names = names
+    covar = None
+    if covariance is not None:
+        full_covar = covariance.sel(**coords).values
+        var_index = [k for k in range(len(names)) if np.isfinite(full_covar[k, k])]
+        var_names = [names[k] for k in var_index]
+        covar = full_covar[np.ix_(var_index, var_index)]
+    else:
+        var_names = [name for name in names if params[name].vary and not params[name].expr]
+
+    real_weights = None if weights is None else weights.sel(**coords).values.ravel()
+    result = lf.model.ModelResult(model, params, data=flat_data, weights=real_weights)
+    result.params = params
+    result.init_params = params
+    result.userkws = independent
+    result.independent = independent
+    result.independent_order = None
+    result.var_names = var_names
+    result.covar = covar
+    result.best_fit = model.eval(params, **independent)
+    result.residual = result.best_fit - flat_data
+    if real_weights is not None:
+        result.residual = result.residual * real_weights
+
+    result.best_values = {name: params[name].value for name in names if not params[name].expr}
+    result.init_values = dict(result.best_values)
+    result.chisqr = float(single.coords['chisqr'])
+    result.redchi = float(single.coords['redchi'])
+    result.nfev = int(single.coords['nfev'])
+    result.success = bool(single.coords['success'])
+    result.errorbars = covar is not None and bool(np.all(np.isfinite(covar)))
+    result.ndata = int(np.isfinite(flat_data).sum())
+    result.nvarys = len(var_names)
+    result.nfree = result.ndata - result.nvarys
+    result.method = 'leastsq'
+    result.message = ''
+    return result
+
+
+def expand_results(results: xr.DataArray, data: xr.DataArray, covariance: Optional[xr.DataArray] = None,
+                   weights: Optional[xr.DataArray] = None) -> xr.DataArray:
+    """
+    Rebuilds an object array of `lmfit.model.ModelResult` instances from compact results.
+    :param results:
+    :param data:
+    :param covariance:
+    :param weights:
+    :return:
+    """
+    template = results.isel(param=0).reset_coords(drop=True).astype(object)
+    template.attrs = {}
+
+    flat = template.values.reshape(-1)
+    dims = list(template.dims)
+    for index in range(flat.size):
+        position = np.unravel_index(index, template.shape)
+        coords = {d: template.coords[d].values[i] for d, i in zip(dims, position)}
+        flat[index] = rebuild_model_result(results, data, covariance, weights, **coords)
+
+    return template
@@ -1,38 +1,57 @@
 """
 The core of this module is `broadcast_model` which is a serious workhorse in PyARPES for
 analyses based on curve fitting. This allows simple multidimensional curve fitting by
-iterative fitting across one or many axes. Currently basic strategies are implemented,
-but in the future we would like to provide:
+iterative fitting across one or many axes. Beyond fitting each marginal independently, the
+following strategies are available:
 
 1. Passing xr.DataArray values to parameter guesses and bounds, which can be interpolated/selected
    to allow changing conditions throughout the curve fitting session.
-2. A strategy allowing retries with initial guess taken from the previous fit. This is similar
-   to some adaptive curve fitting routines that have been proposed in the literature.
+2. Warm starting (``warm_start=True``), where the broadcast grid is traversed in a locality
+   preserving order and each fit starts from the converged parameters of a neighbouring fit,
+   retrying with the initial guess if this fails. This is similar to some adaptive curve
+   fitting routines that have been proposed in the literature.
 """
 
+import contextlib
+import copyreg
 import functools
+import io
 import operator
+import os
+import pickle
 import warnings
 from string import ascii_lowercase
 
 import lmfit
 import numpy as np
 from tqdm import tqdm_notebook
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import arpes.fits.fit_models
+from arpes.fits.batch import fit_batch, fit_batch_arrays, supports_batch_fit
+from arpes.fits.result_store import build_compact_results, summarize_result
 from typing import Union, Tuple, Any, Dict, List
 
 import xarray as xr
 from arpes.provenance import update_provenance
 from arpes.typing import DataType
 from arpes.utilities import normalize_to_spectrum
+from arpes.utilities.shared_arrays import map_with_shared_dataarrays
 
 __all__ = ('broadcast_model', 'result_to_hints',)
 
 
 TypeIterable = Union[List[type], Tuple[type]]
 
+# Marginals are handed to workers in chunks, several per worker so that the load stays balanced
+# while results still stream back regularly
+PARALLEL_CHUNKS_PER_WORKER = 4
+MAX_FITS_PER_CHUNK = 256
+
+# A warm started fit is retried from the initial guess if its reduced chi-square is this many
+# times worse than that of the fit it was seeded from
+WARM_START_RETRY_FACTOR = 10
+
 
 def result_to_hints(m: lmfit.model.ModelResult) -> Dict[str, Dict[str, Any]]:
     """
@@ -194,10 +213,35 @@ def _apply_window(data: xr.DataArray, cut_coords: Dict[str, Union[float, slice]]
 @update_provenance('Broadcast a curve fit along several dimensions')
 def broadcast_model(model_cls: Union[type, TypeIterable],
                     data: DataType, broadcast_dims, params=None, progress=True, dataset=True,
-                    weights=None, safe=False, prefixes=None, window=None, multithread=False):
+                    weights=None, safe=False, prefixes=None, window=None, multithread=False, backend='lmfit',
+                    guess=True, n_workers=None, executor=None, chunk_size=None, compact=False,
+                    warm_start=False, traversal='serpentine'):
     """
     Perform a fit across a number of dimensions. Allows composite models as well as models
     defined and compiled through strings.
+
+    With ``backend='batch'``, models composed of elementwise functions are fit all at once with a
+    vectorised Levenberg-Marquardt, see `arpes.fits.batch`. Other models, and fits using a
+    ``window``, fall back to performing one `lmfit` fit per marginal.
+
+    Fits with the lmfit backend can be distributed over a pool of workers, either by passing
+    ``multithread=True`` (a process pool), or with ``n_workers`` and ``executor``:
+
+    broadcast_model(model, data, 'eV', n_workers=32, executor='process')
+
+    Marginals are sent to workers in chunks, and the data and weights are shared with worker
+    processes through a memory mapped file rather than being pickled with every task. Thread pools
+    avoid copies altogether and are a good choice for models whose evaluation releases the GIL.
+
+    With ``compact=True`` parameter values, uncertainties, and fit statistics are stored in dense arrays
+    which can be written to netCDF, and full results are only rebuilt on demand.
+
+    With ``warm_start=True`` marginals are fit in a ``traversal`` order which keeps consecutive fits
+    adjacent on the broadcast grid. Each fit is seeded with the converged parameters of its nearest
+    already completed neighbour, and falls back to the model's guess if it fails or fits much worse than
+    its neighbour did. Because neighbouring spectra are usually similar, this reduces the number of function
+    evaluations and keeps bands from swapping identity between neighbouring fits. When fitting on a pool
+    each chunk of marginals is warm started separately.
     :param model_cls:
     :param data:
     :param broadcast_dims:
@@ -207,6 +251,15 @@ def broadcast_model(model_cls: Union[type, TypeIterable],
     :param weights:
     :param safe:
     :param window:
+    :param backend: One of 'lmfit' or 'batch'
+    :param guess: Whether to seed each fit with the model's guess
+    :param n_workers: Number of threads or processes to fit on
+    :param executor: An existing ``concurrent.futures.Executor``, or "thread" or "process"
+    :param chunk_size: Number of marginals sent to a worker at a time
+    :param compact: If True, results are stored in dense arrays rather than as one `lmfit.model.ModelResult`
+    per marginal, see `arpes.fits.result_store`
+    :param warm_start: If True, seed each fit from the results of neighbouring fits
+    :param traversal: The order in which marginals are warm started, one of 'serpentine' or 'hilbert'
     :return:
     """
     if params is None:
@@ -231,41 +284,382 @@ def broadcast_model(model_cls: Union[type, TypeIterable],
     if isinstance(params, (list, tuple)):
         params = {}
 
-    new_params = model.make_params()
+    param_names = list(model.make_params().keys())
 
     n_fits = np.prod(np.array(list(template.S.dshape.values())))
+    cut_dims = [d for d in data.dims if d not in template.dims]
+
+    if backend not in ('lmfit', 'batch'):
+        raise ValueError('Unknown fitting backend: {}'.format(backend))
 
-    identity = lambda x, *args, **kwargs: x
-    wrap_progress = identity
-    if progress:
-        wrap_progress = tqdm_notebook
+    use_batch = backend == 'batch'
+    if use_batch and (window is not None or len(other_axes) != 1 or not supports_batch_fit(model)):
+        warnings.warn('Model cannot be fit in batch, falling back to the lmfit backend.')
+        use_batch = False
 
-    _fit_func = functools.partial(_perform_fit, data=data, model=model, params=params, safe=safe, weights=weights, window=window)
+    if use_batch and warm_start:
+        warnings.warn('Batch fits cannot be warm started, falling back to the lmfit backend.')
+        use_batch = False
 
-    if multithread:
-        with ProcessPoolExecutor() as executor:
-            for fit_result, fit_residual, coords in executor.map(_fit_func, template.T.iter_coords()):
-                template.loc[coords] = fit_result
-                residual.loc[coords] = fit_residual
+    order = _traversal_order(template.shape, traversal) if warm_start else np.arange(n_fits)
+
+    results, covariance = template, None
+    if use_batch:
+        results, covariance = _broadcast_batch(model, data, template, residual, params, weights, guess, progress,
+                                               compact)
     else:
-        for indices, cut_coords in wrap_progress(template.T.enumerate_iter_coords(), desc='Fitting', total=n_fits):
-            fit_result, fit_residual, _ = _fit_func(cut_coords)
-            template.loc[cut_coords] = fit_result
-            residual.loc[cut_coords] = fit_residual
+        if multithread and executor is None:
+            executor = 'process'
+
+        progress_bar = tqdm_notebook(total=n_fits, desc='Fitting') if progress else None
+        flat_results = template.values.reshape(-1)
+        flat_residual = np.full((n_fits,) + tuple(len(data.coords[d]) for d in cut_dims), np.nan)
+
+        if compact:
+            n_params = len(param_names)
+            summaries = [np.full((n_fits, n_params), np.nan), np.full((n_fits, n_params), np.nan),
+                         np.full((n_fits, n_params, n_params), np.nan), np.full(n_fits, np.nan),
+                         np.full(n_fits, np.nan), np.zeros(n_fits, dtype=np.int64), np.zeros(n_fits, dtype=bool)]
+
+        with _fitting_executor(n_workers, executor) as pool:
+            fit_marginals = functools.partial(
+                _fit_marginals, data=data, template_coords={d: template.coords[d].values for d in template.dims},
+                model=model, params=params, safe=safe, weights=weights, window=window, guess=guess,
+                param_names=param_names if compact else None, warm_start=warm_start,
+                seeds={} if warm_start and pool is None else None)
+
+            for fits in _schedule_fits(fit_marginals, order, pool, chunk_size, n_workers):
+                for index, fit_result, fit_residual in fits:
+                    if compact:
+                        for summary, value in zip(summaries, fit_result):
+                            summary[index] = value
+                    else:
+                        flat_results[index] = fit_result
+
+                    flat_residual[index] = fit_residual
+
+                if progress_bar is not None:
+                    progress_bar.update(len(fits))
+
+        if progress_bar is not None:
+            progress_bar.close()
+
+        residual.values = xr.DataArray(
+            flat_residual.reshape(template.shape + flat_residual.shape[1:]),
+            dims=list(template.dims) + cut_dims).transpose(*data.dims).values
+
+        if compact:
+            results, covariance = build_compact_results(template, param_names, *summaries, model=model,
+                                                        fit_dims=cut_dims)
 
     if dataset:
-        return xr.Dataset({
-            'results': template,
+        variables = {
+            'results': results,
             'data': data,
             'residual': residual,
             'norm_residual': residual / data,
-        }, residual.coords)
+        }
+        if covariance is not None:
+            variables['covar'] = covariance
+
+        return xr.Dataset(variables, residual.coords)
+
+    if not compact:
+        results.attrs['original_data'] = data
+
+    return results
+
+
+def _flatten_hints(params, template: xr.DataArray):
+    """
+    Resolves parameter hints for every fit in ``template`` at once. Array-like hints are selected
+    at the nearest coordinate of each marginal, as `unwrap_params` does for a single fit.
+    """
+    grids = np.meshgrid(*[template.coords[d].values for d in template.dims], indexing='ij')
+    flat_coords = {d: xr.DataArray(g.ravel(), dims=['fit']) for d, g in zip(template.dims, grids)}
+
+    def transform_or_walk(v):
+        if isinstance(v, dict):
+            return {k: transform_or_walk(vv) for k, vv in v.items()}
+
+        if isinstance(v, xr.DataArray):
+            return v.sel(**{d: flat_coords[d] for d in v.dims}, method='nearest').values
+
+        return v
+
+    return {k: transform_or_walk(v) for k, v in params.items()}
+
+
+def _broadcast_batch(model, data: xr.DataArray, template: xr.DataArray, residual: xr.DataArray, params, weights,
+                     guess, progress, compact=False):
+    fit_dim = [d for d in data.dims if d not in template.dims][0]
+    ordered = data.transpose(*template.dims, fit_dim)
+    n_points = len(ordered.coords[fit_dim])
+
+    flat_weights = None
+    if weights is not None:
+        flat_weights = weights.transpose(*template.dims, fit_dim).values.reshape(-1, n_points)
+
+    fit_options = dict(params=_flatten_hints(params, template), weights=flat_weights, guess=guess, progress=progress)
+    x, flat_data = ordered.coords[fit_dim].values, ordered.values.reshape(-1, n_points)
+
+    covariance = None
+    if compact:
+        fits = fit_batch_arrays(model, x, flat_data, **fit_options)
+        fit_residual = fits['residual']
+        results, covariance = build_compact_results(
+            template, fits['names'], fits['values'], fits['stderr'], fits['covar'], fits['chisqr'], fits['redchi'],
+            fits['nfev'], fits['success'], model=model, fit_dims=[fit_dim])
+    else:
+        fit_results, _, fit_residual = fit_batch(model, x, flat_data, **fit_options)
+        template.values = fit_results.reshape(template.shape)
+        results = template
+
+    residual.values = xr.DataArray(
+        fit_residual.reshape(ordered.shape), ordered.coords, ordered.dims).transpose(*data.dims).values
+    return results, covariance
+
+
+@contextlib.contextmanager
+def _fitting_executor(n_workers=None, executor=None):
+    """
+    Resolves the ``n_workers`` and ``executor`` arguments of ``broadcast_model`` to an executor,
+    creating (and afterwards shutting down) a pool if one was not provided.
+    """
+    if executor is None and n_workers is None:
+        yield None
+        return
+
+    if isinstance(executor, Executor):
+        yield executor
+        return
+
+    pool_cls = {
+        None: ThreadPoolExecutor,
+        'thread': ThreadPoolExecutor,
+        'process': ProcessPoolExecutor,
+    }.get(executor)
+
+    if pool_cls is None:
+        raise ValueError('executor should be an Executor, "thread", or "process", not {}'.format(executor))
+
+    with pool_cls(max_workers=n_workers) as pool:
+        yield pool
+
+
+def _traversal_order(shape: Tuple[int, ...], traversal='serpentine') -> np.ndarray:
+    """
+    Orders the flat indices of a grid so that consecutive indices are close together on the grid.
+    'serpentine' reverses the direction of travel along each axis whenever the axes outside of it
+    advance, so that consecutive indices are always adjacent. 'hilbert' follows a Hilbert curve,
+    which keeps runs of consecutive indices more compact, and is available for grids of up to two
+    dimensions.
+    """
+    n = int(np.prod(shape))
+    if traversal == 'serpentine':
+        digits = np.indices(shape).reshape(len(shape), -1)
+        position = np.empty_like(digits)
+        parity = np.zeros(n, dtype=digits.dtype)
+        for axis, size in enumerate(shape):
+            position[axis] = np.where(parity % 2 == 1, size - 1 - digits[axis], digits[axis])
+            parity += position[axis]
+
+        return np.ravel_multi_index(tuple(position), shape)
+
+    if traversal == 'hilbert':
+        if len(shape) > 2:
+            raise ValueError('Hilbert traversal is only available for up to two broadcast dimensions.')
+
+        if len(shape) < 2:
+            return np.arange(n)
+
+        side = 1
+        while side < max(shape):
+            side *= 2
+
+        x, y = [v.ravel() for v in np.indices(shape)]
+        distance = np.zeros(n, dtype=np.int64)
+        s = side // 2
+        while s > 0:
+            rx, ry = (x & s) > 0, (y & s) > 0
+            distance += s * s * ((3 * rx) ^ ry)
+
+            # rotate the quadrant so that the curve inside of it has the standard orientation
+            flip = ~ry & rx
+            x, y = np.where(flip, side - 1 - x, x), np.where(flip, side - 1 - y, y)
+            x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+            s //= 2
+
+        return np.argsort(distance, kind='stable')
+
+    raise ValueError('Unknown traversal: {}, expected "serpentine" or "hilbert"'.format(traversal))
+
+
+def _schedule_fits(fit_marginals, order: np.ndarray, executor: Executor = None, chunk_size=None, n_workers=None):
+    """
+    Runs ``fit_marginals`` over consecutive chunks of the flat indices in ``order``, yielding the fits
+    of each chunk as it completes. Unless ``chunk_size`` is given, chunks are sized from ``n_workers``,
+    which defaults to the number of cores.
+    """
+    n_fits = len(order)
+    if executor is None:
+        for start in range(0, n_fits, chunk_size or 1):
+            yield fit_marginals(order[start:start + (chunk_size or 1)])
+        return
+
+    if chunk_size is None:
+        n_workers = n_workers or os.cpu_count() or 1
+        chunk_size = min(MAX_FITS_PER_CHUNK, -(-n_fits // (n_workers * PARALLEL_CHUNKS_PER_WORKER)))
+        chunk_size = max(1, chunk_size)
+
+    chunks = [order[start:start + chunk_size] for start in range(0, n_fits, chunk_size)]
+
+    if isinstance(executor, ProcessPoolExecutor):
+        yield from _schedule_fits_on_processes(fit_marginals, chunks, executor)
+        return
+
+    for future in as_completed([executor.submit(fit_marginals, chunk) for chunk in chunks]):
+        yield future.result()
+
+
+def _fit_marginals_in_process(shared, options, indices):
+    """
+    Process pool entry point. The data and weights are not sent with each task, instead ``shared``
+    holds memory mapped copies of them, see ``map_with_shared_dataarrays``.
+    """
+    return _dumps_fits(_fit_marginals(indices, data=shared['data'], weights=shared['weights'], **options))
+
+
+def _parameters_from_list(parameters: List[lmfit.Parameter]) -> lmfit.Parameters:
+    rebuilt = lmfit.Parameters()
+    rebuilt.add_many(*parameters)
+    return rebuilt
+
+
+def _reduce_parameters(parameters: lmfit.Parameters):
+    # lmfit searches the asteval symbol table for user defined symbols whenever Parameters are pickled,
+    # which costs far more than the fit itself. Models fit by broadcast_model never define any, so only
+    # the parameters themselves are sent.
+    return _parameters_from_list, (list(parameters.values()),)
+
+
+def _dumps_fits(fits) -> bytes:
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    pickler.dispatch_table[lmfit.Parameters] = _reduce_parameters
+    pickler.dump(fits)
+    return buffer.getvalue()
+
+
+def _schedule_fits_on_processes(fit_marginals, chunks, executor: ProcessPoolExecutor):
+    options = dict(fit_marginals.keywords)
+    arrays = {'data': options.pop('data'), 'weights': options.pop('weights')}
+
+    for fits in map_with_shared_dataarrays(executor, _fit_marginals_in_process, arrays,
+                                           [(options, chunk) for chunk in chunks]):
+        yield pickle.loads(fits)
+
+
+def _fit_marginals(indices, data, template_coords, model, params, safe, weights, window, guess, param_names=None,
+                   warm_start=False, seeds=None):
+    """
+    Fits the marginals at the given flat indices into the broadcast grid, in order.
+
+    When warm starting, the converged parameters of successful fits are recorded in ``seeds``, keyed
+    by flat index, and later fits are seeded from their nearest recorded neighbour. Passing the same
+    ``seeds`` to consecutive calls carries seeds across chunks.
+    :return: A list of (flat index, fit result, residual) for each marginal. If ``param_names`` are
+    provided, the fit result is summarized as dense arrays over these parameters, see `summarize_result`.
+    """
+    shape = tuple(len(v) for v in template_coords.values())
+    if warm_start and seeds is None:
+        seeds = {}
+
+    fits = []
+    for index in indices:
+        position = np.unravel_index(index, shape)
+        cut_coords = {d: v[i] for (d, v), i in zip(template_coords.items(), position)}
+        seed = _nearest_seed(position, shape, seeds) if warm_start else None
+        fit_result, fit_residual, _ = _perform_fit(cut_coords, data=data, model=model, params=params, safe=safe,
+                                                   weights=weights, window=window, guess=guess, seed=seed)
+        if warm_start and fit_result is not None and fit_result.success and np.isfinite(fit_result.redchi):
+            seeds[int(index)] = (_seed_values(fit_result), fit_result.redchi, len(seeds))
+
+        if param_names is not None:
+            fit_result = summarize_result(fit_result, param_names)
+
+        fits.append((index, fit_result, fit_residual))
+
+    return fits
+
 
-    template.attrs['original_data'] = data
-    return template
+def _seed_values(fit_result) -> Dict[str, float]:
+    return {k: p.value for k, p in fit_result.params.items() if not p.expr}
 
 
-def _perform_fit(cut_coords, data, model, params, safe, weights, window):
+def _nearest_seed(position, shape, seeds):
+    """
+    Finds the completed fit nearest to ``position`` among its immediate neighbours on the broadcast grid,
+    preferring neighbours which share an edge, and among those the most recently completed.
+    :return: (parameter values, reduced chi-square) of the neighbouring fit, or None
+    """
+    best, best_key = None, None
+    for step in np.ndindex(*([3] * len(shape))):
+        offset = np.array(step) - 1
+        neighbour = np.array(position) + offset
+        if not offset.any() or np.any(neighbour < 0) or np.any(neighbour >= np.array(shape)):
+            continue
+
+        seed = seeds.get(int(np.ravel_multi_index(tuple(neighbour), shape)))
+        if seed is None:
+            continue
+
+        key = (np.abs(offset).sum(), -seed[2])
+        if best_key is None or key < best_key:
+            best, best_key = seed[:2], key
+
+    return best
+
+
+def _seeded_params(params, seed_values: Dict[str, float], prefix: str):
+    """
+    Overrides the initial values in the parameter hints ``params`` with those of a neighbouring fit. Fixed and
+    constrained parameters keep their hints.
+    """
+    seeded = dict(params)
+    for name, value in seed_values.items():
+        key = name[len(prefix):] if prefix and name.startswith(prefix) else name
+        hint = seeded.get(key, {})
+        if not isinstance(hint, dict) or hint.get('vary', True) is False or hint.get('expr'):
+            continue
+
+        seeded[key] = dict(hint, value=value)
+
+    return seeded
+
+
+def _align_residual(true_residual, original_cut_data: xr.DataArray) -> np.ndarray:
+    """
+    Lays a fit residual out over the points of the full marginal. Points without a residual, because
+    the fit failed or because they were dropped as NaN, are NaN.
+    """
+    aligned = np.full(original_cut_data.shape, np.nan)
+    if true_residual is None:
+        return aligned
+
+    values = np.asarray(true_residual, dtype=np.float64)
+    if values.size == aligned.size:
+        return values.reshape(aligned.shape)
+
+    finite = np.isfinite(original_cut_data.values)
+    if finite.sum() == values.size:
+        aligned[finite] = values.ravel()
+
+    return aligned
+
+
+def _perform_fit(cut_coords, data, model, params, safe, weights, window, guess=True, seed=None):
     current_params = unwrap_params(params, cut_coords)
     cut_data, original_cut_data = _apply_window(data, cut_coords, window)
 
@@ -276,10 +670,23 @@ def _perform_fit(cut_coords, data, model, params, safe, weights, window):
     if weights is not None:
         weights_for = weights.sel(**cut_coords)
 
-    try:
-        fit_result = model.guess_fit(cut_data, params=current_params, weights=weights_for)
-    except ValueError:
-        fit_result = None
+    fit_result = None
+    if seed is not None:
+        seed_values, seed_redchi = seed
+        try:
+            fit_result = model.guess_fit(cut_data, params=_seeded_params(current_params, seed_values, model.prefix),
+                                         weights=weights_for, guess=False)
+        except ValueError:
+            fit_result = None
+
+    if fit_result is None or not fit_result.success or not fit_result.redchi <= WARM_START_RETRY_FACTOR * seed_redchi:
+        try:
+            guessed_result = model.guess_fit(cut_data, params=current_params, weights=weights_for, guess=guess)
+        except ValueError:
+            guessed_result = None
+
+        if fit_result is None or (guessed_result is not None and guessed_result.chisqr < fit_result.chisqr):
+            fit_result = guessed_result
 
     if fit_result is None:
         true_residual = None
@@ -288,4 +695,4 @@ def _perform_fit(cut_coords, data, model, params, safe, weights, window):
     else:
         true_residual = original_cut_data - fit_result.eval(x=original_cut_data.coords[original_cut_data.dims[0]].values)
 
-    return fit_result, true_residual, cut_coords
+    return fit_result, _align_residual(true_residual, original_cut_data), cut_coords
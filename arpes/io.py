@@ -20,9 +20,11 @@ import xarray as xr
 
 import arpes.config
 from arpes.config import (CLEAVE_RECORD, CONFIG, DATASET_CACHE_PATH,
-                          DATASET_CACHE_RECORD, WorkspaceManager)
+                          WorkspaceManager)
 from arpes.endstations import load_scan
 from arpes.exceptions import ConfigurationError
+from arpes.records import records
+from arpes.storage import open_interned, read_interned_attrs, write_interned
 from arpes.typing import DataType
 from arpes.utilities import (FREEZE_PROPS, WHITELIST_KEYS, clean_xlsx_dataset,
                              unwrap_attrs_dict, unwrap_datavar_attrs,
@@ -192,22 +194,14 @@ def save_dataset(arr: DataType, filename=None, force=False):
     """
     import arpes.xarray_extensions # pylint: disable=unused-import, redefined-outer-name
 
-    with open(DATASET_CACHE_RECORD, 'r') as cache_record:
-        records = json.load(cache_record)
+    store = records()
 
     filename = filename or _filename_for(arr)
-    if filename is None:
-        filename = _filename_for(arr)
-        attrs_filename = _filename_for_attrs(arr)
-    else:
-        attrs_filename = filename + '.attrs.json'
 
-    if 'id' in arr.attrs and arr.attrs['id'] in records:
+    if 'id' in arr.attrs and store.has_dataset(arr.attrs['id']):
         if force:
             if os.path.exists(filename):
                 os.replace(filename, filename + '.keep')
-            if os.path.exists(attrs_filename):
-                os.replace(attrs_filename, attrs_filename + '.keep')
         else:
             return
 
@@ -216,23 +210,14 @@ def save_dataset(arr: DataType, filename=None, force=False):
     arr = wrap_datavar_attrs(arr, original_data=arr)
     ref_attrs = arr.attrs.pop('ref_attrs', None)
 
-    arr.to_netcdf(filename, engine='netcdf4')
-    with open(attrs_filename, 'w') as file:
-        json.dump(arr.attrs, file)
+    write_interned(arr, filename)
 
+    # only the first write is recorded
     if 'id' in arr.attrs:
-        first_write = arr.attrs['id'] not in records
-        records[arr.attrs['id']] = {
+        store.add_dataset(arr.attrs['id'], {
             'file': filename,
             **{k: v for k, v in arr.attrs.items() if k in WHITELIST_KEYS}
-        }
-    else:
-        first_write = False
-
-    # this was a first write
-    if first_write:
-        with open(DATASET_CACHE_RECORD, 'w') as cache_record:
-            json.dump(records, cache_record, sort_keys=True, indent=2)
+        })
 
     if ref_attrs is not None:
         arr.attrs['ref_attrs'] = ref_attrs
@@ -275,18 +260,22 @@ def dataset_exists(dataset):
 
 
 def load_dataset_attrs(dataset_uuid):
-    filename = _filename_for_attrs(dataset_uuid)
+    """
+    Reads the attributes of an interned dataset without reading its data.
+    :param dataset_uuid:
+    :return:
+    """
+    attrs_filename = _filename_for_attrs(dataset_uuid)
+    if os.path.exists(attrs_filename):
+        # datasets written by earlier versions keep their attributes in a separate file
+        with open(attrs_filename, 'r') as file:
+            return unwrap_attrs_dict(json.load(file))
+
+    filename = _filename_for(dataset_uuid)
     if not os.path.exists(filename):
-        try:
-            dataset = load_dataset(dataset_uuid)
-            save_dataset(dataset, force=True)
-        except ValueError as e:
-            raise ConfigurationError(
-                'Could not load attributes for {}'.format(dataset_uuid)) from e
+        raise ConfigurationError('Could not load attributes for {}'.format(dataset_uuid))
 
-    with open(filename, 'r') as file:
-        attrs = json.load(file)
-        return unwrap_attrs_dict(attrs)
+    return unwrap_attrs_dict(read_interned_attrs(filename))
 
 
 def simple_load(fragment, df: pd.DataFrame = None, workspace=None, basic_prep=True):
@@ -434,7 +423,7 @@ def load_dataset(dataset_uuid=None, filename=None, df: pd.DataFrame = None):
         raise ValueError('%s is not cached on the FS. Did you run `prepare_raw_data`?')
 
     try:
-        arr = xr.open_dataset(filename)
+        arr = open_interned(filename)
     except ValueError:
         arr = xr.open_dataarray(filename)
     arr = unwrap_datavar_attrs(arr)
@@ -464,26 +453,15 @@ def load_dataset(dataset_uuid=None, filename=None, df: pd.DataFrame = None):
 
 
 def available_datasets(**filters):
-    with open(DATASET_CACHE_RECORD, 'r') as cache_record:
-        records = json.load(cache_record)
-
-    for f, value in filters.items():
-        records = {k: v for k, v in records.items() if f in v and v[f] == value}
-
-    return records
+    return records().datasets(**filters)
 
 
 def flush_cache(ids, delete=True):
-    with open(DATASET_CACHE_RECORD, 'r') as cache_record:
-        records = json.load(cache_record)
+    ids = list(ids)
+    records().remove_datasets(ids)
 
-    for r_id in ids:
-        if r_id in records:
-            del records[r_id]
-
-        filename = os.path.join(DATASET_CACHE_PATH, r_id + '.nc')
-        if os.path.exists(filename) and delete:
-            os.remove(filename)
-
-    with open(DATASET_CACHE_RECORD, 'w') as cache_record:
-        json.dump(records, cache_record, sort_keys=True, indent=2)
+    if delete:
+        for r_id in ids:
+            filename = os.path.join(DATASET_CACHE_PATH, r_id + '.nc')
+            if os.path.exists(filename):
+                os.remove(filename)
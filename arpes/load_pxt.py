@@ -16,7 +16,7 @@ import xarray as xr
 from arpes.utilities.string import safe_decode
 
 __all__ = ('read_single_pxt', 'read_separated_pxt', 'read_experiment',
-           'find_ses_files_associated',)
+           'find_ses_files_associated', 'read_igor_waves', 'read_pxt_files',)
 
 binary_header_bytes = 10
 
@@ -41,6 +41,238 @@ igor_wave_header_dtype = np.dtype([
 ])
 
 
+# Headers of packed experiment records and of version 5 binary waves, as documented in Igor Technical Note 003
+# and PTN003. The byte order of a file is that of the machine which wrote it, so these are given in big
+# endian order and swapped as needed.
+packed_record_header_dtype = np.dtype([
+    ('record_type', '>u2'),
+    ('version', '>i2'),
+    ('n_data_bytes', '>i4'),
+])
+
+bin_header5_dtype = np.dtype([
+    ('version', '>i2'),
+    ('checksum', '>i2'),
+    ('wfm_size', '>i4'),
+    ('formula_size', '>i4'),
+    ('note_size', '>i4'),
+    ('data_e_units_size', '>i4'),
+    ('dim_e_units_size', '>i4', (4,)),
+    ('dim_labels_size', '>i4', (4,)),
+    ('s_indices_size', '>i4'),
+    ('options_size1', '>i4'),
+    ('options_size2', '>i4'),
+])
+
+wave_header5_dtype = np.dtype([
+    ('next', '>u4'),
+    ('creation_date', '>u4'),
+    ('mod_date', '>u4'),
+    ('n_points', '>i4'),
+    ('type', '>i2'),
+    ('d_lock', '>i2'),
+    ('whpad1', 'B', (6,)),
+    ('wh_version', '>i2'),
+    ('wave_name', 'S32'),
+    ('whpad2', '>i4'),
+    ('d_folder', '>u4'),
+    ('dim_sizes', '>i4', (4,)),
+    ('dim_scales', '>f8', (4,)),
+    ('dim_offsets', '>f8', (4,)),
+    ('data_units', 'S4'),
+    ('dim_units', 'S4', (4,)),
+    ('fs_valid', '>i2'),
+    ('whpad3', '>i2'),
+    ('top_full_scale', '>f8'),
+    ('bot_full_scale', '>f8'),
+    ('data_e_units', '>u4'),
+    ('dim_e_units', '>u4', (4,)),
+    ('dim_labels', '>u4', (4,)),
+    ('wave_note', '>u4'),
+    ('wh_unused', '>i4', (16,)),
+    ('a_modified', '>i2'),
+    ('w_modified', '>i2'),
+    ('sw_modified', '>i2'),
+    ('use_bits', 'B'),
+    ('kind_bits', 'B'),
+    ('formula', '>u4'),
+    ('dep_id', '>i4'),
+    ('whpad4', '>i2'),
+    ('src_fldr', '>i2'),
+    ('file_name', '>u4'),
+    ('s_indices', '>u4'),
+])
+
+PACKED_WAVE_RECORD = 3
+
+_IGOR_NUMBER_TYPES = {
+    0x02: 'f4',
+    0x04: 'f8',
+    0x08: 'i1',
+    0x10: 'i2',
+    0x20: 'i4',
+    0x80: 'i8',
+}
+
+_MAX_IGOR_DIMS = 4
+
+
+class IgorWave:
+    """
+    The parts of an Igor wave used by `wave_to_xarray`, with the same attributes as an ``igor.Wave``.
+    """
+    def __init__(self, name: str, data: np.ndarray, axis: typing.List[np.ndarray], axis_units: typing.List[str],
+                 notes: bytes):
+        self.name = name
+        self.data = data
+        self.axis = axis
+        self.axis_units = axis_units
+        self.notes = notes
+
+
+def _wave_data_dtype(wave_type: int, byte_order: str) -> np.dtype:
+    complex_flag, unsigned_flag = 0x01, 0x40
+    base = _IGOR_NUMBER_TYPES.get(wave_type & ~(complex_flag | unsigned_flag))
+    if base is None:
+        raise ValueError('Unsupported Igor wave type {}, text waves cannot be read.'.format(wave_type))
+
+    if wave_type & unsigned_flag:
+        base = base.replace('i', 'u')
+
+    if wave_type & complex_flag:
+        if base[0] != 'f':
+            raise ValueError('Unsupported Igor wave type {}.'.format(wave_type))
+
+        base = 'c{}'.format(2 * int(base[1:]))
+
+    return np.dtype(byte_order + base)
+
+
+def _read_binary_wave5(buffer: np.ndarray, offset: int, byte_order: str) -> IgorWave:
+    """
+    Decodes a version 5 binary wave starting at ``offset`` in ``buffer``. The data of the returned wave is a view
+    into ``buffer``, rather than a copy.
+    """
+    bin_header = np.frombuffer(buffer, bin_header5_dtype.newbyteorder(byte_order), count=1, offset=offset)[0]
+    if bin_header['version'] != 5:
+        raise ValueError('Only version 5 Igor binary waves are supported, found version {}.'.format(
+            bin_header['version']))
+
+    header_offset = offset + bin_header5_dtype.itemsize
+    wave_header = np.frombuffer(buffer, wave_header5_dtype.newbyteorder(byte_order), count=1,
+                                offset=header_offset)[0]
+
+    dim_sizes = [int(n) for n in wave_header['dim_sizes']]
+    shape = tuple(n for n in dim_sizes if n > 0) or (0,)
+    data_dtype = _wave_data_dtype(int(wave_header['type']), byte_order)
+    data_offset = header_offset + wave_header5_dtype.itemsize
+    n_points = int(wave_header['n_points'])
+
+    # Igor stores waves in column major order
+    data = np.ndarray(shape, dtype=data_dtype, buffer=buffer, offset=data_offset, order='F')
+    if data.size != n_points:
+        raise ValueError('Igor wave dimensions do not match its number of points.')
+
+    # the sections following the data, in order
+    position = data_offset + n_points * data_dtype.itemsize + int(bin_header['formula_size'])
+    notes = bytes(buffer[position:position + int(bin_header['note_size'])])
+    position += int(bin_header['note_size']) + int(bin_header['data_e_units_size'])
+
+    axis_units = []
+    for i in range(_MAX_IGOR_DIMS):
+        extended_size = int(bin_header['dim_e_units_size'][i])
+        unit = bytes(buffer[position:position + extended_size]) if extended_size else wave_header['dim_units'][i]
+        axis_units.append(safe_decode(unit.rstrip(b'\x00'), prefer='ascii'))
+        position += extended_size
+
+    axis = [np.linspace(b, b + a * (n - 1), n) for a, b, n in zip(
+        wave_header['dim_scales'], wave_header['dim_offsets'], dim_sizes)]
+
+    return IgorWave(safe_decode(wave_header['wave_name'], prefer='ascii'), data, axis, axis_units, notes)
+
+
+def _binary_wave_byte_order(buffer: np.ndarray, offset: int) -> str:
+    version = np.frombuffer(buffer, '<i2', count=1, offset=offset)[0]
+    return '<' if 0 < version <= 5 else '>'
+
+
+def _packed_wave_offsets(buffer: np.ndarray) -> typing.Tuple[typing.List[int], str]:
+    """
+    Walks the records of a packed experiment file to find the start of each wave record. The byte order
+    is the one for which the records exactly cover the file.
+    """
+    header_size = packed_record_header_dtype.itemsize
+    for byte_order in ('>', '<'):
+        record_header_dtype = packed_record_header_dtype.newbyteorder(byte_order)
+        offsets, position = [], 0
+
+        while position + header_size <= len(buffer):
+            record = np.frombuffer(buffer, record_header_dtype, count=1, offset=position)[0]
+            n_data_bytes = int(record['n_data_bytes'])
+            if n_data_bytes < 0:
+                break
+
+            # the high bit marks records superseded by later ones
+            if record['record_type'] & 0x7FFF == PACKED_WAVE_RECORD:
+                offsets.append(position + header_size)
+
+            position += header_size + n_data_bytes
+
+        if position == len(buffer):
+            return offsets, byte_order
+
+    raise ValueError('Could not read the records of the packed experiment file.')
+
+
+def read_igor_waves(path: typing.Union[Path, str]) -> typing.List[IgorWave]:
+    """
+    Reads all of the waves in a packed experiment (.pxt, .pxp) or binary wave (.ibw) file without copying them.
+    The file is memory mapped copy-on-write, and the data of each wave is a view onto the mapping: only the
+    headers are decoded up front, and the wave data is paged in from disk as it is accessed.
+    :param path:
+    :return:
+    """
+    buffer = np.memmap(str(path), dtype=np.uint8, mode='c')
+
+    if Path(str(path)).suffix.lower() == '.ibw':
+        return [_read_binary_wave5(buffer, 0, _binary_wave_byte_order(buffer, 0))]
+
+    offsets, _ = _packed_wave_offsets(buffer)
+    return [_read_binary_wave5(buffer, offset, _binary_wave_byte_order(buffer, offset)) for offset in offsets]
+
+
+def read_pxt_files(paths: typing.Union[Path, str, typing.Iterable[typing.Union[Path, str]]],
+                   copy: bool = False) -> typing.List[xr.DataArray]:
+    """
+    Reads the first wave of each of many .pxt or .ibw files, as `read_single_pxt` does for a single file.
+    :param paths: A list of files, or a directory from which all .pxt and .ibw files are read
+    :param copy: If True, the data are copied out of the files into native byte order arrays. Otherwise the
+    data are memory mapped, which keeps a handle on each file open while its data are in use.
+    :return: A DataArray for each file
+    """
+    if isinstance(paths, (str, Path)) and Path(str(paths)).is_dir():
+        paths = sorted(p for p in Path(str(paths)).iterdir() if p.suffix.lower() in {'.pxt', '.ibw'})
+    elif isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    arrays = []
+    for path in paths:
+        waves = read_igor_waves(path)
+        if not waves:
+            raise ValueError('{} does not contain any waves.'.format(path))
+
+        if len(waves) > 1:
+            warnings.warn('Igor PXT file contained {} waves. Ignoring all but first.'.format(len(waves)))
+
+        wave = waves[0]
+        if copy:
+            wave.data = wave.data.astype(wave.data.dtype.newbyteorder('='))
+
+        arrays.append(wave_to_xarray(wave))
+
+    return arrays
+
+
 def read_igor_binary_wave(raw_bytes):
     """
     Some weirdness here with the byte ordering and the target datatype. Additionally,
@@ -192,9 +424,18 @@ def read_single_ibw(reference_path: typing.Union[Path, str]):
 
 def read_single_pxt(reference_path: typing.Union[Path, str], byte_order=None):
     """
-    Uses igor.igorpy to load a single .PXT or .PXP file
+    Loads a single .PXT or .PXP file. Files are read with `read_pxt_files` where possible, falling back to
+    igor.igorpy for formats it does not support, or if a ``byte_order`` is given. The data are copied out of
+    the file, so that no handle on it is kept open: use `read_pxt_files` or `read_igor_waves` directly for
+    memory mapped data.
     :return:
     """
+    if byte_order is None:
+        try:
+            return read_pxt_files([reference_path], copy=True)[0]
+        except ValueError:
+            pass
+
     import igor.igorpy as igor
 
     if isinstance(reference_path, Path):
@@ -28,14 +28,48 @@ option, as well as trying to provide support for reproducible and understandable
 analyses without sacrificing interativity and a tight feedback loop for the experimenter.
 """
 
+import contextlib
+import hashlib
 import json
-
-from typing import Union
-
+import multiprocessing
+import os
+import pickle
+import time
+import types
+import uuid
+import warnings
+from collections import namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from typing import Any, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
 import xarray as xr
 
 import arpes.config
 import arpes.io
+from arpes.records import records
+from arpes.utilities.normalize import normalize_to_spectrum
+
+# marks results which are not in the pipeline records, or whose interned data was deleted
+_MISSING = object()
+_STALE = object()
+
+StageRun = namedtuple('StageRun', ('scan', 'stage', 'seconds', 'cached', 'result', 'error'))
+
+# stages of the batches being run by ``run_pipeline``, worker processes inherit these when they are forked
+_BATCH_STAGES = {}
+
+# namespace of the ids of pipeline results, see ``result_id``
+_RESULT_NAMESPACE = uuid.UUID('4b9a3c2e-6f0e-5d1b-9a57-3e2f5c8d7a10')
+
+# Version of the way cache keys are computed, results recorded under other versions are never looked up again
+PIPELINE_KEY_FORMAT = 2
+
+# attributes which do not describe the contents of data: its id, which differs between the input and result
+# of a stage, and those attached whenever data is loaded or processed
+_UNHASHED_ATTRS = {'id', 'df', 'provenance', 'ref_attrs'}
 
 
 def normalize_data(data: Union[xr.DataArray, xr.Dataset, str]):
@@ -59,89 +93,452 @@ def denormalize_data(data):
     return data
 
 
-def computation_hash(pipeline_name, data, intern_kwargs, *args, **kwargs):
-    return json.dumps({
-        'pipeline_name': pipeline_name,
-        'data': normalize_data(data),
-        'args': args,
-        'kwargs': {k: v for k, v in kwargs.items() if k in intern_kwargs},
-    }, sort_keys=True)
+def _digest(*parts) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        h.update(part if isinstance(part, (bytes, memoryview)) else str(part).encode('utf-8'))
+        h.update(b'\0')
+
+    return h.hexdigest()
+
+
+def _array_digest(values: np.ndarray) -> str:
+    values = np.asarray(values)
+    if values.dtype.kind == 'O':
+        return _digest(values.dtype.str, values.shape, repr(values.tolist()))
+
+    # hashed as raw bytes, buffers of datetimes or of arrays with an empty axis cannot be cast to bytes directly
+    return _digest(values.dtype.str, values.shape, memoryview(np.ascontiguousarray(values).reshape(-1).view(np.uint8)))
 
 
-def cache_computation(key, data):
+def _pandas_repr(value: Union[pd.DataFrame, pd.Series, pd.Index]) -> Any:
     try:
-        if isinstance(data, xr.DataArray):
-            # intern the computation
-            arpes.io.save_dataset(data)
-            data = normalize_data(data)
+        content = _array_digest(pd.util.hash_pandas_object(value, index=True).values)
+    except TypeError:  # cells which cannot be hashed, such as lists
+        content = _digest(pickle.dumps(value, protocol=4))
 
-        return data
-    except Exception as e:
-        raise e
+    if isinstance(value, pd.DataFrame):
+        return ['DataFrame', [repr(c) for c in value.columns], [str(d) for d in value.dtypes], content]
+
+    return [type(value).__name__, repr(value.name), str(value.dtype), content]
+
+
+def _stable_repr(value: Any, seen: set) -> Any:
+    """
+    A JSON serializable description of a value which is the same between processes and sessions. Values of
+    other types are described by their pickled contents, and by their type alone with a warning if they
+    cannot be pickled: their reprs are not used as they can be truncated or include the address of the value.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [_stable_repr(v, seen) for v in value]]
+
+    if isinstance(value, (set, frozenset)):
+        return ['set', sorted(json.dumps(_stable_repr(v, seen), sort_keys=True) for v in value)]
+
+    if isinstance(value, dict):
+        return ['dict', sorted([repr(k), _stable_repr(v, seen)] for k, v in value.items())]
+
+    if isinstance(value, np.ndarray):
+        return ['ndarray', _array_digest(value)]
+
+    if isinstance(value, (xr.DataArray, xr.Dataset)):
+        return ['data', data_fingerprint(value)]
+
+    if isinstance(value, types.CodeType):
+        return _code_repr(value, seen)
+
+    if isinstance(value, types.FunctionType):
+        return ['function', _function_repr(value, seen)]
+
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        return _pandas_repr(value)
+
+    if isinstance(value, type):
+        return ['type', value.__module__, value.__qualname__]
+
+    if isinstance(value, types.ModuleType):
+        return ['module', value.__name__]
+
+    name = '{}.{}'.format(type(value).__module__, type(value).__qualname__)
+    try:
+        return [name, _digest(pickle.dumps(value, protocol=4))]
+    except Exception:  # pylint: disable=broad-except
+        warnings.warn('{} values cannot be pickled, so pipeline results are cached as if all of them were the '
+                      'same. Pass them as keyword arguments left out of `intern_kwargs` instead.'.format(name))
+        return ['object', name]
+
+
+def _code_repr(code: types.CodeType, seen: set) -> Any:
+    return [code.co_name, code.co_code.hex(), list(code.co_names), list(code.co_varnames),
+            [_stable_repr(c, seen) for c in code.co_consts]]
+
+
+def _referenced_names(code: types.CodeType) -> Iterable[str]:
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from _referenced_names(const)
+
+
+def _package(f) -> str:
+    return (getattr(f, '__module__', None) or '').split('.')[0]
+
+
+def _function_repr(f: types.FunctionType, seen: set, unhashed_names: Iterable[str] = ()) -> Any:
+    if f in seen:
+        return f.__qualname__
+
+    seen.add(f)
+    closure = []
+    for name, cell in zip(f.__code__.co_freevars, f.__closure__ or ()):
+        if name in unhashed_names:
+            closure.append(name)
+            continue
+
+        try:
+            contents = cell.cell_contents
+        except ValueError:  # the cell of a name which is not yet assigned
+            contents = None
+
+        closure.append(contents)
+
+    described = [f.__qualname__, _code_repr(f.__code__, seen), _stable_repr(f.__defaults__, seen),
+                 _stable_repr(f.__kwdefaults__, seen), _stable_repr(closure, seen)]
+
+    # functions and simple constants of the same package which the function uses, such as helpers defined next
+    # to it in a notebook or module, are part of what it computes
+    package = _package(f)
+    for name in sorted(set(_referenced_names(f.__code__)).intersection(f.__globals__)):
+        value = f.__globals__[name]
+        if isinstance(value, types.FunctionType) and _package(value) in {package, 'arpes'}:
+            described.append([name, _function_repr(value, seen)])
+        elif value is None or isinstance(value, (bool, int, float, str, tuple)):
+            described.append([name, _stable_repr(value, seen)])
+
+    return described
+
+
+def function_fingerprint(f, unhashed_names: Iterable[str] = ()) -> str:
+    """
+    A hash of the code of a function, which changes when it or the functions of its package it calls are edited,
+    or when the values it closes over or has as defaults change.
+    :param f:
+    :param unhashed_names: Names ``f`` closes over whose values are left out, such as lists it accumulates into
+    :return:
+    """
+    return _digest(json.dumps(['function', _function_repr(f, set(), frozenset(unhashed_names))], sort_keys=True))
+
+
+def _array_fingerprint(data: Union[xr.DataArray, xr.Dataset]) -> str:
+    parts = []
+    variables = [(None, data.variable)] if isinstance(data, xr.DataArray) else sorted(data.data_vars.items())
+    for name, variable in variables + sorted(data.coords.items()):
+        parts.extend([name, variable.dims, _array_digest(variable.values)])
+
+    attrs = {k: v for k, v in data.attrs.items() if k not in _UNHASHED_ATTRS}
+    parts.append(json.dumps(_stable_repr(attrs, set()), sort_keys=True))
+    return 'array:' + _digest(*parts)
+
+
+def _interned_filename(data: str) -> Optional[str]:
+    if not arpes.io.is_a_dataset(data):
+        return None
+
+    filename = arpes.io._filename_for(data) # pylint: disable=protected-access
+    return filename if os.path.exists(filename) else None
+
+
+def _record_fingerprint(filename: str, fingerprint: str) -> None:
+    stat = os.stat(filename)
+    records().set_fingerprint(filename, stat.st_size, stat.st_mtime_ns, fingerprint)
+
+
+def _source_filename(data: str) -> Optional[str]:
+    """
+    The raw data file a scan of the workspace table is loaded from, if there is one.
+    """
+    try:
+        from arpes.utilities import default_dataset  # break circular dependency
+        df = default_dataset()
+    except Exception: # pylint: disable=broad-except
+        return None
+
+    if 'id' not in df.columns or 'path' not in df.columns:
+        return None
+
+    paths = [p for p in df['path'][df['id'] == data] if isinstance(p, str)]
+    return paths[0] if len(paths) == 1 and os.path.isfile(paths[0]) else None
+
+
+def _file_fingerprint(filename: str) -> str:
+    stat = os.stat(filename)
+    fingerprint = records().fingerprint(filename, stat.st_size, stat.st_mtime_ns)
+    if fingerprint is None:
+        h = hashlib.blake2b(digest_size=20)
+        with open(filename, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                h.update(block)
+
+        fingerprint = 'file:' + h.hexdigest()
+        _record_fingerprint(filename, fingerprint)
+
+    return fingerprint
+
+
+def data_fingerprint(data: Union[xr.DataArray, xr.Dataset, str]) -> str:
+    """
+    A hash of the contents of data, rather than of its id. The fingerprint of an interned dataset given by its id is
+    that of the data it loads as, and that of a scan in the workspace table also includes the contents of its raw
+    data file, so that reprocessed or exported again raw data gets new keys. Both are recorded alongside the files
+    so that they are only calculated once per version of a file.
+    :param data: Data, or the id of an interned dataset or of a scan of the workspace
+    :return:
+    """
+    if isinstance(data, (xr.DataArray, xr.Dataset)):
+        return _array_fingerprint(data)
+
+    filename = _interned_filename(data) if isinstance(data, str) else None
+    source = _source_filename(data) if isinstance(data, str) else None
+    if filename is None and source is None:
+        return json.dumps(_stable_repr(data, set()), sort_keys=True)
+
+    fingerprint = None
+    if filename is not None:
+        stat = os.stat(filename)
+        fingerprint = records().fingerprint(filename, stat.st_size, stat.st_mtime_ns)
+        if fingerprint is None:
+            fingerprint = _array_fingerprint(normalize_to_spectrum(data))
+            _record_fingerprint(filename, fingerprint)
+
+    if source is None:
+        return fingerprint
+
+    return 'source:' + _digest(fingerprint, _file_fingerprint(source))
+
+
+def computation_hash(pipeline_name, data, intern_kwargs, args, kwargs, code='', fingerprint=None):
+    """
+    The key a computation is cached under. It depends on the contents of the data rather than on its id, so that
+    changed data is never looked up under the key of the data it replaced.
+    :param pipeline_name:
+    :param data:
+    :param intern_kwargs: The keyword arguments which change the result, or None if all of them do
+    :param args:
+    :param kwargs:
+    :param code: The fingerprint of the function of the stage, see ``function_fingerprint``
+    :param fingerprint: The fingerprint of ``data``, if it is already known
+    :return:
+    """
+    return '{}:{}'.format(pipeline_name, _digest(json.dumps({
+        'format': PIPELINE_KEY_FORMAT,
+        'code': code,
+        'data': fingerprint or data_fingerprint(data),
+        'args': _stable_repr(list(args), set()),
+        'kwargs': _stable_repr({k: v for k, v in kwargs.items() if intern_kwargs is None or k in intern_kwargs},
+                               set()),
+    }, sort_keys=True)))
+
+
+def result_id(key):
+    """
+    The id given to the result of a computation, the same every time the computation is run.
+    :param key: The computation hash
+    :return:
+    """
+    return str(uuid.uuid5(_RESULT_NAMESPACE, key))
+
+
+def cache_computation(key, data, fingerprint=None):
+    """
+    Records the result of a computation, interning it if it is data.
+    :param key:
+    :param data:
+    :param fingerprint: The fingerprint of ``data``, if it is already known
+    :return: The value recorded for the computation
+    """
+    size = None
+    if isinstance(data, xr.DataArray):
+        # the fingerprint of the result is recorded with it, so that later stages run on its id are looked up
+        # under the same key as when run on the result itself
+        fingerprint = fingerprint or data_fingerprint(data)
+        arpes.io.save_dataset(data, force=True)
+        data = normalize_data(data)
+
+        filename = arpes.io._filename_for(data) # pylint: disable=protected-access
+        _record_fingerprint(filename, fingerprint)
+        size = os.path.getsize(filename)
+
+    records().set_pipeline_result(key, data, size=size)
+
+    settings = arpes.config.SETTINGS['pipeline_cache']
+    if settings['max_bytes'] is not None or settings['max_age'] is not None:
+        evict_pipeline_results(settings['max_bytes'], settings['max_age'], keep=[key])
+
+    return data
+
+
+def evict_pipeline_results(max_bytes=None, max_age=None, keep=()) -> List[str]:
+    """
+    Forgets cached results, least recently used first, until those left take up at most ``max_bytes`` and have
+    all been used within the last ``max_age`` seconds. The interned data of evicted results is deleted, while
+    other datasets recorded as results, such as scans which a stage left unchanged, are kept.
+
+    Results are evicted automatically when they are recorded if ``SETTINGS['pipeline_cache']`` sets limits.
+    :param max_bytes:
+    :param max_age:
+    :param keep: Keys of results which are not evicted
+    :return: The keys of the evicted results
+    """
+    store = records()
+    results = store.pipeline_results()
+    total = sum(r.size or 0 for r in results)
+    now = time.time()
+
+    evicted = []
+    for result in results:
+        if result.key in keep:
+            continue
+
+        too_old = max_age is not None and now - (result.used or 0) > max_age
+        too_large = max_bytes is not None and total > max_bytes
+        if not (too_old or too_large):
+            continue
+
+        store.remove_pipeline_result(result.key)
+        if result.value == result_id(result.key):
+            filename = arpes.io._filename_for(result.value) # pylint: disable=protected-access
+            arpes.io.flush_cache([result.value])
+            store.remove_fingerprints([filename])
+
+        total -= result.size or 0
+        evicted.append(result.key)
+
+    return evicted
+
+
+def _cached_value(store, key):
+    """
+    Looks up the recorded result of a computation, forgetting results whose interned data has since been deleted.
+    :return: The result, ``_MISSING`` if there is none, or ``_STALE`` if it was forgotten
+    """
+    value = store.pipeline_result(key, _MISSING)
+    if value is _MISSING:
+        return _MISSING
+
+    if isinstance(value, str) and arpes.io.is_a_dataset(value) and not arpes.io.dataset_exists(value):
+        store.remove_pipeline_result(key)
+        return _STALE
+
+    store.mark_pipeline_result_used(key)
+    return value
 
 
 class PipelineRollbackException(Exception):
     pass
 
 
-def pipeline(pipeline_name=None, intern_kwargs=None):
-    if intern_kwargs is None:
-        intern_kwargs = set()
+def pipeline(pipeline_name=None, intern_kwargs=None, unhashed_names=()):
+    """
+    Makes a function into a stage of a pipeline, whose results are cached.
 
-    # TODO write simple tests for the pipeline flags to ensure correct caching conditions
+    Results are cached under a hash of the contents of the data, of the code of the function, and of the arguments
+    it is called with, so editing a stage or calling it differently computes it again rather than returning
+    an outdated result.
+    :param pipeline_name: Defaults to the name of the function
+    :param intern_kwargs: The keyword arguments which are part of the cache key, by default all of them
+    :param unhashed_names: Names the function closes over whose values are not part of the cache key, such as
+    lists it records calls in. The values of all others are.
+    :return:
+    """
     def pipeline_decorator(f):
-        def func_wrapper(data, flush=False, force=False, debug=False, verbose=True, *args, **kwargs):
-            key = computation_hash(pipeline_name or f.__name__,
-                                   data, intern_kwargs, *args, **kwargs)
+        name = pipeline_name or f.__name__
+
+        def cache_key(data, *args, fingerprint=None, **kwargs):
+            return computation_hash(name, data, intern_kwargs, args, kwargs,
+                                    code=function_fingerprint(f, unhashed_names), fingerprint=fingerprint)
+
+        def run(data, *args, flush=False, force=False, debug=False, verbose=True, **kwargs):
+            """
+            Runs the stage, also returning whether its result was cached.
+            """
+            fingerprint = data_fingerprint(data)
+            key = cache_key(data, *args, fingerprint=fingerprint, **kwargs)
             if debug:
-                print(pipeline_name or f.__name__, key)
+                print(name, key)
 
             def echo(v):
                 if verbose:
-                    print('{}: {}'.format(pipeline_name or f.__name__, v))
+                    print('{}: {}'.format(name, v))
 
-            with open(arpes.config.PIPELINE_JSON_SHELF, 'r') as file:
-                # Currently we are using JSON because of a bug in the implementation
-                # of python's shelf that causes it to hang forever.
-                # A better long term solution here is to use a database or KV-store
-                records = json.load(file)
+            store = records()
+            value = _cached_value(store, key)
 
-            if key in records and not force:
-                if (not arpes.io.is_a_dataset(key) or arpes.io.dataset_exists(key)):
-                    value = records[key]
+            if value is not _MISSING and not force:
+                if value is not _STALE:
                     if flush:
                         # remove the record of the cached computation, and delete the filesystem cache
                         # for the computation
-                        del records[key]
-                        if arpes.io.dataset_exists(key):
-                            arpes.io.delete_dataset(key)
-
-                    with open(arpes.config.PIPELINE_JSON_SHELF, 'w') as file:
-                        json.dump(records, file)
+                        store.remove_pipeline_result(key)
+                        if value == result_id(key) and arpes.io.dataset_exists(value):
+                            arpes.io.delete_dataset(value)
 
                     echo(value)
-                    return value
+                    return value, True
                 else:
-                    del records[key]
-                    with open(arpes.config.PIPELINE_JSON_SHELF, 'w') as file:
-                        json.dump(records, file)
                     raise PipelineRollbackException()
             elif flush:
-                return None
+                return None, False
 
+            input_id = data if isinstance(data, str) else None
             try:
                 if isinstance(data, str):
-                    data = arpes.io.load_dataset(data)
+                    # loaded as it is fingerprinted, see ``data_fingerprint``
+                    data = normalize_to_spectrum(data)
             except ValueError:
                 pass
             finally:
+                if isinstance(data, xr.DataArray):
+                    input_id = data.attrs.get('id', input_id)
+
                 computed = f(data, *args, **kwargs)
-                records[key] = cache_computation(key, computed)
-                with open(arpes.config.PIPELINE_JSON_SHELF, 'w') as file:
-                    json.dump(records, file)
+                if isinstance(computed, xr.DataArray):
+                    computed_fingerprint = fingerprint if computed is data else data_fingerprint(computed)
+                    if (computed_fingerprint == fingerprint and isinstance(input_id, str)
+                            and _interned_filename(input_id) is not None and data_fingerprint(input_id) == fingerprint):
+                        # stages which leave interned data unchanged record its id, rather than a copy of it
+                        cache_computation(key, input_id)
+                    else:
+                        # results are interned under their own id, rather than that of the data they came from
+                        computed = computed.copy(deep=False)
+                        computed.attrs['id'] = result_id(key)
+                        cache_computation(key, computed, fingerprint=computed_fingerprint)
+                else:
+                    cache_computation(key, computed)
+
                 echo(normalize_data(computed))
 
-            return computed
+            return computed, False
+
+        def func_wrapper(data, flush=False, force=False, debug=False, verbose=True, *args, **kwargs):
+            return run(data, *args, flush=flush, force=force, debug=debug, verbose=verbose, **kwargs)[0]
+
+        def cached_result(data, *args, **kwargs):
+            """
+            The recorded result of running this stage on ``data``, or None if it needs to be computed.
+            """
+            value = _cached_value(records(), cache_key(data, *args, **kwargs))
+            return None if value is _MISSING or value is _STALE else value
+
+        func_wrapper.pipeline_name = name
+        func_wrapper.cache_key = cache_key
+        func_wrapper.cached_result = cached_result
+        func_wrapper.run = run
 
         return func_wrapper
 
@@ -149,6 +546,12 @@ def pipeline(pipeline_name=None, intern_kwargs=None):
 
 
 def compose(*pipelines):
+    """
+    Chains pipelines, which are run one after the other. If the cached result of a stage turns out to have been
+    deleted, the chain is started over so that it can be recomputed.
+    :param pipelines:
+    :return:
+    """
     def composed(data, *args, **kwargs):
         max_restarts = len(pipelines)
         while max_restarts:
@@ -166,4 +569,132 @@ def compose(*pipelines):
                 max_restarts -= 1
                 continue
 
+    composed.stages = pipeline_stages(*pipelines)
     return composed
+
+
+def pipeline_stages(*pipelines):
+    """
+    The individual stages of pipelines, with composed pipelines flattened into their stages.
+    :param pipelines:
+    :return:
+    """
+    return tuple(stage for p in pipelines for stage in getattr(p, 'stages', (p,)))
+
+
+def _stage_name(stage):
+    return getattr(stage, 'pipeline_name', getattr(stage, '__name__', repr(stage)))
+
+
+def _data_name(data):
+    if isinstance(data, str):
+        return data
+
+    if isinstance(data, xr.DataArray):
+        return data.attrs.get('id')
+
+    return None
+
+
+def _run_scan(token, scan, force=False) -> List[StageRun]:
+    """
+    Runs the stages of a batch on one scan, loading it only if some stage needs to be computed.
+    """
+    runs = []
+    data = scan
+    for stage in _BATCH_STAGES[token]:
+        start = time.perf_counter()
+        try:
+            if hasattr(stage, 'run'):
+                # pipeline stages are keyed on the data they are given, and load it themselves only when needed
+                try:
+                    data, cached = stage.run(data, force=force, verbose=False)
+                except PipelineRollbackException:
+                    # the interned result was deleted and its record dropped, so it is computed again
+                    data, cached = stage.run(data, force=force, verbose=False)
+            else:
+                data, cached = stage(normalize_to_spectrum(data)), False
+        except Exception as e: # pylint: disable=broad-except
+            runs.append(StageRun(_data_name(scan), _stage_name(stage), time.perf_counter() - start, False, None,
+                                 '{}: {}'.format(type(e).__name__, e)))
+            break
+
+        runs.append(StageRun(_data_name(scan), _stage_name(stage), time.perf_counter() - start, cached,
+                             _data_name(data), None))
+
+    return runs
+
+
+@contextlib.contextmanager
+def _batch_executor(n_workers=None, executor='process'):
+    """
+    Resolves the ``n_workers`` and ``executor`` arguments of ``run_pipeline`` to an executor, creating (and
+    afterwards shutting down) a pool if one was not provided.
+    """
+    if executor is None:
+        yield None
+        return
+
+    if isinstance(executor, ProcessPoolExecutor):
+        raise ValueError('Existing process pools cannot run pipelines, use executor="process" instead')
+
+    if isinstance(executor, Executor):
+        yield executor
+        return
+
+    if executor == 'process' and multiprocessing.get_start_method() != 'fork':
+        warnings.warn('Pipelines can only be run on worker processes which are forked, running them on threads')
+        executor = 'thread'
+
+    pool_cls = {
+        'thread': ThreadPoolExecutor,
+        'process': ProcessPoolExecutor,
+    }.get(executor)
+
+    if pool_cls is None:
+        raise ValueError('executor should be an Executor, "thread", "process", or None, not {}'.format(executor))
+
+    with pool_cls(max_workers=n_workers or os.cpu_count() or 1) as pool:
+        yield pool
+
+
+def run_pipeline(pipeline_to_run, scans, n_workers=None, executor='process', force=False) -> pd.DataFrame:
+    """
+    Runs a pipeline over many scans. The stages of the pipeline are run in order on each scan, while different
+    scans are processed concurrently, by default on a process pool with one worker per core.
+
+    Stages whose results have been recorded are skipped, so running a batch which was interrupted again resumes it
+    where it stopped. Scans are only loaded to fingerprint them the first time they are run, see
+    ``data_fingerprint``. A scan for which a stage fails is reported and skipped,
+    without stopping the other scans.
+
+    Example:
+        runs = run_pipeline(convert_scan_to_kspace, default_dataset())
+        runs.groupby('stage').seconds.sum()
+
+    :param pipeline_to_run: A pipeline, such as those in ``arpes.pipelines``
+    :param scans: Ids of interned scans, or a DataFrame of scans with an ``id`` column such as ``default_dataset()``
+    :param n_workers: Defaults to the number of cores
+    :param executor: "process", "thread", an existing thread pool, or None to run in this process
+    :param force: Recompute every stage
+    :return: One row per stage run on each scan, with its duration, whether it was cached, the id of its
+    result, and the error if it failed
+    """
+    if isinstance(scans, pd.DataFrame):
+        scans = [s for s in scans['id'].values if isinstance(s, str) and s]
+
+    scans = list(scans)
+    token = uuid.uuid4().hex
+    _BATCH_STAGES[token] = pipeline_stages(pipeline_to_run)
+
+    try:
+        with _batch_executor(n_workers, executor) as pool:
+            if pool is None:
+                runs = [run for scan in scans for run in _run_scan(token, scan, force)]
+            else:
+                futures = [pool.submit(_run_scan, token, scan, force) for scan in scans]
+                runs = [run for future in futures for run in future.result()]
+    finally:
+        del _BATCH_STAGES[token]
+
+    return pd.DataFrame(runs, columns=StageRun._fields)
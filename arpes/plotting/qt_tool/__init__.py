@@ -9,6 +9,7 @@ from arpes.utilities import normalize_to_spectrum
 from arpes.typing import DataType
 import arpes.config
 from arpes.utilities.qt.data_array_image_view import DataArrayPlot
+from arpes.utilities.summed_area import SummedAreaTables
 
 from arpes.utilities.ui import KeyBinding, horizontal, tabs, CursorRegion
 from arpes.utilities.qt import qt_info, DataArrayImageView, BasicHelpDialog, SimpleWindow, SimpleApp
@@ -107,6 +108,7 @@ class QtTool(SimpleApp):
         self.kspace_info_widgets = []
 
         self._binning = None
+        self.summed_areas = None
 
     def center_cursor(self):
         new_cursor = [len(self.data.coords[d]) / 2 for d in self.data.dims]
@@ -143,11 +145,14 @@ class QtTool(SimpleApp):
             for cursor in cursors:
                 cursor.set_width(self._binning[i])
 
+        self.prepare_summed_areas()
         self.update_cursor_position(self.context['cursor'], force=True)
 
     def transpose(self, transpose_order):
         reindex_order = [self.data.dims.index(t) for t in transpose_order]
         self.data = self.data.transpose(*transpose_order)
+        self.summed_areas = SummedAreaTables(self.data)
+        self.prepare_summed_areas()
 
         for widget in self.axis_info_widgets + self.binning_info_widgets:
             widget.recompute()
@@ -246,19 +251,14 @@ class QtTool(SimpleApp):
         for reactive in self.reactive_views:
             if set(reactive.dims).intersection(set(changed_dimensions)) or force:
                 try:
-                    select_coord = dict(zip([self.data.dims[i] for i in reactive.dims],
-                                            [safe_slice(int(new_cursor[i]), int(new_cursor[i] + self.binning[i]), i)
-                                             for i in reactive.dims]))
+                    windows = {i: safe_slice(int(new_cursor[i]), int(new_cursor[i] + self.binning[i]), i)
+                               for i in reactive.dims}
                     if isinstance(reactive.view, DataArrayImageView):
-                        image_data = self.data.isel(**select_coord)
-                        if select_coord:
-                            image_data = image_data.mean(list(select_coord.keys()))
+                        image_data = self.summed_areas.binned_mean(windows)
                         reactive.view.setImage(image_data, keep_levels=keep_levels)
 
                     elif isinstance(reactive.view, pg.PlotWidget):
-                        for_plot = self.data.isel(**select_coord)
-                        if select_coord:
-                            for_plot = for_plot.mean(list(select_coord.keys()))
+                        for_plot = self.summed_areas.binned_mean(windows)
 
                         cursors = [l for l in reactive.view.getPlotItem().items if isinstance(l, CursorRegion)]
                         reactive.view.clear()
@@ -276,6 +276,15 @@ class QtTool(SimpleApp):
                 except IndexError:
                     pass
 
+    def prepare_summed_areas(self):
+        """
+        Builds the summed-area tables for the views which are currently binned, so that moving the cursor only
+        needs lookups. Tables for views which are not binned are built if binning is turned on for them.
+        """
+        binned = [i for i, b in enumerate(self.binning) if b > 1]
+        self.summed_areas.prepare(reactive.dims for reactive in self.reactive_views
+                                  if set(reactive.dims).intersection(binned))
+
     def construct_axes_tab(self):
         inner_items = [AxisInfoWidget(axis_index=i, root=self) for i in range(len(self.data.dims))]
         return horizontal(*inner_items), inner_items
@@ -331,6 +340,7 @@ class QtTool(SimpleApp):
         data = normalize_to_spectrum(data)
         self.data = data
         self._binning = [1 for _ in self.data.dims]
+        self.summed_areas = SummedAreaTables(self.data)
 
 
 def qt_tool(data: DataType):
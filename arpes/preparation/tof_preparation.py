@@ -10,8 +10,53 @@ from .axis_preparation import transform_dataarray_axis
 __all__ = ['build_KE_coords_to_time_pixel_coords', 'build_KE_coords_to_time_coords', 'process_DLD', 'process_SToF',]
 
 
+# ToF data is rebinned in chunks along its first non-time axis, each holding about this many bytes of the
+# input, so that large volumes are never duplicated in memory in full
+TOF_REBIN_CHUNK_BYTES = 256 * 1024 ** 2
+
+
+def _time_bin_edges(timing: np.ndarray, kinetic_energy_axis: np.ndarray, conversion: float):
+    """
+    Calculates the timing edges of every kinetic energy bin, clamped to the timing range, and the
+    indices of the timing samples at these edges.
+    :return: (t_L, t_S, t_L_idx, t_S_idx), with the shorter and longer time edge of each bin
+    """
+    d_energy = kinetic_energy_axis[1] - kinetic_energy_axis[0]
+    if np.any(kinetic_energy_axis - d_energy / 2 <= 0):
+        raise ValueError('Kinetic energy bins must lie entirely above zero energy.')
+
+    t_L = np.sqrt(conversion / (kinetic_energy_axis + d_energy / 2))
+    t_S = np.sqrt(conversion / (kinetic_energy_axis - d_energy / 2))
+
+    # clamp
+    t_L = np.where(t_L <= np.max(timing), t_L, np.max(timing))
+    t_S = np.where(t_S > np.min(timing), t_S, np.min(timing))
+
+    return t_L, t_S, np.searchsorted(timing, t_L), np.searchsorted(timing, t_S)
+
+
+def _rebin_time_to_energy(data: np.ndarray, timing: np.ndarray, edges, d_energy: float) -> np.ndarray:
+    """
+    Rebins data with time along its first axis into the energy bins described by `edges`. The counts of
+    the samples between the edges of each bin are summed as differences of a cumulative sum along time,
+    and the samples at the edges contribute in proportion to how far the edge lies inside them.
+    """
+    t_L, t_S, t_L_idx, t_S_idx = edges
+    broadcast = (slice(None),) + (None,) * (data.ndim - 1)
+
+    cumulative = np.zeros((data.shape[0] + 1,) + data.shape[1:])
+    np.cumsum(data, axis=0, out=cumulative[1:])
+
+    interior = cumulative[t_S_idx] - cumulative[t_L_idx]
+    interior[t_S_idx <= t_L_idx] = 0
+
+    return interior + \
+        ((timing[t_L_idx] - t_L)[broadcast] * data[t_L_idx]) + \
+        ((t_S - timing[t_S_idx - 1])[broadcast] * data[t_S_idx - 1]) / d_energy
+
+
 @update_provenance('Convert ToF data from timing signal to kinetic energy')
-def convert_to_kinetic_energy(dataarray, kinetic_energy_axis):
+def convert_to_kinetic_energy(dataarray, kinetic_energy_axis, chunk_bytes=None):
     """
     Convert the ToF timing information into an energy histogram
 
@@ -26,6 +71,9 @@ def convert_to_kinetic_energy(dataarray, kinetic_energy_axis):
     3. Rebins a time spectrum into an energy spectrum, preserving the
        spectral weight, this requires a modicum of care around splitting
        counts at the edges of the new bins.
+
+    The time edges of all energy bins are calculated at once, and data is rebinned for all energies together,
+    in chunks of about `chunk_bytes` (default ``TOF_REBIN_CHUNK_BYTES``) along the first non-time axis.
     """
 
     # This should be simplified
@@ -41,36 +89,27 @@ def convert_to_kinetic_energy(dataarray, kinetic_energy_axis):
 
     timing = dataarray.coords['time'].values
     assert timing[1] > timing[0]
-    t_min, t_max = np.min(timing), np.max(timing)
 
     # Prep arrays
+    kinetic_energy_axis = np.asarray(kinetic_energy_axis)
     d_energy = kinetic_energy_axis[1] - kinetic_energy_axis[0]
-    time_index = 0 # after transpose
-    new_shape = list(dataarray.data.shape)
-    new_shape[time_index] = len(kinetic_energy_axis)
+    edges = _time_bin_edges(timing, kinetic_energy_axis, c)
 
-    new_data = np.zeros(tuple(new_shape))
-
-    def energy_to_time(conv, energy):
-        return math.sqrt(conv / energy)
-
-    # Rebin data
     old_data = dataarray.data
-    for i, E in enumerate(kinetic_energy_axis):
-        t_L = energy_to_time(c, E + d_energy / 2)
-        t_S = energy_to_time(c, E - d_energy / 2)
+    new_shape = list(old_data.shape)
+    new_shape[0] = len(kinetic_energy_axis)
 
-        # clamp
-        t_L = t_L if t_L <= t_max else t_max
-        t_S = t_S if t_S > t_min else t_min
-
-        # with some math we could back calculate the index, but we don't need to
-        t_L_idx = np.searchsorted(timing, t_L)
-        t_S_idx = np.searchsorted(timing, t_S)
-
-        new_data[i] = np.sum(old_data[t_L_idx:t_S_idx], axis=0) + \
-                      ((timing[t_L_idx] - t_L) * old_data[t_L_idx]) + \
-                      ((t_S - timing[t_S_idx - 1]) * old_data[t_S_idx - 1]) / d_energy
+    # Rebin data
+    if old_data.ndim == 1:
+        new_data = _rebin_time_to_energy(np.asarray(old_data), timing, edges, d_energy)
+    else:
+        new_data = np.zeros(tuple(new_shape))
+        slice_bytes = 8 * int(np.prod(old_data.shape)) // old_data.shape[1]
+        chunk_size = max(1, (chunk_bytes or TOF_REBIN_CHUNK_BYTES) // max(slice_bytes, 1))
+
+        for start in range(0, old_data.shape[1], chunk_size):
+            chunk = slice(start, start + chunk_size)
+            new_data[:, chunk] = _rebin_time_to_energy(np.asarray(old_data[:, chunk]), timing, edges, d_energy)
 
     new_coords = dict(dataarray.coords)
     del new_coords['time']
@@ -0,0 +1,304 @@
+"""
+The records PyARPES keeps about interned datasets and cached pipeline results, stored in an SQLite database.
+
+These used to be two JSON files, ``DATASET_CACHE_RECORD`` and ``PIPELINE_JSON_SHELF``, which were read and
+rewritten in full whenever a dataset was saved or a pipeline stage finished. Besides becoming slow as the number
+of datasets grows, two notebooks writing at the same time could lose records or leave a truncated file behind.
+
+In the database
+
+1. Datasets are looked up by id, and by the values of their whitelisted attributes (``WHITELIST_KEYS``),
+   through indices
+2. Pipeline results are kept with their size and when they were last used, so that they can be evicted
+3. Every change is a transaction, so concurrent writers from several processes are serialized by SQLite
+   and readers never see partial changes
+
+The JSON files of a configuration are imported the first time its database is opened, and are left in place.
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import arpes.config
+from arpes.exceptions import ConfigurationError
+
+__all__ = ('RecordStore', 'PipelineRecord', 'records', 'migrate_json_records',)
+
+# Seconds a write waits for other processes to finish theirs before failing
+RECORD_TIMEOUT = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    file TEXT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dataset_attrs (
+    id TEXT NOT NULL REFERENCES datasets (id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (id, key)
+);
+CREATE INDEX IF NOT EXISTS dataset_attrs_by_value ON dataset_attrs (key, value);
+CREATE TABLE IF NOT EXISTS pipeline (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    size INTEGER,
+    used REAL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY
+);
+"""
+
+# Columns added to tables after they were first released, which are added to existing databases when opened
+_ADDED_COLUMNS = {
+    'pipeline': (('size', 'INTEGER'), ('used', 'REAL'),),
+}
+
+PipelineRecord = namedtuple('PipelineRecord', ('key', 'value', 'size', 'used'))
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, sort_keys=True)
+
+
+class RecordStore:
+    """
+    Dataset records and pipeline results in one SQLite database. Connections are opened per process and thread,
+    so a store can be used freely from worker threads and forked processes.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        with self.transaction() as connection:
+            for statement in _SCHEMA.split(';'):
+                if statement.strip():
+                    connection.execute(statement)
+
+            for table, columns in _ADDED_COLUMNS.items():
+                existing = {row[1] for row in connection.execute('PRAGMA table_info({})'.format(table))}
+                for name, column_type in columns:
+                    if name not in existing:
+                        connection.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(table, name, column_type))
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=RECORD_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA foreign_keys = ON')
+            connection.execute('PRAGMA journal_mode = WAL')
+            self._local.connection, self._local.pid = connection, os.getpid()
+
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Runs statements in one transaction, which holds the write lock on the database from the start so that
+        concurrent read-modify-write sequences cannot interleave.
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        connection.execute('COMMIT')
+
+    def has_dataset(self, dataset_id: str) -> bool:
+        row = self._connection().execute('SELECT 1 FROM datasets WHERE id = ?', (dataset_id,)).fetchone()
+        return row is not None
+
+    def dataset(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute('SELECT record FROM datasets WHERE id = ?', (dataset_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def add_dataset(self, dataset_id: str, record: Dict[str, Any], replace: bool = False) -> bool:
+        """
+        Records an interned dataset.
+        :param dataset_id:
+        :param record: The file the dataset is stored in as ``file``, and its whitelisted attributes
+        :param replace: Whether to overwrite an existing record
+        :return: Whether the record was written
+        """
+        with self.transaction() as connection:
+            return self._add_dataset(connection, dataset_id, record, replace)
+
+    @staticmethod
+    def _add_dataset(connection: sqlite3.Connection, dataset_id: str, record: Dict[str, Any], replace: bool) -> bool:
+        exists = connection.execute('SELECT 1 FROM datasets WHERE id = ?', (dataset_id,)).fetchone() is not None
+        if exists and not replace:
+            return False
+
+        connection.execute('DELETE FROM datasets WHERE id = ?', (dataset_id,))
+        connection.execute('INSERT INTO datasets (id, file, record) VALUES (?, ?, ?)',
+                           (dataset_id, record.get('file'), _encode(record)))
+        connection.executemany('INSERT INTO dataset_attrs (id, key, value) VALUES (?, ?, ?)',
+                               [(dataset_id, k, _encode(v)) for k, v in record.items() if k != 'file'])
+        return True
+
+    def remove_datasets(self, dataset_ids: Iterable[str]) -> None:
+        with self.transaction() as connection:
+            connection.executemany('DELETE FROM datasets WHERE id = ?', [(i,) for i in dataset_ids])
+
+    def datasets(self, **filters: Any) -> Dict[str, Dict[str, Any]]:
+        """
+        The records of interned datasets, optionally only those with the given values of whitelisted attributes.
+        :param filters:
+        :return: Records by dataset id
+        """
+        query, parameters = 'SELECT id, record FROM datasets', []
+        if filters:
+            query += ' WHERE ' + ' AND '.join(
+                ['id IN (SELECT id FROM dataset_attrs WHERE key = ? AND value = ?)'] * len(filters))
+            for key, value in filters.items():
+                parameters.extend([key, _encode(value)])
+
+        return {i: json.loads(record) for i, record in self._connection().execute(query, parameters)}
+
+    def pipeline_result(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute('SELECT value FROM pipeline WHERE key = ?', (key,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set_pipeline_result(self, key: str, value: Any, size: Optional[int] = None) -> None:
+        """
+        Records the result of a pipeline stage.
+        :param key:
+        :param value:
+        :param size: The number of bytes the result takes up on disk, used when evicting results
+        :return:
+        """
+        with self.transaction() as connection:
+            connection.execute('INSERT OR REPLACE INTO pipeline (key, value, size, used) VALUES (?, ?, ?, ?)',
+                               (key, _encode(value), size, time.time()))
+
+    def mark_pipeline_result_used(self, key: str) -> None:
+        with self.transaction() as connection:
+            connection.execute('UPDATE pipeline SET used = ? WHERE key = ?', (time.time(), key))
+
+    def remove_pipeline_result(self, key: str) -> None:
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM pipeline WHERE key = ?', (key,))
+
+    def pipeline_results(self) -> List[PipelineRecord]:
+        """
+        Every recorded pipeline result, least recently used first.
+        :return:
+        """
+        rows = self._connection().execute('SELECT key, value, size, used FROM pipeline ORDER BY used ASC')
+        return [PipelineRecord(key, json.loads(value), size, used) for key, value, size, used in rows]
+
+    def fingerprint(self, path: str, size: int, mtime: int) -> Optional[str]:
+        """
+        The fingerprint recorded for a file, if the file has not changed since.
+        :param path:
+        :param size:
+        :param mtime: Modification time of the file in ns
+        :return:
+        """
+        row = self._connection().execute('SELECT fingerprint FROM fingerprints WHERE path = ? AND size = ? AND '
+                                         'mtime = ?', (path, size, mtime)).fetchone()
+        return None if row is None else row[0]
+
+    def set_fingerprint(self, path: str, size: int, mtime: int, fingerprint: str) -> None:
+        with self.transaction() as connection:
+            connection.execute('INSERT OR REPLACE INTO fingerprints (path, size, mtime, fingerprint) '
+                               'VALUES (?, ?, ?, ?)', (path, size, mtime, fingerprint))
+
+    def remove_fingerprints(self, paths: Iterable[str]) -> None:
+        with self.transaction() as connection:
+            connection.executemany('DELETE FROM fingerprints WHERE path = ?', [(p,) for p in paths])
+
+    def migrate(self, dataset_record: Optional[str] = None, pipeline_shelf: Optional[str] = None,
+                force: bool = False) -> None:
+        """
+        Imports the JSON records used by earlier versions of PyARPES. Records already in the database are kept,
+        and each file is only imported once unless ``force`` is set.
+        :param dataset_record: A ``DATASET_CACHE_RECORD`` file
+        :param pipeline_shelf: A ``PIPELINE_JSON_SHELF`` file
+        :param force:
+        :return:
+        """
+        for source, is_dataset_record in [(dataset_record, True), (pipeline_shelf, False)]:
+            if source is None or not os.path.exists(source):
+                continue
+
+            source = os.path.abspath(source)
+            with self.transaction() as connection:
+                migrated = connection.execute('SELECT 1 FROM migrations WHERE source = ?', (source,)).fetchone()
+                if migrated is not None and not force:
+                    continue
+
+                try:
+                    with open(source, 'r') as f:
+                        contents = json.load(f)
+                except ValueError:
+                    contents = {}
+
+                for key, value in contents.items():
+                    if is_dataset_record:
+                        self._add_dataset(connection, key, value, replace=False)
+                    else:
+                        connection.execute('INSERT OR IGNORE INTO pipeline (key, value, used) VALUES (?, ?, ?)',
+                                           (key, _encode(value), time.time()))
+
+                connection.execute('INSERT OR REPLACE INTO migrations (source) VALUES (?)', (source,))
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def records(path: Optional[str] = None) -> RecordStore:
+    """
+    The record store of the current configuration, or of the database at ``path``. The JSON records of the
+    configuration are imported when its store is first opened.
+    :param path:
+    :return:
+    """
+    migrate = path is None
+    if path is None:
+        path = arpes.config.RECORD_DATABASE
+
+    if path is None:
+        raise ConfigurationError('PyARPES has not been configured with a location for its records.')
+
+    path = os.path.abspath(path)
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = _STORES[path] = RecordStore(path)
+            if migrate:
+                migrate_json_records(store)
+
+    return store
+
+
+def migrate_json_records(store: Optional[RecordStore] = None, force: bool = False) -> None:
+    """
+    Imports the ``DATASET_CACHE_RECORD`` and ``PIPELINE_JSON_SHELF`` of the current configuration.
+    :param store: Defaults to the store of the current configuration
+    :param force: Import records even if the files were imported before
+    :return:
+    """
+    if store is None:
+        store = records()
+
+    store.migrate(arpes.config.DATASET_CACHE_RECORD, arpes.config.PIPELINE_JSON_SHELF, force=force)
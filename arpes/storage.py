@@ -0,0 +1,137 @@
+"""
+The on-disk format of interned datasets, those written by ``arpes.io.save_dataset``.
+
+Interned datasets are netCDF4 (HDF5) files in which every data variable is stored
+
+1. In chunks of about ``INTERNED_CHUNK_BYTES``. Dimensions data is usually looked at one entry at a time
+   (``SLICED_DIMS``, such as cycles or delays) get one entry per chunk, energy is split into slabs of at
+   least ``MIN_EV_SLAB`` points, and the remaining dimensions are split evenly after that
+2. Compressed with the HDF5 shuffle and deflate filters at a low level, which costs little time on
+   write and typically halves the size of detector data
+
+The attributes of the data are written into the same file. Files are opened lazily, so selecting a region
+such as ``.sel(eV=slice(-0.1, 0))`` of a large map reads only the chunks which overlap it.
+"""
+
+import numpy as np
+import xarray as xr
+from typing import Any, Dict, List, Sequence
+
+from arpes.typing import DataType
+
+__all__ = ('interned_chunks', 'interned_encoding', 'write_interned', 'open_interned', 'read_interned_attrs',)
+
+# Dimensions which are stored one entry per chunk
+SLICED_DIMS = ('cycle', 'delay',)
+
+# Energy is split before other dimensions, but not into slabs thinner than this
+MIN_EV_SLAB = 8
+
+# Target size of chunks
+INTERNED_CHUNK_BYTES = 1024 ** 2
+
+# Deflate level, low levels are much faster and compress detector data nearly as well
+INTERNED_COMPLEVEL = 1
+
+# Name xarray stores unnamed DataArrays under
+_DATAARRAY_VARIABLE = '__xarray_dataarray_variable__'
+
+
+def interned_chunks(dims: Sequence[str], shape: Sequence[int], itemsize: int,
+                    chunk_bytes: int = INTERNED_CHUNK_BYTES) -> List[int]:
+    """
+    Chooses the chunk shape used to store a variable.
+    :param dims:
+    :param shape:
+    :param itemsize:
+    :param chunk_bytes:
+    :return:
+    """
+    chunks = [1 if d in SLICED_DIMS else max(n, 1) for d, n in zip(dims, shape)]
+
+    def halve(i):
+        chunks[i] = (chunks[i] + 1) // 2
+
+    while itemsize * int(np.prod(chunks)) > chunk_bytes:
+        if 'eV' in dims and chunks[dims.index('eV')] // 2 >= MIN_EV_SLAB:
+            halve(dims.index('eV'))
+            continue
+
+        splittable = [i for i, c in enumerate(chunks) if c > 1]
+        if not splittable:
+            break
+
+        halve(max(splittable, key=lambda i: (dims[i] != 'eV', chunks[i])))
+
+    return chunks
+
+
+def interned_encoding(data: xr.Dataset, chunk_bytes: int = INTERNED_CHUNK_BYTES) -> Dict[str, Dict[str, Any]]:
+    """
+    The netCDF4 encoding of the data variables of an interned dataset. Variables which HDF5 cannot chunk or
+    filter (scalars, empty arrays, strings) are written as they are.
+    :param data:
+    :param chunk_bytes:
+    :return:
+    """
+    encoding = {}
+    for name, variable in data.data_vars.items():
+        if variable.ndim == 0 or variable.size == 0 or variable.dtype.kind not in 'biuf':
+            continue
+
+        encoding[name] = {
+            'zlib': True,
+            'complevel': INTERNED_COMPLEVEL,
+            'chunksizes': tuple(interned_chunks(list(variable.dims), variable.shape, variable.dtype.itemsize,
+                                                chunk_bytes)),
+        }
+
+    return encoding
+
+
+def write_interned(data: DataType, filename: str, chunk_bytes: int = INTERNED_CHUNK_BYTES) -> None:
+    """
+    Writes data, whose attributes have already been wrapped for serialization, as an interned dataset.
+    :param data:
+    :param filename:
+    :param chunk_bytes:
+    :return:
+    """
+    if isinstance(data, xr.DataArray):
+        # named as ``DataArray.to_netcdf`` names it
+        name = data.name
+        if name is None or name in data.coords or name in data.dims:
+            name = _DATAARRAY_VARIABLE
+
+        encoding = interned_encoding(data.to_dataset(name=name), chunk_bytes)
+    else:
+        encoding = interned_encoding(data, chunk_bytes)
+
+    data.to_netcdf(filename, engine='netcdf4', encoding=encoding)
+
+
+def open_interned(filename: str) -> xr.Dataset:
+    """
+    Opens an interned dataset without reading its data, which is read chunk by chunk as it is used.
+    :param filename:
+    :return:
+    """
+    return xr.open_dataset(filename, engine='netcdf4')
+
+
+def read_interned_attrs(filename: str) -> Dict[str, Any]:
+    """
+    Reads the (still wrapped) attributes of an interned dataset, without reading any of its data.
+    :param filename:
+    :return:
+    """
+    data = open_interned(filename)
+    try:
+        # DataArrays are stored as the only variable of a Dataset, with their attributes on the variable
+        names = list(data.data_vars)
+        if names == [_DATAARRAY_VARIABLE] or (len(names) == 1 and not data.attrs):
+            return dict(data[names[0]].attrs)
+
+        return dict(data.attrs)
+    finally:
+        data.close()
@@ -1,3 +1,4 @@
 from .core import *
 from .remap_manipulator import *
 from .forward import *
+from .plan import *
@@ -10,6 +10,15 @@ MOMENTUM_BREAKPOINTS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2,
 
 
 class CoordinateConverter:
+    # If the conversion of a single source dimension depends only on the binding energy and a single target
+    # dimension, as for ('eV', 'phi') cuts, these are (source dimension, target dimension). Each energy row
+    # can then be resampled independently along one axis instead of interpolating on the full grid.
+    separable_axes = None
+
+    # Memory budget in bytes to use when converting, unless another is requested. Converters for large
+    # volumes can set this so that the target grid is converted in slabs, see ``convert_coordinates``.
+    default_memory_budget = None
+
     def __init__(self, arr: xr.DataArray, dim_order=None, *args, **kwargs):
         # Intern the volume so that we can check on things during computation
         self.arr = arr
@@ -33,6 +42,16 @@ class CoordinateConverter:
         """
         pass
 
+    def clear_cache(self) -> None:
+        """
+        Discards any intermediate values cached by the coordinate transform methods. Because the
+        cached values have the shape of the coordinates they were computed on, this needs to be
+        called before transforming a different set of target coordinates, as happens when the
+        target grid is converted in chunks.
+        :return:
+        """
+        pass
+
     @property
     def is_slit_vertical(self) -> bool:
         # 89 - 91 degrees
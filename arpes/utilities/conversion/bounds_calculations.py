@@ -3,7 +3,7 @@ import numpy as np
 import arpes.constants
 import xarray as xr
 
-__all__ = ('calculate_kp_kz_bounds', 'calculate_kx_ky_bounds', 'calculate_kp_bounds',
+__all__ = ('calculate_kp_kz_bounds', 'calculate_kx_ky_bounds', 'calculate_kx_ky_kz_bounds', 'calculate_kp_bounds',
            'full_angles_to_k', 'full_angles_to_k_approx',)
 
 
@@ -212,3 +212,56 @@ def calculate_kx_ky_bounds(arr: xr.DataArray):
         (round(np.min(kxs), 2), round(np.max(kxs), 2)),
         (round(np.min(kys), 2), round(np.max(kys), 2)),
     )
+
+
+def calculate_kx_ky_kz_bounds(arr: xr.DataArray):
+    """
+    Calculates the kx, ky, and kz range for a photon energy dependent map, i.e. one with
+    ``hv``, ``phi`` and a perpendicular angle (``beta``, ``theta``, or ``psi``) as dimensions.
+
+    The in-plane range is largest at the highest kinetic energy, while kz ranges from the
+    most grazing emission at the lowest kinetic energy to normal emission at the highest.
+    :param arr:
+    :return: ((kx_low, kx_high,), (ky_low, ky_high,), (kz_low, kz_high,))
+    """
+    perp_angle = [d for d in ['psi', 'beta', 'theta'] if d in arr.dims][0]
+
+    phi_coords = arr.coords['phi'].values - arr.S.phi_offset
+    perp_coords = arr.coords[perp_angle].values - arr.S.lookup_offset(perp_angle)
+
+    phi_low, phi_high = np.min(phi_coords), np.max(phi_coords)
+    perp_low, perp_high = np.min(perp_coords), np.max(perp_coords)
+    phi_mid = (phi_high + phi_low) / 2
+    perp_mid = (perp_high + perp_low) / 2
+
+    sampled_phi_values = np.array([phi_high, phi_high, phi_mid, phi_low, phi_low,
+                                   phi_low, phi_mid, phi_high, phi_high])
+    sampled_perp_values = np.array([perp_mid, perp_high, perp_high, perp_high, perp_mid,
+                                    perp_low, perp_low, perp_low, perp_mid])
+
+    binding_energy_min, binding_energy_max = np.min(arr.coords['eV'].values), np.max(arr.coords['eV'].values)
+    hv_min, hv_max = np.min(arr.coords['hv'].values), np.max(arr.coords['hv'].values)
+    wf = arr.S.work_function
+
+    kinetic_energy_max = hv_max - wf + binding_energy_max
+    kinetic_energy_min = hv_min - wf + binding_energy_min
+
+    k_phi = arpes.constants.K_INV_ANGSTROM * np.sqrt(kinetic_energy_max) * np.sin(sampled_phi_values)
+    k_perp = arpes.constants.K_INV_ANGSTROM * np.sqrt(kinetic_energy_max) * np.cos(sampled_phi_values) * \
+             np.sin(sampled_perp_values)
+
+    if arr.S.is_slit_vertical:
+        kxs, kys = k_perp, k_phi
+    else:
+        kxs, kys = k_phi, k_perp
+
+    most_grazing = np.arccos(np.min(np.cos(sampled_phi_values) * np.cos(sampled_perp_values)))
+    inner_V = arr.S.inner_potential
+    kz_min = spherical_to_kz(kinetic_energy_min, most_grazing, 0, inner_V)
+    kz_max = spherical_to_kz(kinetic_energy_max, 0, 0, inner_V)
+
+    return (
+        (round(np.min(kxs), 2), round(np.max(kxs), 2)),
+        (round(np.min(kys), 2), round(np.max(kys), 2)),
+        (round(kz_min, 2), round(kz_max, 2)),
+    )
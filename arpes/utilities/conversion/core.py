@@ -21,7 +21,10 @@ Better facilities should be added for ToFs to do simultaneous (timing, angle) to
 """
 
 import collections
+import contextlib
+import copy
 import warnings
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from copy import deepcopy
 
 import numpy as np
@@ -31,12 +34,18 @@ import xarray as xr
 from arpes.exceptions import AnalysisError
 from arpes.provenance import provenance, update_provenance
 from arpes.utilities import normalize_to_spectrum
+from arpes.utilities.shared_arrays import map_with_shared_dataarrays
 from typing import Union
 
 from .kx_ky_conversion import ConvertKxKy, ConvertKp
-from .kz_conversion import ConvertKpKz
+from .kz_conversion import ConvertKpKz, ConvertKxKyKz
+from .plan import ConversionPlan, conversion_plan_key, get_cached_plan, put_cached_plan, _locate_along_axis
 
-__all__ = ['convert_to_kspace', 'slice_along_path']
+__all__ = ['convert_to_kspace', 'slice_along_path', 'build_conversion_plan']
+
+# Intermediates in the conversion are float64 (or intp) arrays with one value per target point
+CONVERSION_BYTES_PER_VALUE = 8
+PARALLEL_CHUNKS_PER_WORKER = 4
 
 
 def infer_kspace_coordinate_transform(arr: xr.DataArray):
@@ -309,7 +318,8 @@ def slice_along_path(arr: xr.DataArray, interpolation_points=None, axis_name=Non
 
 @update_provenance('Automatically k-space converted')
 def convert_to_kspace(arr: xr.DataArray, forward=False, bounds=None, resolution=None,
-                      coords=None, **kwargs):
+                      coords=None, plan: ConversionPlan = None, cache_plan=False, memory_budget=None,
+                      n_workers=None, executor=None, **kwargs):
     """
     "Forward" or "backward" converts the data to momentum space.
 
@@ -352,11 +362,45 @@ def convert_to_kspace(arr: xr.DataArray, forward=False, bounds=None, resolution=
     convert_to_kspace(f, coords={'kp': np.linspace(0, 1, 1001)})
     ```
 
+    If you are converting many scans which share the same geometry (angular coordinates, offsets, and
+    target coordinates), you can avoid re-evaluating the coordinate transforms for each of them by using a
+    conversion plan. Either build the plan once and pass it explicitly, or let PyARPES cache plans for you:
+
+    ```
+    plan = build_conversion_plan(scans[0])
+    converted = [convert_to_kspace(s, plan=plan) for s in scans]
+
+    # or
+    converted = [convert_to_kspace(s, cache_plan=True) for s in scans]
+    ```
+
+    Large volumes can be converted slab by slab to bound the memory used for intermediates:
+
+    ```
+    # use roughly at most 4GB in addition to the input and output
+    convert_to_kspace(f, memory_budget=4e9)
+    ```
+
+    Slabs are independent, so they can also be converted concurrently. NumPy releases the GIL for most of
+    the work, so threads are usually sufficient, but a process pool can be requested as well:
+
+    ```
+    convert_to_kspace(f, n_workers=32)
+    convert_to_kspace(f, n_workers=32, executor='process')
+    ```
+
 
     :param arr:
     :param forward:
     :param bounds:
     :param resolution:
+    :param plan: A ``ConversionPlan`` built for this geometry, see ``build_conversion_plan``. A ``ValueError``
+    is raised if the offsets, coordinates, or target coordinates of ``arr`` differ from those of the plan.
+    :param cache_plan: Whether to reuse (or build and remember) a plan for this geometry
+    :param memory_budget: Approximate number of bytes to use for intermediates. Large volumes are converted
+    in slabs along the leading target dimensions to stay within this.
+    :param n_workers: Number of threads or processes to convert slabs on concurrently
+    :param executor: An existing ``concurrent.futures.Executor``, or "thread" or "process"
     :return:
     """
 
@@ -375,6 +419,70 @@ def convert_to_kspace(arr: xr.DataArray, forward=False, bounds=None, resolution=
         raise NotImplementedError('Forward conversion of datasets not supported. Coordinate conversion is. '
                                   'See `arpes.utilities.conversion.forward.convert_coordinates_to_kspace_forward`')
 
+    conversion = _setup_kspace_conversion(arr, bounds=bounds, resolution=resolution, coords=coords)
+    if conversion is None:
+        return arr  # no need to convert, might be XPS or similar
+
+    converter, converted_coordinates, coordinate_transform = conversion
+
+    if memory_budget is None:
+        memory_budget = converter.default_memory_budget
+
+    key = None
+    if plan is not None or cache_plan:
+        key = conversion_plan_key(converter, arr, converted_coordinates, coordinate_transform['dims'])
+
+    if plan is not None and plan.key != key:
+        # plans of the same shape but other offsets, photon energy or coordinates would convert without error
+        raise ValueError('Conversion plan was built for a different geometry or target coordinates than this '
+                         'conversion, see `build_conversion_plan`.')
+
+    if plan is None and cache_plan:
+        plan = get_cached_plan(key)
+        if plan is None:
+            plan = plan_conversion(arr, converted_coordinates, coordinate_transform, key=key)
+            put_cached_plan(plan)
+
+    return convert_coordinates(arr, converted_coordinates, coordinate_transform, plan=plan,
+                               memory_budget=memory_budget, n_workers=n_workers, executor=executor)[0]
+
+
+def build_conversion_plan(arr: xr.DataArray, bounds=None, resolution=None, coords=None, **kwargs) -> ConversionPlan:
+    """
+    Builds a ``ConversionPlan`` for the momentum conversion of ``arr``. The plan can be passed to
+    ``convert_to_kspace`` for any other spectrum with the same coordinates and geometry. Arguments
+    are the same as for ``convert_to_kspace``.
+
+    :param arr:
+    :param bounds:
+    :param resolution:
+    :param coords:
+    :param kwargs:
+    :return:
+    """
+    if coords is None:
+        coords = {}
+
+    coords.update(kwargs)
+    arr = normalize_to_spectrum(arr)
+
+    conversion = _setup_kspace_conversion(arr, bounds=bounds, resolution=resolution, coords=coords)
+    if conversion is None:
+        raise AnalysisError('There are no dimensions to convert to momentum in {}'.format(arr.dims))
+
+    converter, converted_coordinates, coordinate_transform = conversion
+    return plan_conversion(
+        arr, converted_coordinates, coordinate_transform,
+        key=conversion_plan_key(converter, arr, converted_coordinates, coordinate_transform['dims']))
+
+
+def _setup_kspace_conversion(arr: xr.DataArray, bounds=None, resolution=None, coords=None):
+    """
+    Determines the converter, target coordinates, and coordinate transforms for
+    converting ``arr`` to momentum space.
+    :return: ``None`` if there is nothing to convert, else a tuple of the converter, the
+    target coordinates, and the coordinate transform
+    """
     has_eV = 'eV' in arr.dims
 
     # TODO be smarter about the resolution inference
@@ -406,7 +514,7 @@ def convert_to_kspace(arr: xr.DataArray, forward=False, bounds=None, resolution=
     old_dims.sort()
 
     if not old_dims:
-        return arr # no need to convert, might be XPS or similar
+        return None
 
     converted_dims = (['eV'] if has_eV else []) + {
         ('phi',): ['kp'],
@@ -431,13 +539,13 @@ def convert_to_kspace(arr: xr.DataArray, forward=False, bounds=None, resolution=
         #('chi', 'phi',): ConvertKxKy,
 
         ('hv', 'phi'): ConvertKpKz,
+
+        ('hv', 'phi', 'theta'): ConvertKxKyKz,
+        ('beta', 'hv', 'phi'): ConvertKxKyKz,
+        ('hv', 'phi', 'psi'): ConvertKxKyKz,
     }.get(tuple(old_dims))
     converter = convert_cls(arr, converted_dims)
 
-    n_kspace_coordinates = len(set(converted_dims).intersection({'kp', 'kx', 'ky', 'kz'}))
-    if n_kspace_coordinates > 1 and forward:
-        raise AnalysisError('You cannot forward convert more than one momentum to k-space.')
-
     converted_coordinates = converter.get_coordinates(
         resolution=resolution, bounds=bounds)
 
@@ -447,22 +555,28 @@ def convert_to_kspace(arr: xr.DataArray, forward=False, bounds=None, resolution=
 
     converted_coordinates.update(coords)
 
-    return convert_coordinates(
-        arr, converted_coordinates, {
-            'dims': converted_dims,
-            'transforms': dict(zip(arr.dims, [converter.conversion_for(d) for d in arr.dims]))})[0]
+    return converter, converted_coordinates, {
+        'dims': converted_dims,
+        'transforms': dict(zip(arr.dims, [converter.conversion_for(d) for d in arr.dims])),
+        'converter': converter,
+    }
 
 
-def convert_coordinates(arr: xr.DataArray, target_coordinates, coordinate_transform, as_dataset=False):
-    ordered_source_dimensions = arr.dims
-    grid_interpolator = grid_interpolator_from_dataarray(
-        arr.transpose(*ordered_source_dimensions), fill_value=float('nan'))
+def _meshed_target_coordinates(arr: xr.DataArray, target_coordinates, coordinate_transform, start=None, stop=None):
+    """
+    Builds the raveled target coordinates of every point on the target grid, or of the points
+    with raveled (C-order) indices in ``[start, stop)`` if these are provided.
+    """
+    target_dims = coordinate_transform['dims']
 
-    # Skip the Jacobian correction for now
-    # Convert the raw coordinate axes to a set of gridded points
-    meshed_coordinates = np.meshgrid(*[target_coordinates[dim] for dim in coordinate_transform['dims']],
-                                     indexing='ij')
-    meshed_coordinates = [meshed_coord.ravel() for meshed_coord in meshed_coordinates]
+    if start is None:
+        # Skip the Jacobian correction for now
+        # Convert the raw coordinate axes to a set of gridded points
+        meshed_coordinates = np.meshgrid(*[target_coordinates[dim] for dim in target_dims], indexing='ij')
+        meshed_coordinates = [meshed_coord.ravel() for meshed_coord in meshed_coordinates]
+    else:
+        indices = np.unravel_index(np.arange(start, stop), [len(target_coordinates[d]) for d in target_dims])
+        meshed_coordinates = [np.asarray(target_coordinates[d])[index] for d, index in zip(target_dims, indices)]
 
     if 'eV' not in arr.dims:
         try:
@@ -470,13 +584,316 @@ def convert_coordinates(arr: xr.DataArray, target_coordinates, coordinate_transf
         except ValueError:
             pass
 
+    return meshed_coordinates
+
+
+def _evaluate_transforms(arr: xr.DataArray, meshed_coordinates, target_coordinates, transforms):
+    """
+    Evaluates the coordinate transforms at a set of raveled target points.
+    :return: The names of the source dimensions which are converted, their raveled values,
+    and the raveled source coordinates along each of ``arr.dims``
+    """
     old_coord_names = [dim for dim in arr.dims if dim not in target_coordinates]
-    old_coordinate_transforms = [coordinate_transform['transforms'][dim] for dim in arr.dims if dim not in target_coordinates]
-    old_dimensions = [np.reshape(tr(*meshed_coordinates), [len(target_coordinates[d]) for d in coordinate_transform['dims']], order='C')
-                      for tr in old_coordinate_transforms]
+    old_values = [transforms[dim](*meshed_coordinates) for dim in old_coord_names]
+    source_points = [transforms[dim](*meshed_coordinates) for dim in arr.dims]
+
+    return old_coord_names, old_values, source_points
+
+
+def _evaluate_source_coordinates(arr: xr.DataArray, target_coordinates, coordinate_transform):
+    """
+    Evaluates the coordinate transforms over the full target grid.
+    :return: The names of the source dimensions which are converted, their values on the target
+    grid, and the raveled source coordinates of every target point along each of ``arr.dims``
+    """
+    target_shape = [len(target_coordinates[d]) for d in coordinate_transform['dims']]
+    meshed_coordinates = _meshed_target_coordinates(arr, target_coordinates, coordinate_transform)
+    old_coord_names, old_values, source_points = _evaluate_transforms(
+        arr, meshed_coordinates, target_coordinates, coordinate_transform['transforms'])
 
-    ordered_transformations = [coordinate_transform['transforms'][dim] for dim in arr.dims]
-    converted_volume = grid_interpolator(np.array([tr(*meshed_coordinates) for tr in ordered_transformations]).T)
+    old_dimensions = [np.reshape(values, target_shape, order='C') for values in old_values]
+    return old_coord_names, old_dimensions, source_points
+
+
+def _fresh_transforms(arr: xr.DataArray, coordinate_transform):
+    """
+    Coordinate converters cache intermediate results with the shape of the target points they were
+    first called with. When the target grid is processed in pieces, each piece therefore needs its
+    own converter with an empty cache.
+    """
+    converter = coordinate_transform.get('converter')
+    if converter is None:
+        return coordinate_transform['transforms']
+
+    converter = copy.copy(converter)
+    converter.clear_cache()
+    return {d: converter.conversion_for(d) for d in arr.dims}
+
+
+def estimate_conversion_memory(arr: xr.DataArray, target_shape, coordinate_transform) -> int:
+    """
+    Rough estimate of the peak memory in bytes used by a one-shot backward conversion. Per target point
+    we hold the meshed target coordinates, the source coordinates (twice, as they are stacked before
+    interpolation), a few intermediate arrays cached by the converter, and the interpolator's index
+    and weight arrays.
+    """
+    n_points = int(np.prod(target_shape))
+    return n_points * CONVERSION_BYTES_PER_VALUE * (len(coordinate_transform['dims']) + 5 * len(arr.dims) + 4)
+
+
+def _target_chunks(target_shape, points_per_chunk):
+    """
+    Splits the raveled target grid into contiguous ranges of at most ``points_per_chunk`` points.
+    Where possible the ranges are whole slabs along the leading target dimensions, i.e. full
+    energy slices for the usual (eV, kx, ky, ...) ordering.
+    """
+    n_points = int(np.prod(target_shape))
+    chunk = max(1, int(points_per_chunk))
+
+    for i in range(len(target_shape)):
+        slab = int(np.prod(target_shape[i + 1:]))
+        if slab <= chunk:
+            chunk = (chunk // slab) * slab
+            break
+
+    return [(start, min(start + chunk, n_points)) for start in range(0, n_points, chunk)]
+
+
+def plan_conversion(arr: xr.DataArray, target_coordinates, coordinate_transform, key=None) -> ConversionPlan:
+    """
+    Evaluates the coordinate transforms for a backward conversion once and records the result
+    as a ``ConversionPlan`` which can be applied to other arrays with the same geometry.
+    :param arr:
+    :param target_coordinates:
+    :param coordinate_transform:
+    :param key:
+    :return:
+    """
+    old_coord_names, old_dimensions, source_points = _evaluate_source_coordinates(
+        arr, target_coordinates, coordinate_transform)
+
+    return ConversionPlan.for_array(
+        arr, coordinate_transform['dims'], target_coordinates, source_points,
+        mapped_coordinates=dict(zip(old_coord_names, old_dimensions)), key=key)
+
+
+def _convert_chunk(arr: xr.DataArray, grid_interpolator, target_coordinates, coordinate_transform, start, stop):
+    meshed_coordinates = _meshed_target_coordinates(
+        arr, target_coordinates, coordinate_transform, start=start, stop=stop)
+    _, old_values, source_points = _evaluate_transforms(
+        arr, meshed_coordinates, target_coordinates, _fresh_transforms(arr, coordinate_transform))
+
+    return start, stop, grid_interpolator(np.array(source_points).T), old_values
+
+
+def _convert_chunk_in_process(shared, target_coordinates, coordinate_transform, start, stop):
+    """
+    Process pool entry point. The source volume is not sent with each task, instead ``shared`` holds
+    a memory mapped copy of it, see ``map_with_shared_dataarrays``.
+    """
+    arr = shared['arr']
+    converter = copy.copy(coordinate_transform['converter'])
+    converter.arr = arr
+
+    coordinate_transform = dict(coordinate_transform, converter=converter)
+    return _convert_chunk(arr, grid_interpolator_from_dataarray(arr, fill_value=float('nan')), target_coordinates,
+                          coordinate_transform, start, stop)
+
+
+def _convert_chunks_on_processes(arr: xr.DataArray, target_coordinates, coordinate_transform, chunks,
+                                 executor: Executor):
+    if coordinate_transform.get('converter') is None:
+        raise ValueError('Only conversions with a coordinate converter can be run on a process pool, '
+                         'use a thread pool instead.')
+
+    # The converter is shipped without its data, workers reattach it to their view of the shared volume
+    converter = copy.copy(coordinate_transform['converter'])
+    converter.arr = None
+    converter.clear_cache()
+    coordinate_transform = {'dims': coordinate_transform['dims'], 'converter': converter}
+
+    return map_with_shared_dataarrays(executor, _convert_chunk_in_process, {'arr': arr}, [
+        (target_coordinates, coordinate_transform, start, stop) for start, stop in chunks])
+
+
+def _convert_in_chunks(arr: xr.DataArray, grid_interpolator, target_coordinates, coordinate_transform, chunks,
+                       executor: Executor = None):
+    target_shape = [len(target_coordinates[d]) for d in coordinate_transform['dims']]
+    old_coord_names = [dim for dim in arr.dims if dim not in target_coordinates]
+    old_dimensions = [None] * len(old_coord_names)
+    converted_volume = None
+
+    if executor is None:
+        converted_chunks = (_convert_chunk(arr, grid_interpolator, target_coordinates, coordinate_transform,
+                                           start, stop) for start, stop in chunks)
+    elif isinstance(executor, ProcessPoolExecutor):
+        converted_chunks = _convert_chunks_on_processes(arr, target_coordinates, coordinate_transform, chunks,
+                                                        executor)
+    else:
+        converted_chunks = as_completed([
+            executor.submit(_convert_chunk, arr, grid_interpolator, target_coordinates, coordinate_transform,
+                            start, stop) for start, stop in chunks])
+        converted_chunks = (future.result() for future in converted_chunks)
+
+    for start, stop, converted_chunk, old_values in converted_chunks:
+        if converted_volume is None:
+            converted_volume = np.empty(int(np.prod(target_shape)), dtype=converted_chunk.dtype)
+            old_dimensions = [np.empty(target_shape, dtype=np.result_type(v)) for v in old_values]
+
+        converted_volume[start:stop] = converted_chunk
+        for old_dimension, values in zip(old_dimensions, old_values):
+            old_dimension.reshape(-1)[start:stop] = values
+
+    return old_coord_names, old_dimensions, converted_volume
+
+
+def _is_separable(arr: xr.DataArray, target_coordinates, coordinate_transform) -> bool:
+    """
+    Determines whether the conversion can be performed by ``_convert_separable``: the converter declares
+    a separable pair of axes, and every other target dimension, including the binding energy, is
+    carried over unchanged from the source.
+    """
+    converter = coordinate_transform.get('converter')
+    if converter is None or converter.separable_axes is None or 'eV' not in arr.dims:
+        return False
+
+    source_dim, target_dim = converter.separable_axes
+    if source_dim not in arr.dims or target_dim not in coordinate_transform['dims']:
+        return False
+
+    unchanged_dims = [d for d in coordinate_transform['dims'] if d != target_dim]
+    if set(unchanged_dims) != set(arr.dims).difference([source_dim]):
+        return False
+
+    return all(np.array_equal(np.asarray(target_coordinates[d]), arr.coords[d].values) for d in unchanged_dims)
+
+
+def _convert_separable(arr: xr.DataArray, target_coordinates, coordinate_transform):
+    """
+    Backward conversion for separable cases like ('eV', 'phi') cuts, where the source angle depends only on the
+    binding energy and momentum. Instead of interpolating on the full grid, the source angle is computed once per
+    (eV, k) pair and every energy row is resampled linearly along the angle axis, broadcasting over any
+    remaining dimensions such as ``delay`` or ``cycle``.
+    """
+    converter = copy.copy(coordinate_transform['converter'])
+    converter.clear_cache()
+    source_dim, target_dim = converter.separable_axes
+
+    target_dims = coordinate_transform['dims']
+    extra_dims = [d for d in target_dims if d not in ('eV', target_dim)]
+    values = arr.transpose('eV', source_dim, *extra_dims).values
+
+    energies = np.asarray(target_coordinates['eV'])[:, np.newaxis]
+    momenta = np.asarray(target_coordinates[target_dim])[np.newaxis, :]
+    source = np.broadcast_to(converter.conversion_for(source_dim)(energies, momenta),
+                             (energies.shape[0], momenta.shape[1]))
+
+    lower, fraction, out_of_bounds = _locate_along_axis(arr.coords[source_dim].values, source)
+    upper = np.minimum(lower + 1, values.shape[1] - 1)
+    rows = np.arange(values.shape[0])[:, np.newaxis]
+
+    expand = (slice(None), slice(None)) + (np.newaxis,) * len(extra_dims)
+    converted = values[rows, lower] * (1 - fraction)[expand] + values[rows, upper] * fraction[expand]
+    converted[np.logical_or(out_of_bounds, np.isnan(fraction))] = np.nan
+
+    converted_order = ['eV', target_dim] + extra_dims
+    axes = [converted_order.index(d) for d in target_dims]
+    converted = np.transpose(converted, axes)
+
+    target_shape = [len(target_coordinates[d]) for d in target_dims]
+    mapped_source = np.transpose(source[expand], axes)
+
+    return [source_dim], [np.broadcast_to(mapped_source, target_shape)], converted
+
+
+@contextlib.contextmanager
+def _conversion_executor(n_workers=None, executor=None):
+    """
+    Resolves the ``n_workers`` and ``executor`` arguments of ``convert_coordinates`` to an executor,
+    creating (and afterwards shutting down) a pool if one was not provided.
+    """
+    if executor is None and n_workers is None:
+        yield None
+        return
+
+    if isinstance(executor, Executor):
+        yield executor
+        return
+
+    pool_cls = {
+        None: ThreadPoolExecutor,
+        'thread': ThreadPoolExecutor,
+        'process': ProcessPoolExecutor,
+    }.get(executor)
+
+    if pool_cls is None:
+        raise ValueError('executor should be an Executor, "thread", or "process", not {}'.format(executor))
+
+    with pool_cls(max_workers=n_workers) as pool:
+        yield pool
+
+
+def convert_coordinates(arr: xr.DataArray, target_coordinates, coordinate_transform, as_dataset=False,
+                        plan: ConversionPlan = None, memory_budget=None, n_workers=None, executor=None):
+    """
+    Backward converts ``arr`` onto ``target_coordinates``, by evaluating the inverse coordinate transforms
+    on the target grid and interpolating into the source volume.
+
+    :param arr:
+    :param target_coordinates:
+    :param coordinate_transform: ``dict`` with the target ``dims`` and ``transforms`` from the target
+    coordinates to each source dimension. If a ``converter`` is included, fresh copies of it are used
+    when the target grid is processed in pieces, and separable conversions (see
+    ``CoordinateConverter.separable_axes``) are performed by resampling each energy row along one axis.
+    :param as_dataset:
+    :param plan: If provided, a ``ConversionPlan`` is applied instead of evaluating the transforms
+    :param memory_budget: Approximate number of bytes the conversion may use for intermediates. If the
+    one-shot conversion would exceed this, the target grid is converted slab by slab instead.
+    The result is identical either way.
+    :param n_workers: If provided, slabs are converted concurrently on this many workers
+    :param executor: Either an existing ``concurrent.futures.Executor``, or one of "thread" (the default)
+    or "process" to create a pool with ``n_workers`` workers. Process pools read the source volume from
+    a temporary memory mapped file shared by all workers rather than receiving a copy per task.
+    :return:
+    """
+    target_shape = [len(target_coordinates[d]) for d in coordinate_transform['dims']]
+
+    if plan is not None:
+        if tuple(coordinate_transform['dims']) != plan.target_dims or tuple(target_shape) != plan.target_shape:
+            raise ValueError('Conversion plan does not match the requested target coordinates.')
+
+        old_coord_names = [dim for dim in arr.dims if dim not in target_coordinates]
+        old_dimensions = [plan.mapped_coordinates[d] for d in old_coord_names]
+        converted_volume = plan.apply(arr)
+    elif _is_separable(arr, target_coordinates, coordinate_transform):
+        old_coord_names, old_dimensions, converted_volume = _convert_separable(
+            arr, target_coordinates, coordinate_transform)
+    else:
+        ordered_source_dimensions = arr.dims
+        grid_interpolator = grid_interpolator_from_dataarray(
+            arr.transpose(*ordered_source_dimensions), fill_value=float('nan'))
+
+        n_points = int(np.prod(target_shape))
+        estimated_memory = estimate_conversion_memory(arr, target_shape, coordinate_transform)
+        parallel = n_workers is not None or executor is not None
+
+        if not parallel and (memory_budget is None or estimated_memory <= memory_budget):
+            old_coord_names, old_dimensions, source_points = _evaluate_source_coordinates(
+                arr, target_coordinates, coordinate_transform)
+            converted_volume = grid_interpolator(np.array(source_points).T)
+        else:
+            points_per_chunk = n_points
+            if memory_budget is not None:
+                # every worker holds the intermediates for one chunk at a time
+                points_per_chunk = n_points * memory_budget // (estimated_memory * (n_workers or 1))
+            if parallel:
+                # a few chunks per worker for load balancing
+                points_per_chunk = min(points_per_chunk, -(-n_points // (PARALLEL_CHUNKS_PER_WORKER * (n_workers or 1))))
+
+            with _conversion_executor(n_workers, executor) as pool:
+                old_coord_names, old_dimensions, converted_volume = _convert_in_chunks(
+                    arr, grid_interpolator, target_coordinates, coordinate_transform,
+                    _target_chunks(target_shape, points_per_chunk), executor=pool)
 
     # Wrap it all up
     def acceptable_coordinate(c: Union[np.ndarray, xr.DataArray]) -> bool:
@@ -11,10 +11,15 @@ __all__ = ['ConvertKp', 'ConvertKxKy']
 
 
 class ConvertKp(CoordinateConverter):
+    separable_axes = ('phi', 'kp')
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.k_tot = None
 
+    def clear_cache(self) -> None:
+        self.k_tot = None
+
     def get_coordinates(self, resolution: dict = None, bounds: dict = None) -> Dict[str, np.ndarray]:
         if resolution is None:
             resolution = {}
@@ -106,6 +111,12 @@ class ConvertKxKy(CoordinateConverter):
         else:
             self.parallel_angles = ('theta', opposite_direct_angle,)
 
+    def clear_cache(self) -> None:
+        self.k_tot = None
+        self.phi = None
+        self.perp_angle = None
+        self.rkx = None
+        self.rky = None
 
     def get_coordinates(self, resolution: dict = None, bounds: dict = None) -> Dict[str, np.ndarray]:
         if resolution is None:
@@ -1,10 +1,12 @@
 import numpy as np
 
 import arpes.constants
+import xarray as xr
 from typing import Any, Callable, Dict
 
 from .base import CoordinateConverter, K_SPACE_BORDER, MOMENTUM_BREAKPOINTS
-from .bounds_calculations import calculate_kp_kz_bounds
+from .bounds_calculations import calculate_kp_kz_bounds, calculate_kx_ky_kz_bounds
+from .kx_ky_conversion import ConvertKxKy
 
 __all__ = ['ConvertKpKzV0', 'ConvertKxKyKz', 'ConvertKpKz']
 
@@ -15,9 +17,109 @@ class ConvertKpKzV0(CoordinateConverter):
         raise NotImplementedError()
 
 
-class ConvertKxKyKz(CoordinateConverter):
-    def __init__(self, *args, **kwargs):
-        super(ConvertKxKyKz, self).__init__(*args, **kwargs)
+class ConvertKxKyKz(ConvertKxKy):
+    """
+    Converts photon energy dependent maps with dimensions (eV, hv, phi, perpendicular angle) to
+    (eV, kx, ky, kz) assuming a free electron final state with inner potential ``arr.S.inner_potential``.
+
+    Given the momentum inside the sample, energy conservation determines the kinetic energy and therefore
+    the photon energy. The emission angles are then those of a ``ConvertKxKy`` conversion at that kinetic
+    energy, so the same slit orientations and scan angles are supported.
+
+    These volumes are typically several GB, so by default the target grid is converted in slabs, see
+    ``convert_coordinates``.
+    """
+    default_memory_budget = 2 * 1024 ** 3
+
+    def __init__(self, arr: xr.DataArray, *args: Any, **kwargs: Any) -> None:
+        super(ConvertKxKyKz, self).__init__(arr, *args, **kwargs)
+        self.hv = None
+
+    def clear_cache(self) -> None:
+        super(ConvertKxKyKz, self).clear_cache()
+        self.hv = None
+
+    def get_coordinates(self, resolution: dict = None, bounds: dict = None) -> Dict[str, np.ndarray]:
+        if resolution is None:
+            resolution = {}
+        if bounds is None:
+            bounds = {}
+
+        coordinates = CoordinateConverter.get_coordinates(self, resolution=resolution, bounds=bounds)
+
+        ((kx_low, kx_high), (ky_low, ky_high), (kz_low, kz_high)) = calculate_kx_ky_kz_bounds(self.arr)
+
+        if 'kx' in bounds:
+            kx_low, kx_high = bounds['kx']
+        if 'ky' in bounds:
+            ky_low, ky_high = bounds['ky']
+        if 'kz' in bounds:
+            kz_low, kz_high = bounds['kz']
+
+        kx_angle, ky_angle = self.direct_angles
+        if self.is_slit_vertical:
+            # phi actually measures along ky
+            ky_angle, kx_angle = kx_angle, ky_angle
+
+        def infer_resolution(low, high, n_points):
+            inferred = (high - low + 2 * K_SPACE_BORDER) / n_points
+            try:
+                return [b for b in MOMENTUM_BREAKPOINTS if b < inferred][-2 if (n_points < 80) else -1]
+            except IndexError:
+                return MOMENTUM_BREAKPOINTS[-2]
+
+        inferred_kx_res = infer_resolution(kx_low, kx_high, len(self.arr.coords[kx_angle]))
+        inferred_ky_res = infer_resolution(ky_low, ky_high, len(self.arr.coords[ky_angle]))
+        inferred_kz_res = infer_resolution(kz_low, kz_high, len(self.arr.coords['hv']))
+
+        coordinates['kx'] = np.arange(kx_low - K_SPACE_BORDER, kx_high + K_SPACE_BORDER,
+                                      resolution.get('kx', inferred_kx_res))
+        coordinates['ky'] = np.arange(ky_low - K_SPACE_BORDER, ky_high + K_SPACE_BORDER,
+                                      resolution.get('ky', inferred_ky_res))
+        coordinates['kz'] = np.arange(kz_low - K_SPACE_BORDER, kz_high + K_SPACE_BORDER,
+                                      resolution.get('kz', inferred_kz_res))
+
+        base_coords = {k: v for k, v in self.arr.coords.items()
+                       if k not in ['eV', 'phi', 'psi', 'theta', 'beta', 'alpha', 'chi', 'hv']}
+        coordinates.update(base_coords)
+
+        return coordinates
+
+    def kspace_to_hv(self, binding_energy: np.ndarray, kx: np.ndarray, ky: np.ndarray, kz: np.ndarray,
+                     *args: Any, **kwargs: Any) -> np.ndarray:
+        if self.hv is None:
+            inner_v = self.arr.S.inner_potential
+            wf = self.arr.S.work_function
+            self.hv = arpes.constants.HV_CONVERSION * (kx ** 2 + ky ** 2 + kz ** 2) + (
+                -inner_v - binding_energy + wf)
+
+        return self.hv
+
+    def compute_k_tot_at_hv(self, binding_energy: np.ndarray, kx: np.ndarray, ky: np.ndarray,
+                            kz: np.ndarray) -> None:
+        # the kinetic energy of the photoelectron in vacuum, which sets the emission angles
+        hv = self.kspace_to_hv(binding_energy, kx, ky, kz)
+        self.k_tot = arpes.constants.K_INV_ANGSTROM * np.sqrt(hv - self.arr.S.work_function + binding_energy)
+
+    def kspace_to_phi(self, binding_energy: np.ndarray, kx: np.ndarray, ky: np.ndarray, kz: np.ndarray,
+                      *args: Any, **kwargs: Any) -> np.ndarray:
+        if self.k_tot is None:
+            self.compute_k_tot_at_hv(binding_energy, kx, ky, kz)
+
+        return super(ConvertKxKyKz, self).kspace_to_phi(binding_energy, kx, ky)
+
+    def kspace_to_perp_angle(self, binding_energy: np.ndarray, kx: np.ndarray, ky: np.ndarray, kz: np.ndarray,
+                             *args: Any, **kwargs: Any) -> np.ndarray:
+        if self.k_tot is None:
+            self.compute_k_tot_at_hv(binding_energy, kx, ky, kz)
+
+        return super(ConvertKxKyKz, self).kspace_to_perp_angle(binding_energy, kx, ky)
+
+    def conversion_for(self, dim: str) -> Callable:
+        if dim == 'hv':
+            return self.kspace_to_hv
+
+        return super(ConvertKxKyKz, self).conversion_for(dim)
 
 
 class ConvertKpKz(CoordinateConverter):
@@ -25,6 +127,9 @@ class ConvertKpKz(CoordinateConverter):
         super(ConvertKpKz, self).__init__(*args, **kwargs)
         self.hv = None
 
+    def clear_cache(self) -> None:
+        self.hv = None
+
     def get_coordinates(self, resolution: dict = None, bounds: dict = None) -> Dict[str, np.ndarray]:
         if resolution is None:
             resolution = {}
@@ -0,0 +1,232 @@
+"""
+Precomputed, reusable interpolation plans for backward coordinate conversion.
+
+Most of the time spent in a backward conversion goes into building the meshgrid of target
+coordinates, evaluating the ``kspace_to_*`` transforms over it, and locating each resulting
+point in the source volume. None of this depends on the spectrum itself, only on the
+geometry of the conversion: the converter, the source and target coordinates, and the
+angular and energy offsets.
+
+A ``ConversionPlan`` records, for every target point, the lower corner of the source cell
+it falls in and its fractional position along each source axis. Applying the plan to a
+spectrum with the same geometry is then a gather over ``arr.values`` and a weighted sum over
+the corners of the enclosing cell, which is the same multilinear interpolation performed
+by ``scipy.interpolate.RegularGridInterpolator``. Points outside the source volume are
+filled with NaN.
+
+Plans can be built explicitly and passed to ``convert_to_kspace(..., plan=plan)``, or
+looked up in a small in-memory cache with ``convert_to_kspace(..., cache_plan=True)``.
+"""
+
+import hashlib
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+
+import xarray as xr
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+__all__ = ('ConversionPlan', 'conversion_plan_key', 'clear_conversion_plan_cache',)
+
+# Plans are large (several arrays of the size of the target volume), so only a few are kept
+MAX_CACHED_PLANS = 8
+
+_GEOMETRY_COORDINATES = ('alpha', 'beta', 'chi', 'phi', 'psi', 'theta', 'hv', 'eV',)
+
+_PLAN_CACHE = OrderedDict()
+
+
+def _hash_values(values: Any) -> Hashable:
+    if isinstance(values, xr.DataArray):
+        values = values.values
+
+    values = np.asarray(values)
+    if values.size == 1:
+        item = values.item()
+        return item if isinstance(item, (int, float, str, bool)) else str(item)
+
+    digest = hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest()
+    return values.shape, str(values.dtype), digest
+
+
+def _geometry_key(arr: xr.DataArray) -> Tuple:
+    key = []
+    for name in _GEOMETRY_COORDINATES:
+        key.append((name + '_offset', _hash_values(arr.S.lookup_offset(name))))
+
+        if name in arr.dims:
+            continue
+
+        try:
+            key.append((name, _hash_values(arr.S.lookup_coord(name))))
+        except ValueError:
+            key.append((name, None))
+
+    key.append(('work_function', _hash_values(arr.S.work_function)))
+    key.append(('inner_potential', _hash_values(arr.S.inner_potential)))
+    return tuple(key)
+
+
+def conversion_plan_key(converter: Any, arr: xr.DataArray, target_coordinates: Dict[str, Any],
+                        target_dims: Sequence[str]) -> Tuple:
+    """
+    Computes the key identifying the geometry of a backward conversion: the converter class,
+    the source coordinates, the target coordinates, and all offsets and scalar coordinates
+    which enter the coordinate transforms.
+    :param converter:
+    :param arr:
+    :param target_coordinates:
+    :param target_dims:
+    :return:
+    """
+    return (
+        type(converter),
+        tuple((d, _hash_values(arr.coords[d])) for d in arr.dims),
+        tuple((d, _hash_values(target_coordinates[d])) for d in target_dims),
+        _geometry_key(arr),
+    )
+
+
+def clear_conversion_plan_cache() -> None:
+    _PLAN_CACHE.clear()
+
+
+def _locate_along_axis(grid: np.ndarray, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds the lower index of the cell containing each point along a single source axis, together
+    with the fractional position of the point inside that cell. Descending axes are handled by
+    locating on the reversed grid and mapping back, as RegularGridInterpolator does.
+    :return: (lower index, fractional offset, out of bounds mask)
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    n = len(grid)
+    descending = n > 1 and grid[1] - grid[0] < 0
+    if descending:
+        grid = grid[::-1]
+
+    out_of_bounds = np.logical_or(points < grid[0], points > grid[-1])
+
+    if n == 1:
+        return np.zeros(points.shape, dtype=np.intp), np.zeros(points.shape), out_of_bounds
+
+    lower = np.searchsorted(grid, points) - 1
+    np.clip(lower, 0, n - 2, out=lower)
+    fraction = (points - grid[lower]) / (grid[lower + 1] - grid[lower])
+
+    if descending:
+        lower = (n - 2) - lower
+        fraction = 1 - fraction
+
+    return lower, fraction, out_of_bounds
+
+
+class ConversionPlan:
+    """
+    Inverse-mapped source positions and interpolation weights for a fixed conversion geometry.
+    """
+    def __init__(self, source_dims: Sequence[str], source_grids: Sequence[np.ndarray],
+                 target_dims: Sequence[str], target_coordinates: Dict[str, np.ndarray],
+                 source_points: Sequence[np.ndarray], mapped_coordinates: Dict[str, np.ndarray] = None,
+                 key: Optional[Tuple] = None):
+        """
+        :param source_dims: Dimensions of the arrays the plan will be applied to, in order
+        :param source_grids: Coordinates of those arrays along each of ``source_dims``
+        :param target_dims: Dimensions of the converted array, in order
+        :param target_coordinates: Coordinates of the converted array along ``target_dims``
+        :param source_points: For each of ``source_dims``, the raveled source coordinate of each target point
+        :param mapped_coordinates: Source coordinates of the converted dimensions, reshaped onto the target grid
+        :param key: Geometry key, see ``conversion_plan_key``
+        """
+        self.source_dims = tuple(source_dims)
+        self.source_shape = tuple(len(g) for g in source_grids)
+        self.target_dims = tuple(target_dims)
+        self.target_coordinates = {d: np.asarray(target_coordinates[d]) for d in self.target_dims}
+        self.target_shape = tuple(len(self.target_coordinates[d]) for d in self.target_dims)
+        self.mapped_coordinates = mapped_coordinates or {}
+        self.key = key
+
+        if len(source_points) != len(self.source_dims):
+            raise ValueError('Expected source points for each of {}'.format(self.source_dims))
+
+        n_points = int(np.prod(self.target_shape))
+        strides = np.cumprod((self.source_shape[1:] + (1,))[::-1])[::-1]
+
+        self.flat_index = np.zeros(n_points, dtype=np.intp)
+        self.invalid = np.zeros(n_points, dtype=bool)
+        self.strides = []
+        fractions = []
+
+        for grid, points, stride in zip(source_grids, source_points, strides):
+            points = np.asarray(points, dtype=np.float64).ravel()
+            if points.shape[0] == 1:
+                points = np.full(n_points, points[0])
+
+            if points.shape[0] != n_points:
+                raise ValueError('Source points do not match the shape of the target grid.')
+
+            lower, fraction, out_of_bounds = _locate_along_axis(grid, points)
+            self.flat_index += lower * int(stride)
+            self.invalid |= out_of_bounds
+
+            if len(grid) > 1:
+                self.invalid |= np.isnan(fraction)
+                self.strides.append(int(stride))
+                fractions.append(fraction)
+
+        # Point invalid entries at a safe location, they are overwritten with NaN on application
+        self.flat_index[self.invalid] = 0
+        self.fractions = np.stack(fractions) if fractions else np.zeros((0, n_points))
+        self.fractions[:, self.invalid] = 0
+        self.complements = 1 - self.fractions
+
+    @classmethod
+    def for_array(cls, arr: xr.DataArray, *args: Any, **kwargs: Any) -> 'ConversionPlan':
+        return cls(arr.dims, [arr.coords[d].values for d in arr.dims], *args, **kwargs)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.flat_index.nbytes + self.invalid.nbytes + self.fractions.nbytes + self.complements.nbytes +
+                sum(v.nbytes for v in self.mapped_coordinates.values()))
+
+    def check_compatible(self, arr: xr.DataArray) -> None:
+        if tuple(arr.dims) != self.source_dims or tuple(arr.shape) != self.source_shape:
+            raise ValueError('Conversion plan was built for dims {} with shape {}, but received {} with shape {}.'.format(
+                self.source_dims, self.source_shape, tuple(arr.dims), tuple(arr.shape)))
+
+    def apply(self, arr: xr.DataArray) -> np.ndarray:
+        """
+        Interpolates ``arr`` onto the target grid of the plan.
+        :param arr:
+        :return: An array with shape ``self.target_shape``
+        """
+        self.check_compatible(arr)
+
+        flat_values = np.ascontiguousarray(arr.values).reshape(-1)
+        converted = np.zeros(self.flat_index.shape, dtype=np.result_type(flat_values.dtype, np.float64))
+
+        for corner in itertools.product((0, 1), repeat=len(self.strides)):
+            offset = sum(c * s for c, s in zip(corner, self.strides))
+            weight = np.ones(self.flat_index.shape)
+            for i, c in enumerate(corner):
+                weight *= self.fractions[i] if c else self.complements[i]
+
+            converted += flat_values[self.flat_index + offset] * weight
+
+        converted[self.invalid] = np.nan
+        return converted.reshape(self.target_shape)
+
+
+def get_cached_plan(key: Tuple) -> Optional[ConversionPlan]:
+    plan = _PLAN_CACHE.get(key)
+    if plan is not None:
+        _PLAN_CACHE.move_to_end(key)
+
+    return plan
+
+
+def put_cached_plan(plan: ConversionPlan) -> None:
+    _PLAN_CACHE[plan.key] = plan
+    _PLAN_CACHE.move_to_end(plan.key)
+    while len(_PLAN_CACHE) > MAX_CACHED_PLANS:
+        _PLAN_CACHE.popitem(last=False)
@@ -1,6 +1,11 @@
+import hashlib
+import json
 import logging
 import os
+import pickle
 import re
+import tempfile
+import threading
 import uuid
 import warnings
 from collections import namedtuple
@@ -13,15 +18,25 @@ import pandas as pd
 import arpes.config
 from arpes.exceptions import ConfigurationError
 from arpes.utilities.string import snake_case
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 __all__ = ['clean_xlsx_dataset', 'default_dataset', 'infer_data_path',
            'attach_extra_dataset_columns', 'swap_reference_map',
            'cleaned_dataset_exists', 'modern_clean_xlsx_dataset', 'cleaned_pair_paths',
-           'list_files_for_rename', 'rename_files']
+           'list_files_for_rename', 'rename_files', 'clear_dataset_tables']
 
 _DATASET_EXTENSIONS = {'.xlsx', '.xlx',}
 
+# bumped whenever the layout of persisted dataset tables or the cleaning of spreadsheets changes
+DATASET_TABLE_FORMAT = 2
+
+# ``checked_paths`` are the data paths inferred while building the table, which are checked to still exist
+DatasetTable = namedtuple('DatasetTable', ('format', 'key', 'stat', 'digest', 'table', 'checked_paths'))
+
+# Cleaned tables by spreadsheet and cleaning options, see ``_cached_table``
+_DATASET_TABLES = {}
+_DATASET_TABLES_LOCK = threading.Lock()
+
 def shorten_left(s, max_length=20):
     if len(s) > max_length:
         return '...' + s[-(max_length - 3):]
@@ -79,7 +94,7 @@ def infer_data_path(file: int, scan_desc: pd.Series, allow_soft_match: bool = Fa
 
     from arpes.endstations import resolve_endstation
     endstation_cls = resolve_endstation(retry=True, **scan_desc)
-    return endstation_cls.find_first_file(file, scan_desc)
+    return endstation_cls.find_first_file(file, scan_desc, allow_soft_match=allow_soft_match)
 
 
 def swap_reference_map(df: pd.DataFrame, old_reference, new_reference):
@@ -204,22 +219,215 @@ def with_inferred_columns(df: pd.DataFrame):
         warnings.warn('You need to have a spectrum_type column. Try using `prepare_raw_files` first.')
         return df
 
-    df['ref_map'] = ''
-    df['ref_id'] = ''
-
-    last_map = None
     logging.warning('Assuming sort along index')
-    for index, row in df.sort_index().iterrows():
 
-        if last_map is not None:
-            df.loc[index, ('ref_map', 'ref_id')] = last_map, df.loc[last_map, ('id',)]
+    # positions of the rows in index order, and of the last map strictly before each of them
+    order = pd.Series(np.arange(len(df)), index=df.index).sort_index(kind='mergesort').values
+    is_map = (df['spectrum_type'] == 'map').values[order]
+    last_map = pd.Series(np.where(is_map, order, np.nan)).shift(1).ffill().values
 
-        if row.spectrum_type == 'map':
-            last_map = index
+    ref_map, ref_id = np.full(len(df), '', dtype=object), np.full(len(df), '', dtype=object)
+    has_ref = ~np.isnan(last_map)
+    last_map = last_map[has_ref].astype(int)
+    ref_map[order[has_ref]] = df.index.values[last_map]
+    ref_id[order[has_ref]] = df['id'].values[last_map]
+
+    df['ref_map'] = ref_map
+    df['ref_id'] = ref_id
 
     return df
 
 
+def _cascade_blank_values(df: pd.DataFrame, skip=()) -> pd.DataFrame:
+    """
+    Fills blank cells with the closest value above them in the same column, as when filling down in a spreadsheet.
+    :param df:
+    :param skip: Columns which are left as they are
+    :return:
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in skip:
+            continue
+
+        values = df[column]
+        blank = values.map(is_blank).astype(bool)
+        if not blank.any():
+            continue
+
+        filled = values.mask(blank).ffill()
+        df[column] = values.where(~blank | filled.isnull(), filled)
+
+    return df
+
+
+def _unchanged_rows(df: pd.DataFrame, previous: Optional[pd.DataFrame], ignore=()):
+    """
+    Finds the rows of a cleaned table which are the same as the row for the same file in an earlier version of
+    the table, so that the values generated for them (ids, inferred paths) can be kept.
+    :param df:
+    :param previous:
+    :param ignore: Generated columns, which are not compared
+    :return: A mask of unchanged rows, and the rows of ``previous`` aligned to ``df``
+    """
+    unchanged = pd.Series(False, index=df.index)
+    if previous is None or list(previous.columns) != list(df.columns) or previous['file'].duplicated().any():
+        return unchanged, None
+
+    matched = previous.set_index('file').reindex(df['file'].values)
+    matched.index = df.index
+
+    unchanged = df['file'].isin(previous['file'].values)
+    for column in df.columns:
+        if column in ignore or column == 'file':
+            continue
+
+        current, earlier = df[column], matched[column]
+        unchanged &= (current == earlier) | (current.isnull() & earlier.isnull())
+
+    return unchanged, matched
+
+
+def dataset_table_directory() -> Optional[str]:
+    """
+    The directory persisted dataset tables are kept in: the ``path`` of the ``dataset_tables`` settings if
+    provided, otherwise a folder inside the dataset cache of the current configuration.
+    :return:
+    """
+    path = arpes.config.SETTINGS.get('dataset_tables', {}).get('path')
+    if path is None and arpes.config.DATASET_CACHE_PATH is not None:
+        path = os.path.join(arpes.config.DATASET_CACHE_PATH, 'tables')
+
+    return path
+
+
+def _persisted_table_path(key: str) -> Optional[str]:
+    directory = dataset_table_directory()
+    if directory is None or not arpes.config.SETTINGS.get('dataset_tables', {}).get('persist', True):
+        return None
+
+    return os.path.join(directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.pickle')
+
+
+def _read_persisted_table(key: str) -> Optional[DatasetTable]:
+    path = _persisted_table_path(key)
+    if path is None:
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError) as e:
+        warnings.warn('Discarding unreadable dataset table {}: {}'.format(path, e))
+        return None
+
+    if not isinstance(entry, DatasetTable) or entry.format != DATASET_TABLE_FORMAT or entry.key != key:
+        return None
+
+    return entry
+
+
+def _persist_table(entry: DatasetTable) -> None:
+    """
+    Writes a table atomically, so that other sessions never read a partially written file.
+    """
+    path = _persisted_table_path(entry.key)
+    if path is None:
+        return
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    except OSError as e:
+        warnings.warn('Could not persist dataset table: {}'.format(e))
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temporary_path, path)
+    except (OSError, pickle.PicklingError, TypeError) as e:
+        warnings.warn('Could not persist dataset table: {}'.format(e))
+        os.remove(temporary_path)
+
+
+def _file_stat(path: str):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _data_path_configuration() -> Dict[str, Any]:
+    """
+    The configuration data paths are inferred from, see ``EndstationBase.find_first_file``.
+    """
+    workspace = arpes.config.CONFIG['WORKSPACE'] or {}
+    if not isinstance(workspace, dict):
+        workspace = {'name': workspace}
+
+    return {
+        'data_path': arpes.config.DATA_PATH,
+        'workspace': [workspace.get('name'), workspace.get('path')],
+    }
+
+
+def _cached_table(path: str, options: Dict[str, Any], build) -> pd.DataFrame:
+    """
+    Memoizes the table read from a spreadsheet, keyed on the spreadsheet's modification time and the hash of its
+    contents. Tables are also persisted in the dataset cache, so that new sessions do not need to parse the
+    spreadsheet again. A table is built again if any of the data paths inferred for it no longer exists.
+
+    :param path: The spreadsheet
+    :param options: Everything else the table depends on
+    :param build: Builds the table, given the previous version of the table for the same spreadsheet or None,
+    returning it together with the data paths it inferred
+    :return: The table, which must not be modified
+    """
+    key = json.dumps([os.path.abspath(path), options], sort_keys=True, default=repr)
+    stat = _file_stat(path)
+
+    with _DATASET_TABLES_LOCK:
+        entry = _DATASET_TABLES.get(key)
+
+    def paths_exist(e):
+        return all(os.path.exists(p) for p in e.checked_paths)
+
+    if entry is not None and entry.stat == stat and paths_exist(entry):
+        return entry.table
+
+    digest = _file_digest(path)
+    if entry is None:
+        entry = _read_persisted_table(key)
+
+    if entry is not None and entry.digest == digest and paths_exist(entry):
+        entry = entry._replace(stat=stat)
+    else:
+        table, checked_paths = build(None if entry is None else entry.table)
+        entry = DatasetTable(DATASET_TABLE_FORMAT, key, stat, digest, table, tuple(checked_paths))
+        _persist_table(entry)
+
+    with _DATASET_TABLES_LOCK:
+        _DATASET_TABLES[key] = entry
+
+    return entry.table
+
+
+def clear_dataset_tables() -> None:
+    """
+    Forgets the tables read from spreadsheets in this session. Persisted tables are kept, but are only used while
+    their spreadsheet is unchanged.
+    """
+    with _DATASET_TABLES_LOCK:
+        _DATASET_TABLES.clear()
+
+
 def cleaned_path(path: str) -> str:
     base_filename, extension = os.path.splitext(path)
     if '.cleaned' in base_filename:
@@ -288,23 +496,11 @@ def modern_clean_xlsx_dataset(path, allow_soft_match=False, with_inferred_cols=T
 
     joined = original.set_index('file').combine_first(cleaned.set_index('file'))
 
-    last_index = None
-
-    # Cascade blank values
-    for index, row in joined.iterrows():
-        row = row.copy()
-
-        for key, value in row.iteritems():
-            if key == 'path':
-                continue
-
-            if key == 'id' and is_blank(row.id):
-                joined.loc[index, ('id',)] = str(uuid.uuid1())
-
-            elif last_index is not None and is_blank(value) and not is_blank(joined.loc[last_index, (key,)]):
-                joined.loc[index, (key,)] = joined.loc[last_index, (key,)]
-
-        last_index = index
+    # Cascade blank values, every scan without an id gets a new one
+    joined = _cascade_blank_values(joined, skip=('path', 'id'))
+    if 'id' in joined.columns:
+        blank_ids = joined['id'].map(is_blank).astype(bool)
+        joined.loc[blank_ids, 'id'] = [str(uuid.uuid1()) for _ in range(blank_ids.sum())]
 
     for index, row in joined.iterrows():
         joined.loc[index, ('path',)] = infer_data_path(index, row, allow_soft_match)
@@ -340,11 +536,34 @@ def clean_xlsx_dataset(path: str, allow_soft_match: bool = False, write: bool =
         else:
             if warn_on_exists:
                 logging.warning('Cleaned dataset already exists! Reading existing...')
-            ds = pd.read_excel(new_filename).set_index('file')
+            ds = _cached_table(new_filename, {'cleaned': True},
+                               lambda previous: (pd.read_excel(new_filename), ())).set_index('file')
             if with_inferred_cols:
                 return with_inferred_columns(ds)
             return ds
 
+    ds = _cached_table(path, {'allow_soft_match': allow_soft_match, 'read': kwargs, **_data_path_configuration()},
+                       lambda previous: _read_xlsx_dataset(path, allow_soft_match, previous, **kwargs))
+
+    if write:
+        excel_writer = pd.ExcelWriter(new_filename)
+        ds.to_excel(excel_writer, index=False)
+        excel_writer.save()
+
+    if with_inferred_cols:
+        return with_inferred_columns(ds.set_index('file'))
+
+    return ds.set_index('file')
+
+
+def _read_xlsx_dataset(path: str, allow_soft_match: bool, previous: Optional[pd.DataFrame],
+                       **kwargs: Any) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Reads and cleans a dataset spreadsheet for ``clean_xlsx_dataset``. Ids and data paths which are generated
+    for rows which have not changed since ``previous`` was read are kept, rather than generated again, as long
+    as these paths still exist.
+    :return: The table, and the data paths which were inferred for it
+    """
     ds = safe_read(path, **kwargs)
     ds.rename(columns=lambda c: c.lower().strip().replace(' ', '_'), inplace=True)
 
@@ -364,8 +583,6 @@ def clean_xlsx_dataset(path: str, allow_soft_match: bool = False, write: bool =
         except KeyError:
             pass
 
-    last_index = None
-
     # Add required columns
     if 'id' not in ds:
         ds['id'] = np.nan
@@ -373,37 +590,29 @@ def clean_xlsx_dataset(path: str, allow_soft_match: bool = False, write: bool =
     if 'path' not in ds:
         ds['path'] = ''
 
-    # Cascade blank values
-    for index, row in ds.sort_index().iterrows():
-        row = row.copy()
-
-        for key, value in row.iteritems():
-            if key == 'id' and is_blank(row.id):
-                ds.loc[index, ('id',)] = str(uuid.uuid1())
-
-            if key == 'path':
-                continue
+    ds = ds.loc[:, ~ds.columns.str.contains('^unnamed:_')]
 
-            elif last_index is not None and is_blank(value) and not is_blank(ds.loc[last_index, (key,)]):
-                ds.loc[index, (key,)] = ds.loc[last_index, (key,)]
+    # Cascade blank values, a scan without an id takes the one above it, and the first one a new id
+    ds = _cascade_blank_values(ds.sort_index(), skip=('path', 'id'))
+    unchanged, earlier = _unchanged_rows(ds, previous, ignore=('path', 'id'))
 
-        last_index = index
+    first = ds.index[0] if len(ds) else None
+    if first is not None and is_blank(ds.loc[first, 'id']):
+        ds.loc[first, 'id'] = earlier.loc[first, 'id'] if unchanged[first] else str(uuid.uuid1())
+    ds = _cascade_blank_values(ds, skip=[c for c in ds.columns if c != 'id'])
 
-    for index, row in ds.sort_index().iterrows():
+    inferred_paths = []
+    for index, row in ds.iterrows():
         if is_blank(row['path']):
-            ds.loc[index, ('path',)] = infer_data_path(row['file'], row, allow_soft_match)
+            if (unchanged[index] and not is_blank(earlier.loc[index, 'path'])
+                    and os.path.exists(earlier.loc[index, 'path'])):
+                ds.loc[index, 'path'] = earlier.loc[index, 'path']
+            else:
+                ds.loc[index, 'path'] = infer_data_path(row['file'], row, allow_soft_match)
 
-    ds = ds.loc[:, ~ds.columns.str.contains('^unnamed:_')]
+            inferred_paths.append(ds.loc[index, 'path'])
 
-    if write:
-        excel_writer = pd.ExcelWriter(new_filename)
-        ds.to_excel(excel_writer, index=False)
-        excel_writer.save()
-
-    if with_inferred_cols:
-        return with_inferred_columns(ds.set_index('file'))
-
-    return ds.set_index('file')
+    return ds, inferred_paths
 
 
 def walk_datasets(skip_cleaned: bool = True, use_workspace: bool = False) -> Iterator[str]:
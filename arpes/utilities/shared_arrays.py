@@ -0,0 +1,81 @@
+"""
+Sharing large DataArrays with the workers of a process pool without sending them along with every task.
+
+The arrays are written once to ``.npy`` files in a temporary directory, and each task memory maps them, so
+that workers read only the parts of the data they use and share these pages through the OS. Workers drop
+their mappings at the end of every task, and the directory is deleted only once every task has finished,
+so that no file is removed while it is still mapped. Deleting mapped files fails on Windows, and on other
+platforms their disk space is not freed until the mapping is closed.
+"""
+
+import gc
+import os
+import tempfile
+import uuid
+from concurrent.futures import Executor, as_completed, wait
+
+import numpy as np
+import xarray as xr
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+__all__ = ('map_with_shared_dataarrays',)
+
+
+def _share_dataarray(arr: Optional[xr.DataArray], directory: str) -> Optional[Dict[str, Any]]:
+    if arr is None:
+        return None
+
+    path = os.path.join(directory, '{}.npy'.format(uuid.uuid4().hex))
+    np.save(path, np.ascontiguousarray(arr.values))
+    return {
+        'path': path,
+        'dims': arr.dims,
+        'coords': {k: (v.dims, v.values) for k, v in arr.coords.items()},
+        'attrs': arr.attrs,
+    }
+
+
+def _open_shared_dataarray(description: Optional[Dict[str, Any]]) -> Optional[xr.DataArray]:
+    if description is None:
+        return None
+
+    values = np.load(description['path'], mmap_mode='r')
+    return xr.DataArray(values, coords=description['coords'], dims=description['dims'], attrs=description['attrs'])
+
+
+def _call_with_shared_dataarrays(f: Callable, shared: Dict[str, Optional[Dict[str, Any]]], *args: Any) -> Any:
+    """
+    Process pool entry point, calls ``f`` with the shared arrays opened.
+    """
+    try:
+        return f({name: _open_shared_dataarray(d) for name, d in shared.items()}, *args)
+    finally:
+        # views of the mapped files can be kept alive by reference cycles, such as those of lmfit results
+        gc.collect()
+
+
+def map_with_shared_dataarrays(executor: Executor, f: Callable, arrays: Dict[str, Optional[xr.DataArray]],
+                               tasks: Iterable[Sequence[Any]]) -> Iterator[Any]:
+    """
+    Runs ``f(shared, *task)`` on a process pool for each task, where ``shared`` holds memory mapped copies of
+    ``arrays`` under the same names, yielding the results as they complete. ``f`` should not return views
+    of the shared arrays.
+
+    If iteration stops early, tasks which have not started are cancelled and the others are waited for.
+    :param executor:
+    :param f: A function which can be pickled
+    :param arrays: DataArrays, or None
+    :param tasks: The remaining arguments of each call
+    :return:
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        shared = {name: _share_dataarray(arr, directory) for name, arr in arrays.items()}
+        futures = [executor.submit(_call_with_shared_dataarrays, f, shared, *task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+            wait(futures)
@@ -0,0 +1,132 @@
+"""
+Binned means of data over windows along some of its axes, calculated from summed-area (prefix sum) tables.
+
+Interactive tools show slices of data averaged over a window around a cursor, and recompute them every time
+the cursor moves. Averaging the window directly costs time proportional to the window size. After a table of
+cumulative sums along the binned axes is built once, any window is instead a signed sum of the table at its
+2^n corners, which costs the same for every window size.
+
+Tables are built the first time a set of axes is binned over, are dropped least recently used first to keep
+their total size below a budget, and windows which do not fit into the budget are averaged directly.
+"""
+
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+import xarray as xr
+from typing import Dict, Iterable, Optional, Tuple
+
+__all__ = ('SummedAreaTables',)
+
+# Upper bound on the total size of summed-area tables kept for one array
+MAX_SUMMED_AREA_BYTES = 512 * 1024 ** 2
+
+
+class SummedAreaTables:
+    """
+    Summed-area tables for a DataArray, one for each set of axes data is binned along. NaNs are skipped in
+    averages, as with ``DataArray.mean``, by keeping a table of the number of finite values as well.
+    """
+    def __init__(self, data: xr.DataArray, max_bytes: int = MAX_SUMMED_AREA_BYTES):
+        self.data = data
+        self.max_bytes = max_bytes
+        self._tables = OrderedDict()
+
+        values = data.values
+        self._skip_nan = values.dtype.kind == 'f' and bool(np.isnan(values).any())
+
+    def table_bytes(self, axes: Iterable[int]) -> int:
+        axes = set(axes)
+        size = int(np.prod([n + 1 if i in axes else n for i, n in enumerate(self.data.shape)]))
+        return size * 8 * (2 if self._skip_nan else 1)
+
+    def _build(self, axes: Tuple[int, ...]):
+        values = self.data.values
+        pad_width = [(1, 0) if i in axes else (0, 0) for i in range(values.ndim)]
+
+        finite = np.isfinite(values) if self._skip_nan else None
+        sums = np.pad(np.where(finite, values, 0) if self._skip_nan else values, pad_width,
+                      mode='constant').astype(np.float64, copy=False)
+        counts = np.pad(finite, pad_width, mode='constant').astype(np.float64) if self._skip_nan else None
+
+        for axis in axes:
+            np.cumsum(sums, axis=axis, out=sums)
+            if counts is not None:
+                np.cumsum(counts, axis=axis, out=counts)
+
+        return sums, counts
+
+    def table(self, axes: Iterable[int]) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """
+        Fetches the tables of sums and of finite counts along ``axes``, building them if needed.
+        :param axes:
+        :return: The tables, or None if they do not fit into the budget
+        """
+        key = tuple(sorted(axes))
+        if key in self._tables:
+            self._tables.move_to_end(key)
+            return self._tables[key]
+
+        required = self.table_bytes(key)
+        if required > self.max_bytes:
+            return None
+
+        while self._tables and sum(self.table_bytes(k) for k in self._tables) + required > self.max_bytes:
+            self._tables.popitem(last=False)
+
+        self._tables[key] = self._build(key)
+        return self._tables[key]
+
+    def prepare(self, axes_sets: Iterable[Iterable[int]]) -> None:
+        """
+        Builds tables ahead of time, such as for the axes currently binned over in a tool.
+        :param axes_sets:
+        :return:
+        """
+        for axes in axes_sets:
+            self.table(axes)
+
+    def _corner_sum(self, table: np.ndarray, windows: Dict[int, slice]) -> np.ndarray:
+        axes = sorted(windows)
+        total = 0
+        for corner in itertools.product((False, True), repeat=len(axes)):
+            index = [slice(None)] * table.ndim
+            for axis, upper in zip(axes, corner):
+                index[axis] = windows[axis].stop if upper else windows[axis].start
+
+            sign = -1 if (len(axes) - sum(corner)) % 2 else 1
+            total = total + sign * table[tuple(index)]
+
+        return total
+
+    def binned_mean(self, windows: Dict[int, slice]) -> xr.DataArray:
+        """
+        Averages the data over a window along each of several axes, removing these axes.
+        :param windows: Contiguous, nonempty index ranges by axis index
+        :return:
+        """
+        if not windows:
+            return self.data
+
+        dims = [self.data.dims[axis] for axis in sorted(windows)]
+        tables = None
+        if any(window.stop - window.start > 1 for window in windows.values()):
+            tables = self.table(windows.keys())
+
+        if tables is None:
+            return self.data.isel(**{self.data.dims[axis]: window for axis, window in windows.items()}).mean(dims)
+
+        sums, counts = tables
+        total = self._corner_sum(sums, windows)
+        if counts is None:
+            count = int(np.prod([window.stop - window.start for window in windows.values()]))
+        else:
+            count = self._corner_sum(counts, windows)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+
+        coords = {k: v for k, v in self.data.coords.items() if not set(v.dims).intersection(dims)}
+        return xr.DataArray(mean, coords=coords, dims=[d for d in self.data.dims if d not in dims],
+                            name=self.data.name)
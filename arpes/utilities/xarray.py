@@ -70,12 +70,12 @@ def lift_dataarray_attrs(f):
     """
 
     def g(arr: xr.DataArray, *args, **kwargs):
-        return xr.DataArray(
-            arr.values,
-            arr.coords,
-            arr.dims,
-            attrs=f(arr.attrs, *args, **kwargs)
-        )
+        # a shallow copy leaves data which is read lazily from a file unread
+        lifted = arr.copy(deep=False)
+        lifted.name = None
+        lifted.encoding = {}
+        lifted.attrs = f(arr.attrs, *args, **kwargs)
+        return lifted
 
     return g
 
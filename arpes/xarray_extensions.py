@@ -17,22 +17,13 @@ import warnings
 from collections import OrderedDict
 from typing import Callable, List, Optional, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
 
 from scipy import ndimage as ndi
 
 import arpes.constants
-import arpes.plotting as plotting
-
-from arpes.analysis import rebin
-from arpes.analysis.band_analysis_utils import (param_getter,
-                                                param_stderr_getter)
-from arpes.io import load_dataset_attrs
-from arpes.models.band import MultifitBand
-from arpes.plotting import BandTool, CurvatureTool, FitCheckTool, ImageTool
-from arpes.plotting.utils import fancy_labels, remove_colorbars
+
 from arpes.typing import DataType
 from arpes.utilities import apply_dataarray
 from arpes.utilities.collections import MappableDict
@@ -237,6 +228,8 @@ class ARPESAccessorBase:
         return None
 
     def fetch_ref_attrs(self):
+        from arpes.io import load_dataset_attrs
+
         if 'ref_attrs' in self._obj.attrs:
             return self._obj.attrs
         if 'ref_id' in self._obj.attrs:
@@ -823,6 +816,8 @@ class ARPESAccessorBase:
         return edges * delta['eV'] + self._obj.coords['eV'].values[0]
 
     def find_spectrum_angular_edges_full(self, indices=False):
+        from arpes.analysis import rebin
+
         # as a first pass, we need to find the bottom of the spectrum, we will use this
         # to select the active region and then to rebin into course steps in energy from 0
         # down to this region
@@ -1496,6 +1491,9 @@ class ARPESAccessorBase:
             {k: transforms.get(k, id)(v) for k, v in conditions.items() if v is not None})
 
     def _repr_html_(self):
+        import matplotlib.pyplot as plt
+        from arpes.plotting.utils import fancy_labels, remove_colorbars
+
         skip_data_vars = {'time',}
 
         if isinstance(self._obj, xr.Dataset):
@@ -1568,22 +1566,32 @@ class ARPESAccessorBase:
 @xr.register_dataarray_accessor('S')
 class ARPESDataArrayAccessor(ARPESAccessorBase):
     def plot(self, *args, **kwargs):
+        import matplotlib.pyplot as plt
+
         with plt.rc_context(rc={'text.usetex': False}):
             self._obj.plot(*args, **kwargs)
 
     def show(self, **kwargs):
+        from arpes.plotting import ImageTool
+
         image_tool = ImageTool(**kwargs)
         return image_tool.make_tool(self._obj)
 
     def show_d2(self, **kwargs):
+        from arpes.plotting import CurvatureTool
+
         curve_tool = CurvatureTool(**kwargs)
         return curve_tool.make_tool(self._obj)
 
     def show_band_tool(self, **kwargs):
+        from arpes.plotting import BandTool
+
         band_tool = BandTool(**kwargs)
         return band_tool.make_tool(self._obj)
 
     def fs_plot(self, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         if out is not None and isinstance(out, bool):
             out = pattern.format('{}_fs'.format(self.label))
@@ -1591,6 +1599,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
         return plotting.labeled_fermi_surface(self._obj, **kwargs)
 
     def cut_dispersion_plot(self, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         if out is not None and isinstance(out, bool):
             out = pattern.format('{}_cut_dispersion'.format(self.label))
@@ -1598,6 +1608,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
         return plotting.cut_dispersion_plot(self._obj, **kwargs)
 
     def dispersion_plot(self, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         if out is not None and isinstance(out, bool):
             out = pattern.format('{}_dispersion'.format(self.label))
@@ -1605,6 +1617,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
         return plotting.fancy_dispersion(self._obj, **kwargs)
 
     def isosurface_plot(self, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         if out is not None and isinstance(out, bool):
             out = pattern.format('{}_isosurface'.format(self.label))
@@ -1613,6 +1627,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
 
 
     def subtraction_reference_plot(self, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         if out is not None and isinstance(out, bool):
             out = pattern.format('{}_subtraction_reference'.format(self.label))
@@ -1621,6 +1637,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
         return plotting.tarpes.plot_subtraction_reference(self._obj, **kwargs)
 
     def fermi_edge_reference_plot(self, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         if out is not None and isinstance(out, bool):
             out = pattern.format('{}_fermi_edge_reference'.format(self.label))
@@ -1630,6 +1648,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
 
 
     def _referenced_scans_for_spatial_plot(self, use_id=True, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         label = self._obj.attrs['id'] if use_id else self.label
         if out is not None and isinstance(out, bool):
@@ -1640,6 +1660,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
 
 
     def _referenced_scans_for_map_plot(self, use_id=True, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         label = self._obj.attrs['id'] if use_id else self.label
         if out is not None and isinstance(out, bool):
@@ -1649,6 +1671,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
         return plotting.reference_scan_fermi_surface(self._obj, **kwargs)
 
     def _referenced_scans_for_hv_map_plot(self, use_id=True, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         label = self._obj.attrs['id'] if use_id else self.label
         if out is not None and isinstance(out, bool):
@@ -1659,6 +1683,8 @@ class ARPESDataArrayAccessor(ARPESAccessorBase):
         return plotting.hv_reference_scan(self._obj, **kwargs)
 
     def _simple_spectrum_reference_plot(self, use_id=True, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         label = self._obj.attrs['id'] if use_id else self.label
         if out is not None and isinstance(out, bool):
@@ -1887,6 +1913,8 @@ class GenericAccessorTools:
         return copied
 
     def as_movie(self, time_dim=None, pattern='{}.png', **kwargs):
+        import arpes.plotting as plotting
+
         if time_dim is None:
             time_dim = self._obj.dims[-1]
 
@@ -2165,11 +2193,13 @@ class ARPESDatasetFitToolAccessor:
         self._obj = xarray_obj
 
     def eval(self, *args, **kwargs):
-        return self._obj.results.T.map(lambda x: x.eval(*args, **kwargs))
+        return self.expand().results.T.map(lambda x: x.eval(*args, **kwargs))
 
     def show(self):
+        from arpes.plotting import FitCheckTool
+
         fit_diagnostic_tool = FitCheckTool()
-        return fit_diagnostic_tool.make_tool(self._obj)
+        return fit_diagnostic_tool.make_tool(self.expand())
 
     def p(self, param_name):
         return self._obj.results.F.p(param_name)
@@ -2180,6 +2210,34 @@ class ARPESDatasetFitToolAccessor:
     def plot_param(self, param_name, **kwargs):
         return self._obj.results.F.plot_param(param_name, **kwargs)
 
+    def result(self, **coords):
+        """
+        The fit result at the given coordinates along the broadcast dimensions, rebuilding
+        it if the fit was stored compactly.
+        """
+        from arpes.fits.result_store import is_compact_results, rebuild_model_result
+
+        results = self._obj.results
+        if is_compact_results(results):
+            return rebuild_model_result(results, self._obj.data, self._obj.get('covar'), **coords)
+
+        return results.sel(**coords).item()
+
+    def expand(self):
+        """
+        Rebuilds the `lmfit.model.ModelResult` of every marginal of a fit stored compactly. Fits which are
+        not compact are returned as is.
+        """
+        from arpes.fits.result_store import COMPACT_RESULT_COORDS, expand_results, is_compact_results
+
+        results = self._obj.results
+        if not is_compact_results(results):
+            return self._obj
+
+        expanded = expand_results(results, self._obj.data, self._obj.get('covar'))
+        dropped = [c for c in list(COMPACT_RESULT_COORDS) + ['covar', 'covar_param'] if c in self._obj.variables]
+        return self._obj.drop(dropped).assign(results=expanded)
+
 
 @xr.register_dataarray_accessor('F')
 class ARPESFitToolsAccessor:
@@ -2189,6 +2247,8 @@ class ARPESFitToolsAccessor:
         self._obj = xarray_obj
 
     def plot_param(self, param_name, **kwargs):
+        import arpes.plotting as plotting
+
         plotting.plot_parameter(self._obj, param_name, **kwargs)
 
     def param_as_dataset(self, param_name):
@@ -2198,21 +2258,63 @@ class ARPESFitToolsAccessor:
         })
 
     def show(self):
+        from arpes.plotting import FitCheckTool
+
         fit_diagnostic_tool = FitCheckTool()
         return fit_diagnostic_tool.make_tool(self._obj)
 
+    def _compact_param(self, values: xr.DataArray, param_name) -> xr.DataArray:
+        from arpes.fits.result_store import COMPACT_RESULT_COORDS
+
+        values = values.reset_coords([c for c in COMPACT_RESULT_COORDS if c in values.coords and c != 'param'],
+                                     drop=True)
+        if param_name in values.coords['param'].values:
+            selected = values.sel(param=param_name, drop=True)
+        else:
+            selected = xr.full_like(values.isel(param=0, drop=True), np.nan)
+
+        selected.name = None
+        selected.attrs = {}
+        return selected
+
     def p(self, param_name):
+        from arpes.analysis.band_analysis_utils import param_getter
+        from arpes.fits.result_store import is_compact_results
+
+        if is_compact_results(self._obj):
+            return self._compact_param(self._obj, param_name)
+
         return self._obj.T.map(param_getter(param_name), otypes=[np.float])
 
     def s(self, param_name):
+        from arpes.analysis.band_analysis_utils import param_stderr_getter
+        from arpes.fits.result_store import is_compact_results
+
+        if is_compact_results(self._obj):
+            return self._compact_param(self._obj.coords['stderr'], param_name)
+
         return self._obj.T.map(param_stderr_getter(param_name), otypes=[np.float])
 
+    def expand(self, data: xr.DataArray):
+        """
+        Rebuilds the `lmfit.model.ModelResult` of every marginal of compact results.
+        :param data: The data which was fit
+        """
+        from arpes.fits.result_store import expand_results, is_compact_results
+
+        if not is_compact_results(self._obj):
+            return self._obj
+
+        return expand_results(self._obj, data)
+
     @property
     def bands(self):
         """
         This should probably instantiate appropriate types
         :return:
         """
+        from arpes.models.band import MultifitBand
+
         band_names = self.band_names
 
         bands = {l: MultifitBand(label=l, data=self._obj) for l in band_names}
@@ -2221,6 +2323,11 @@ class ARPESFitToolsAccessor:
 
     @property
     def band_names(self):
+        from arpes.fits.result_store import is_compact_results
+
+        if is_compact_results(self._obj):
+            return {k[:-6] for k in self._obj.coords['param'].values if 'center' in k}
+
         collected_band_names = set()
 
         for item in self._obj.values.ravel():
@@ -2234,6 +2341,11 @@ class ARPESFitToolsAccessor:
 
     @property
     def parameter_names(self):
+        from arpes.fits.result_store import is_compact_results
+
+        if is_compact_results(self._obj):
+            return set(self._obj.coords['param'].values)
+
         collected_parameter_names = set()
 
         for item in self._obj.values.ravel():
@@ -2260,6 +2372,8 @@ class ARPESDatasetAccessor(ARPESAccessorBase):
         return getattr(self._obj.S.spectrum.S, item)
 
     def polarization_plot(self, **kwargs):
+        import arpes.plotting as plotting
+
         out = kwargs.get('out')
         if out is not None and isinstance(out, bool):
             out = '{}_spin_polarization.png'.format(self.label)
@@ -2346,6 +2460,8 @@ class ARPESDatasetAccessor(ARPESAccessorBase):
         :param kwargs:
         :return:
         """
+        import arpes.plotting as plotting
+
         scan_dofs_integrated = self._obj.sum(*list(self.scan_degrees_of_freedom))
         original_out = kwargs.get('out')
 
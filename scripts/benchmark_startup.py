@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+DESCRIPTION = """
+Measures how long PyARPES takes to start in a fresh interpreter, as short lived worker processes pay this
+on every run. Each statement is timed in a new process, and the median over several repeats is reported
+along with the number of modules imported.
+"""
+
+STATEMENTS = {
+    'python': 'pass',
+    'import arpes': 'import arpes',
+    'import arpes.config': 'import arpes.config',
+    'import arpes.endstations': 'import arpes.endstations',
+    'import arpes.xarray_extensions': 'import arpes.xarray_extensions',
+    'resolve an endstation': 'import arpes.endstations; arpes.endstations.resolve_endstation(location="BL4")',
+    'import arpes.plotting': 'import arpes.plotting',
+}
+
+TIMER = """
+import sys, time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start, len(sys.modules))
+"""
+
+parser = argparse.ArgumentParser(description=DESCRIPTION)
+parser.add_argument('-n', '--repeats', type=int, default=5, help='number of processes started per statement')
+args = parser.parse_args()
+
+for label, statement in STATEMENTS.items():
+    timings, modules = [], 0
+    for _ in range(args.repeats):
+        output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', TIMER.format(statement=statement)],
+                                         stderr=subprocess.DEVNULL)
+        elapsed, modules = output.decode().split()[-2:]
+        timings.append(float(elapsed))
+
+    print('{:<32}{:>10.1f} ms{:>8} modules'.format(label, 1000 * statistics.median(timings), modules))
@@ -32,6 +32,7 @@ def sandbox_configuration(tmpdir_factory):
         return load_test_scan(dataset, id)
 
     arpes.config.update_configuration(user_path=resources_dir)
+    arpes.config.SETTINGS['dataset_tables']['path'] = str(tmpdir_factory.mktemp('dataset_tables'))
     sandbox = AttrAccessorDict({
         'with_workspace': set_workspace,
         'load': load,
@@ -40,4 +41,5 @@ def sandbox_configuration(tmpdir_factory):
     yield sandbox
     arpes.config.CONFIG['WORKSPACE'] = None
     arpes.config.update_configuration(user_path=None)
+    arpes.config.SETTINGS['dataset_tables']['path'] = None
     arpes.endstations._ENDSTATION_ALIASES = {}
@@ -0,0 +1,164 @@
+import pickle
+
+import lmfit
+import numpy as np
+import pytest
+
+import arpes.config # pylint: disable=unused-import
+import xarray as xr
+from arpes.fits.fit_models import AffineBackgroundModel, AffineBroadenedFD, FermiDiracModel, LorentzianModel
+from arpes.fits.utilities import _dumps_fits, _traversal_order, broadcast_model
+
+
+def synthetic_mdcs(n_fits=8):
+    rng = np.random.RandomState(0)
+    eV = np.linspace(-0.3, 0, n_fits)
+    kp = np.linspace(-1, 1, 120)
+    centers = 0.5 * eV + 0.03
+
+    values = np.stack([2 / (1 + ((kp - c) / 0.1) ** 2) + 0.1 * kp + 0.2 for c in centers])
+    values += rng.normal(0, 0.02, values.shape)
+    return xr.DataArray(values, {'eV': eV, 'kp': kp}, ['eV', 'kp']), centers
+
+
+def test_batch_backend_matches_lmfit():
+    data, centers = synthetic_mdcs()
+
+    batch = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False, backend='batch')
+    reference = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False)
+
+    assert set(batch.data_vars) == set(reference.data_vars)
+    assert batch.results.F.parameter_names == reference.results.F.parameter_names
+    assert np.allclose(batch.results.F.p('a_center').values, centers, atol=0.01)
+
+    for name in ['a_center', 'a_sigma', 'a_amplitude', 'a_fwhm', 'b_const_bkg']:
+        assert np.allclose(batch.results.F.p(name).values, reference.results.F.p(name).values, rtol=1e-4, atol=1e-6)
+        assert np.allclose(batch.results.F.s(name).values, reference.results.F.s(name).values, rtol=1e-2)
+
+    assert np.allclose(batch.residual.values, reference.residual.values, atol=1e-5)
+
+    result = batch.results.values[0]
+    assert np.allclose(result.eval(), result.best_fit)
+
+    # the parameters of batch fits can be used as those of lmfit fits
+    lmfit_result = reference.results.values[0]
+    assert isinstance(result.params, lmfit.Parameters)
+    assert set(result.params.valuesdict()) == set(lmfit_result.params.valuesdict())
+    assert result.params['a_center'].value == pytest.approx(lmfit_result.params['a_center'].value, rel=1e-4)
+    assert result.params['a_center'].stderr == pytest.approx(lmfit_result.params['a_center'].stderr, rel=1e-2)
+    assert np.allclose(result.eval(params=result.params.copy()), result.best_fit)
+
+
+def test_batch_backend_respects_parameter_hints():
+    data, _ = synthetic_mdcs()
+    widths = xr.DataArray(np.linspace(0.05, 0.1, len(data.eV)), {'eV': data.eV.values}, ['eV'])
+
+    fits = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False, backend='batch',
+                           params={'a_sigma': {'value': widths, 'vary': False}, 'b_lin_bkg': {'max': 0}})
+
+    assert np.allclose(fits.results.F.p('a_sigma').values, widths.values)
+    assert np.all(fits.results.F.p('b_lin_bkg').values <= 0)
+
+
+def test_batch_backend_falls_back_for_unsupported_models():
+    data, _ = synthetic_mdcs(3)
+
+    with pytest.warns(UserWarning):
+        fits = broadcast_model(AffineBroadenedFD, data, 'eV', progress=False, backend='batch')
+
+    assert 'fd_center' in fits.results.F.parameter_names
+
+    fits = broadcast_model(FermiDiracModel, data, 'eV', progress=False, backend='batch')
+    assert 'center' in fits.results.F.parameter_names
+
+
+@pytest.mark.parametrize('options', [
+    {'executor': 'thread', 'n_workers': 2},
+    {'executor': 'process', 'n_workers': 2, 'chunk_size': 2},
+    {'multithread': True},
+])
+def test_parallel_fits_match_serial_fits(options):
+    data, _ = synthetic_mdcs(5)
+    data.values[2, 10:20] = np.nan
+
+    serial = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False, safe=True)
+    parallel = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False, safe=True,
+                               **options)
+
+    assert np.array_equal(parallel.results.F.p('a_center').values, serial.results.F.p('a_center').values)
+    assert np.array_equal(parallel.residual.values, serial.residual.values, equal_nan=True)
+    assert np.isnan(parallel.residual.values[2, 10:20]).all()
+
+
+@pytest.mark.parametrize('backend', ['lmfit', 'batch'])
+def test_compact_results_match_model_results(backend, tmpdir):
+    data, _ = synthetic_mdcs(4)
+
+    full = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False, backend=backend)
+    compact = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False,
+                              backend=backend, compact=True)
+
+    assert compact.results.dtype == np.float64
+    assert compact.results.F.parameter_names == full.results.F.parameter_names
+    assert compact.results.F.band_names == full.results.F.band_names
+    for name in ['a_center', 'a_fwhm', 'b_lin_bkg']:
+        assert np.allclose(compact.F.p(name).values, full.F.p(name).values)
+        assert np.allclose(compact.F.s(name).values, full.F.s(name).values)
+
+    assert np.all(np.isnan(compact.F.p('not_a_parameter').values))
+
+    path = str(tmpdir.join('fit.nc'))
+    compact.to_netcdf(path)
+    with xr.open_dataset(path) as restored:
+        eV = restored.eV.values[1]
+        rebuilt = restored.F.result(eV=eV)
+        original = full.F.result(eV=eV)
+
+        assert rebuilt.params['a_center'].value == pytest.approx(original.params['a_center'].value)
+        assert rebuilt.chisqr == pytest.approx(original.chisqr)
+        assert np.allclose(rebuilt.residual, original.residual)
+        assert np.allclose(rebuilt.eval(x=np.array([0.1])), original.eval(x=np.array([0.1])))
+
+    expanded = compact.F.expand()
+    assert expanded.results.dtype == object
+    assert np.allclose(expanded.F.p('a_sigma').values, full.F.p('a_sigma').values)
+
+
+@pytest.mark.parametrize('shape,traversal', [
+    ((7,), 'serpentine'), ((3, 5), 'serpentine'), ((3, 4, 5), 'serpentine'), ((8, 8), 'hilbert'), ((5, 6), 'hilbert'),
+])
+def test_traversal_orders_visit_every_marginal(shape, traversal):
+    order = _traversal_order(shape, traversal)
+    assert sorted(order) == list(range(int(np.prod(shape))))
+
+    if traversal == 'serpentine' or shape == (8, 8):
+        positions = np.array(np.unravel_index(order, shape)).T
+        assert np.all(np.abs(np.diff(positions, axis=0)).sum(axis=1) == 1)
+
+
+def test_warm_started_fits_match_independent_fits():
+    data, centers = synthetic_mdcs(30)
+    data.values[4] = np.nan
+
+    independent = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False)
+    warm = broadcast_model([LorentzianModel, AffineBackgroundModel], data, 'eV', progress=False, warm_start=True,
+                           params={'b_lin_bkg': {'value': 0.1, 'vary': False}})
+
+    valid = np.arange(30) != 4
+    assert np.allclose(warm.F.p('a_center').values[valid], centers[valid], atol=0.01)
+    assert np.allclose(warm.F.p('a_center').values[valid], independent.F.p('a_center').values[valid], atol=2e-3)
+    assert np.all(warm.F.p('b_lin_bkg').values[valid] == 0.1)
+
+    nfev = lambda fits: np.mean([r.nfev for r in fits.results.values[valid]])
+    assert nfev(warm) < nfev(independent)
+
+
+def test_fit_parameters_are_sent_without_their_symbol_table():
+    params = lmfit.Parameters()
+    params.add('a', value=2, min=0)
+    params.add('b', expr='2 * a')
+
+    (restored,) = pickle.loads(_dumps_fits([params]))
+    assert isinstance(restored, lmfit.Parameters)
+    assert restored['a'].value == 2 and restored['a'].min == 0
+    assert restored['b'].expr == '2 * a' and restored['b'].value == 4
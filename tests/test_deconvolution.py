@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+import pytest
+import scipy.ndimage
+
+import arpes.config # pylint: disable=unused-import
+import xarray as xr
+from arpes.analysis.deconvolution import deconvolve_rl, make_psf, make_psf1d
+
+
+def reference_rl(values, psf, n_iterations, mode='reflect'):
+    """
+    Richardson-Lucy deconvolution of a single spectrum with direct convolutions.
+    """
+    estimate = values
+    for _ in range(n_iterations):
+        convolved = scipy.ndimage.convolve(estimate, psf, mode=mode)
+        estimate = estimate * scipy.ndimage.convolve(values / convolved, np.flip(psf, 0), mode=mode)
+
+    return estimate
+
+
+def synthetic_data(shape):
+    rng = np.random.RandomState(0)
+    names = ['x', 'y', 'phi', 'eV'][-len(shape):]
+    coords = {name: np.linspace(-1, 1, n) for name, n in zip(names, shape)}
+    return xr.DataArray(rng.rand(*shape) + 1, coords, names)
+
+
+@pytest.mark.parametrize('shape', [(9, 20), (4, 5, 16), (2, 3, 4, 12)])
+@pytest.mark.parametrize('mode', ['reflect', 'constant'])
+def test_rl_deconvolution_matches_slice_by_slice_deconvolution(shape, mode):
+    data = synthetic_data(shape)
+
+    for axis in ['eV', 'phi']:
+        psf = make_psf1d(data, axis, 0.3)
+        deconvolved = deconvolve_rl(data, axis=axis, sigma=0.3, n_iterations=6, mode=mode)
+        assert deconvolved.dims == data.dims
+
+        other_dims = [d for d in data.dims if d != axis]
+        for index in itertools.product(*[range(len(data[d])) for d in other_dims]):
+            selection = dict(zip(other_dims, index))
+            expected = reference_rl(data.isel(**selection).values, psf.values, 6, mode=mode)
+            assert np.allclose(deconvolved.isel(**selection).values, expected)
+
+    spectrum = data.isel(**{d: 0 for d in data.dims if d != 'eV'})
+    assert np.allclose(deconvolve_rl(spectrum.values, make_psf1d(spectrum, 'eV', 0.3).values, n_iterations=6),
+                       reference_rl(spectrum.values, make_psf1d(spectrum, 'eV', 0.3).values, 6))
+
+
+def test_separable_psfs_match_multidimensional_psfs():
+    data = synthetic_data((5, 7, 9))
+    sigmas = {'y': 0.4, 'phi': 0.3, 'eV': 0}
+
+    full = deconvolve_rl(data, make_psf(data, sigmas), n_iterations=4)
+    separable = deconvolve_rl(data, {'y': make_psf1d(data, 'y', 0.4), 'phi': make_psf1d(data, 'phi', 0.3)},
+                              n_iterations=4)
+
+    assert np.allclose(full.values, separable.values)
+
+    with pytest.raises(ValueError):
+        deconvolve_rl(data.values, make_psf1d(data, 'y', 0.4).values)
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+import arpes.config
+from arpes.endstations import EndstationBase, FITSEndstation
+from arpes.endstations.file_index import clear_directory_indices, directory_index
+from arpes.utilities.dataset import infer_data_path
+
+
+@pytest.fixture
+def workspace(tmpdir):
+    original = arpes.config.CONFIG['WORKSPACE']
+    data = tmpdir.mkdir('data')
+    for name in ['scan_001.fits', 'scan_012.fits', 'other_112.fits', 'notes.md']:
+        data.join(name).write('')
+
+    arpes.config.CONFIG['WORKSPACE'] = {'name': 'index', 'path': str(tmpdir)}
+    yield data
+    arpes.config.CONFIG['WORKSPACE'] = original
+    clear_directory_indices()
+
+
+def backdate(directory, seconds=60):
+    stat = os.stat(str(directory))
+    os.utime(str(directory), ns=(stat.st_atime_ns, stat.st_mtime_ns - int(seconds * 1e9)))
+
+
+def test_index_resolves_numbers_like_a_directory_scan(workspace):
+    assert FITSEndstation.find_first_file(1, {}) == str(workspace.join('scan_001.fits'))
+    assert FITSEndstation.find_first_file(12, {}) == str(workspace.join('scan_012.fits'))
+    assert FITSEndstation.find_first_file('f112', {}) == str(workspace.join('other_112.fits'))
+    assert infer_data_path(12, {}) == str(workspace.join('scan_012.fits'))
+
+    assert FITSEndstation.is_file_accepted(1, {})
+    assert FITSEndstation.is_file_accepted(str(workspace.join('scan_012.fits')), {})
+    assert not FITSEndstation.is_file_accepted(7, {})
+
+    with pytest.raises(ValueError):
+        FITSEndstation.find_first_file(7, {})
+
+
+def test_index_only_relists_changed_directories(workspace, monkeypatch):
+    backdate(workspace)
+    FITSEndstation.find_first_file(1, {})
+
+    listings = []
+    original = EndstationBase.files_for_search.__func__
+
+    def files_for_search(cls, directory):
+        listings.append(directory)
+        return original(cls, directory)
+
+    monkeypatch.setattr(EndstationBase, 'files_for_search', classmethod(files_for_search))
+    assert FITSEndstation.find_first_file(12, {}) == str(workspace.join('scan_012.fits'))
+    assert listings == []
+
+    workspace.join('scan_007.fits').write('')
+    workspace.join('scan_001.fits').remove()
+    assert FITSEndstation.find_first_file(7, {}) == str(workspace.join('scan_007.fits'))
+    assert len(listings) == 1
+
+    index = directory_index(FITSEndstation, str(workspace))
+    assert 'scan_001' not in index.stems
+    assert index.find('scan_007', use_regex=False) == str(workspace.join('scan_007.fits'))
+    assert index.find(7, use_regex=False, allow_soft_match=True) == str(workspace.join('scan_007.fits'))
+    with pytest.raises(ValueError):
+        FITSEndstation.find_first_file(1, {})
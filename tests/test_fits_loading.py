@@ -0,0 +1,45 @@
+import shutil
+import warnings
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+import arpes.endstations
+from arpes.endstations import FITSEndstation
+from arpes.endstations.fits_utils import MemmapBinTable
+
+MAESTRO_FITS = Path(__file__).parent / 'resources' / 'datasets' / 'basic' / 'data' / 'MAESTRO_12.fits'
+
+
+def test_memmapped_fits_columns_match_astropy():
+    primary_header, table = FITSEndstation().open_frame(str(MAESTRO_FITS))
+    assert isinstance(table, MemmapBinTable)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with fits.open(str(MAESTRO_FITS), ignore_missing_end=True) as hdulist:
+            FITSEndstation.clean_hdulist(hdulist)
+            reference = hdulist[1]
+
+            assert table.columns.names == reference.columns.names
+            assert primary_header == dict(hdulist[0].header)
+            for index, name in enumerate(reference.columns.names):
+                assert np.array_equal(table.data.columns[name].array, reference.data.columns[name].array)
+                assert table.data.field(index).shape == reference.data.field(index).shape
+
+    assert not table.data.columns['Fixed_Spectra238'].array.flags.owndata
+
+
+def test_fits_headers_are_cached_per_file(tmpdir):
+    path = str(tmpdir.join('scan.fits'))
+    shutil.copy(str(MAESTRO_FITS), path)
+
+    arpes.endstations._fits_frame_headers.cache_clear()
+    FITSEndstation().open_frame(path)
+    FITSEndstation().open_frame(path)
+    assert arpes.endstations._fits_frame_headers.cache_info().hits == 1
+
+    Path(path).touch()
+    FITSEndstation().open_frame(path)
+    assert arpes.endstations._fits_frame_headers.cache_info().misses == 2
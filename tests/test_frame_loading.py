@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+import pytest
+
+import xarray as xr
+from arpes.endstations import EndstationBase
+
+
+class SyntheticFramesEndstation(EndstationBase):
+    PRINCIPAL_NAME = 'synthetic-frames'
+    ENSURE_COORDS_EXIST = []
+
+    def __init__(self):
+        self.threads = set()
+
+    def resolve_frame_locations(self, scan_desc: dict = None):
+        return ['frame_{}'.format(i) for i in range(scan_desc['n_frames'])]
+
+    def load_single_frame(self, frame_path: str = None, scan_desc: dict = None, **kwargs):
+        self.threads.add(threading.get_ident())
+        index = int(frame_path.split('_')[1])
+        rng = np.random.RandomState(index)
+        hv = 100 - index  # frames are out of order in photon energy
+        spectrum = xr.DataArray(rng.rand(5, 4), {'eV': np.linspace(-1, 0, 5), 'phi': np.linspace(0, 0.1, 4)},
+                                ['eV', 'phi'], attrs={'hv': hv, 'frame': index})
+        return xr.Dataset({'spectrum': spectrum}, coords={'x': 1.0, 'y': float(index)},
+                          attrs={'hv': hv, 'frame': index})
+
+
+@pytest.mark.parametrize('n_workers', [1, 4])
+def test_preallocated_frames_match_concatenated_frames(n_workers):
+    scan_desc = {'n_frames': 6}
+
+    concatenated = SyntheticFramesEndstation().load(scan_desc, n_workers=1)
+    endstation = SyntheticFramesEndstation()
+    preallocated = endstation.load(scan_desc, n_workers=n_workers, preallocate=True)
+
+    assert preallocated.identical(concatenated)
+    assert list(preallocated.hv.values) == list(range(95, 101))
+    assert preallocated.spectrum.dims == ('hv', 'eV', 'phi')
+    assert preallocated.x.dims == ()
+    assert preallocated.y.dims == ('hv',)
+    assert len(endstation.threads) <= n_workers
+
+
+def test_preallocation_is_chosen_per_load():
+    endstation = SyntheticFramesEndstation()
+    endstation.load({'n_frames': 3}, preallocate=True)
+    assert endstation.PREALLOCATE_FRAMES is EndstationBase.PREALLOCATE_FRAMES
+
+
+def test_lazy_frames_are_not_preallocated():
+    import dask.array as da
+
+    endstation = SyntheticFramesEndstation()
+    frames = endstation.load_frames(endstation.resolve_frame_locations({'n_frames': 3}), {})
+    for frame in frames:
+        frame['spectrum'] = xr.DataArray(da.from_array(frame.spectrum.values, chunks=2), frame.spectrum.coords,
+                                         frame.spectrum.dims, attrs=frame.spectrum.attrs)
+
+    stacked = endstation.concatenate_frames(frames, {}, preallocate=True)
+    assert hasattr(stacked.spectrum.data, 'dask')
+    assert stacked.spectrum.dims == ('hv', 'eV', 'phi')
@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from arpes.load_pxt import (bin_header5_dtype, packed_record_header_dtype, read_igor_waves, read_pxt_files,
+                            read_single_pxt, wave_header5_dtype)
+
+MERLIN_PXT = Path(__file__).parent / 'resources' / 'datasets' / 'basic' / 'data' / 'MERLIN_9.pxt'
+
+
+def write_packed_wave(path, data, byte_order='<', note=b'Sample=synthetic\rBL Energy=60'):
+    """
+    Writes ``data`` as the only wave of a packed experiment file, with eV and deg axes.
+    """
+    header = np.zeros(1, wave_header5_dtype.newbyteorder(byte_order))
+    header['n_points'] = data.size
+    header['type'] = 4
+    header['wave_name'] = b'synthetic'
+    header['dim_sizes'][0, :data.ndim] = data.shape
+    header['dim_scales'][0, :2] = [0.01, 0.5]
+    header['dim_offsets'][0, :2] = [-1, -10]
+    header['dim_units'][0, :2] = [b'eV', b'deg']
+
+    payload = np.asfortranarray(data).astype(byte_order + 'f8').tobytes(order='F')
+    bin_header = np.zeros(1, bin_header5_dtype.newbyteorder(byte_order))
+    bin_header['version'] = 5
+    bin_header['wfm_size'] = wave_header5_dtype.itemsize + len(payload)
+    bin_header['note_size'] = len(note)
+
+    wave = bin_header.tobytes() + header.tobytes() + payload + note
+    record = np.zeros(1, packed_record_header_dtype.newbyteorder(byte_order))
+    record['record_type'] = 3
+    record['n_data_bytes'] = len(wave)
+
+    Path(path).write_bytes(record.tobytes() + wave)
+
+
+def is_memory_mapped(values):
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+
+        values = values.base
+
+    return False
+
+
+def test_pxt_reader_matches_file_contents():
+    data = read_single_pxt(MERLIN_PXT)
+
+    assert data.dims == ('eV', 'phi')
+    assert data.shape == (561, 1)
+    assert data.eV.values[0] == pytest.approx(55)
+    assert data.attrs['instrument'] == 'SES 100-556'
+    assert data.values[0, 0] == 594624
+
+    # loaders do not keep the file open, zero copy reads are opt in
+    assert not is_memory_mapped(data.values)
+    mapped = read_pxt_files([MERLIN_PXT])[0]
+    assert is_memory_mapped(mapped.values)
+    assert np.array_equal(mapped.values, data.values)
+
+
+@pytest.mark.parametrize('byte_order', ['<', '>'])
+def test_read_pxt_directory(tmpdir, byte_order):
+    rng = np.random.RandomState(0)
+    expected = [rng.rand(5, 3) for _ in range(3)]
+    for i, data in enumerate(expected):
+        write_packed_wave(str(tmpdir.join('scan_S00{}.pxt'.format(i))), data, byte_order=byte_order)
+
+    arrays = read_pxt_files(str(tmpdir))
+    copied = read_pxt_files([str(tmpdir.join('scan_S000.pxt'))], copy=True)
+
+    assert len(arrays) == 3
+    for arr, data in zip(arrays, expected):
+        assert arr.dims == ('eV', 'phi')
+        assert np.array_equal(arr.values, data)
+        assert np.allclose(arr.phi.values, [-10, -9.5, -9])
+        assert arr.attrs['hv'] == 60
+
+    assert copied[0].values.dtype.isnative
+    assert np.array_equal(copied[0].values, expected[0])
+    assert read_igor_waves(str(tmpdir.join('scan_S001.pxt')))[0].name == 'synthetic'
@@ -0,0 +1,59 @@
+import h5py
+import numpy as np
+import pytest
+
+import arpes.config # pylint: disable=unused-import
+from arpes.endstations.hdf5_utils import HDF5DatasetSlicer, lazy_hdf5_dataset
+from arpes.endstations.plugin.SToF_DLD import SToFDLDEndstation
+
+
+@pytest.fixture
+def dld_file(tmpdir):
+    path = str(tmpdir.join('dld.h5'))
+    values = np.random.RandomState(0).poisson(3, (512, 512)).astype(np.float32)
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('/PRIMARY/DATA', data=values)
+        f['/PRIMARY'].attrs['acquisition'] = 5
+
+    return path, values
+
+
+@pytest.fixture
+def read_count(monkeypatch):
+    reads = []
+    original_getitem = HDF5DatasetSlicer.__getitem__
+
+    def getitem(self, item):
+        reads.append(item)
+        return original_getitem(self, item)
+
+    monkeypatch.setattr(HDF5DatasetSlicer, '__getitem__', getitem)
+    return reads
+
+
+def test_lazy_dld_load_matches_eager_load(dld_file, read_count):
+    path, values = dld_file
+
+    eager = SToFDLDEndstation().load({'file': path})
+    lazy = SToFDLDEndstation().load({'file': path}, lazy=True)
+
+    assert hasattr(lazy.raw.data, 'dask')
+    assert not read_count
+    assert lazy.raw.attrs['acquisition'] == 5
+    assert np.array_equal(lazy.raw.values, eager.raw.values)
+    assert np.array_equal(eager.raw.values, values[:, ::-1])
+
+    # no file handles are left open
+    with h5py.File(path, 'a'):
+        pass
+
+
+def test_lazy_selection_reads_only_needed_chunks(dld_file, read_count):
+    path, values = dld_file
+
+    arr = lazy_hdf5_dataset(path, '/PRIMARY/DATA', chunk_bytes=64 * 1024)
+    assert arr.numblocks[0] > 4
+
+    roi = arr[10:20, 100:200].compute()
+    assert np.array_equal(roi, values[10:20, 100:200])
+    assert len(read_count) == 1
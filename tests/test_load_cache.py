@@ -0,0 +1,84 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import arpes.config
+from arpes.endstations import load_scan
+from arpes.endstations.cache import clear_load_cache
+
+TEST_FILE = Path(__file__).parent / 'resources' / 'datasets' / 'basic' / 'data' / 'main_chamber_cut_0.fits'
+
+
+@pytest.fixture
+def load_cache(sandbox_configuration, tmpdir):
+    original = dict(arpes.config.SETTINGS['load_cache'])
+    arpes.config.override_settings({'load_cache': {'enabled': True, 'path': str(tmpdir.join('loads'))}})
+    yield Path(str(tmpdir.join('loads')))
+    clear_load_cache()
+    arpes.config.SETTINGS['load_cache'] = original
+
+
+def counting_loads(monkeypatch):
+    from arpes.endstations import FITSEndstation
+
+    calls = []
+    original_load = FITSEndstation.load
+
+    def load(self, *args, **kwargs):
+        calls.append(args)
+        return original_load(self, *args, **kwargs)
+
+    monkeypatch.setattr(FITSEndstation, 'load', load)
+    return calls
+
+
+def test_load_cache_returns_identical_scans(load_cache, monkeypatch, tmpdir):
+    calls = counting_loads(monkeypatch)
+    data_file = tmpdir.join('cut.fits')
+    data_file.write_binary(TEST_FILE.read_bytes())
+
+    first = load_scan({'file': str(data_file), 'location': 'ALG-MC'})
+    second = load_scan({'file': str(data_file), 'location': 'ALG-MC'})
+
+    assert len(calls) == 1
+    assert len(list(load_cache.glob('*.pickle'))) == 1
+    assert np.array_equal(first.spectrum.values, second.spectrum.values)
+    assert first.spectrum.attrs.keys() == second.spectrum.attrs.keys()
+
+    load_scan({'file': str(data_file), 'location': 'ALG-MC'}, cache=False)
+    assert len(calls) == 2
+
+    # modifying the file invalidates the entry
+    stat = os.stat(str(data_file))
+    os.utime(str(data_file), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    load_scan({'file': str(data_file), 'location': 'ALG-MC'})
+    assert len(calls) == 3
+
+
+def test_load_cache_evicts_least_recently_used(load_cache, monkeypatch, tmpdir):
+    calls = counting_loads(monkeypatch)
+    files = []
+    for i in range(3):
+        data_file = tmpdir.join('cut_{}.fits'.format(i))
+        data_file.write_binary(TEST_FILE.read_bytes())
+        files.append(str(data_file))
+        load_scan({'file': files[-1], 'location': 'ALG-MC'})
+
+    entry_size = max(p.stat().st_size for p in load_cache.glob('*.pickle'))
+    arpes.config.override_settings({'load_cache': {'max_bytes': 2 * entry_size}})
+
+    load_scan({'file': files[0], 'location': 'ALG-MC'})
+    assert len(calls) == 3
+
+    data_file = tmpdir.join('cut_3.fits')
+    data_file.write_binary(TEST_FILE.read_bytes())
+    load_scan({'file': str(data_file), 'location': 'ALG-MC'})
+    assert len(list(load_cache.glob('*.pickle'))) == 2
+
+    load_scan({'file': files[0], 'location': 'ALG-MC'})
+    assert len(calls) == 4
+
+    load_scan({'file': files[1], 'location': 'ALG-MC'})
+    assert len(calls) == 5
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+import scipy.interpolate
+
+import arpes.xarray_extensions # pylint: disable=unused-import
+import xarray as xr
+from arpes.utilities.conversion import build_conversion_plan, convert_to_kspace
+from arpes.utilities.conversion.plan import ConversionPlan
+
+
+def synthetic_map(scan_angle=None):
+    rng = np.random.RandomState(0)
+    coords = {'eV': np.linspace(-0.5, 0.1, 30), 'phi': np.linspace(-0.2, 0.25, 40)}
+    angles = {'alpha': 0., 'psi': 0., 'beta': 0., 'theta': 0., 'chi': 0., 'hv': 21.2}
+
+    if scan_angle is not None:
+        coords[scan_angle] = np.linspace(-0.1, 0.1, 20)
+        del angles[scan_angle]
+
+    arr = xr.DataArray(rng.normal(size=[len(v) for v in coords.values()]), coords, list(coords.keys()),
+                       attrs={'hv': 21.2})
+    return arr.assign_coords(**angles)
+
+
+def test_conversion_plan_matches_grid_interpolator():
+    rng = np.random.RandomState(0)
+
+    # include a descending axis and a length one axis, as these are handled specially
+    coords = {'a': np.linspace(0, 1, 7), 'b': np.linspace(3, -2, 9), 'c': np.array([5.])}
+    arr = xr.DataArray(rng.normal(size=(7, 9, 1)), coords, ['a', 'b', 'c'])
+
+    n_points = 500
+    source_points = [rng.uniform(-0.2, 1.2, n_points), rng.uniform(-2.5, 3.5, n_points), np.full(n_points, 5.)]
+    source_points[0][3] = np.nan
+    source_points[2][5:10] = 5.1  # off the length one axis
+
+    plan = ConversionPlan.for_array(arr, ['t'], {'t': np.arange(n_points)}, source_points)
+
+    # scipy's handling of length one axes differs between releases, so the reference interpolates in the
+    # other two dimensions and is broadcast along the length one axis
+    interpolator = scipy.interpolate.RegularGridInterpolator(
+        [coords['a'], coords['b'][::-1]], np.flip(arr.values[:, :, 0], 1),
+        bounds_error=False, fill_value=float('nan'))
+
+    expected = interpolator(np.array(source_points[:2]).T)
+    expected[source_points[2] != 5.] = np.nan
+    converted = plan.apply(arr)
+
+    assert np.isnan(converted[5:10]).all()
+    assert np.array_equal(np.isnan(converted), np.isnan(expected))
+    assert converted[~np.isnan(converted)] == pytest.approx(expected[~np.isnan(expected)])
+
+
+def test_conversion_plan_rejects_incompatible_arrays():
+    arr = xr.DataArray(np.zeros((3, 4)), {'a': np.arange(3.), 'b': np.arange(4.)}, ['a', 'b'])
+    plan = ConversionPlan.for_array(arr, ['t'], {'t': np.arange(2)}, [np.zeros(2), np.zeros(2)])
+
+    with pytest.raises(ValueError):
+        plan.apply(arr.transpose('b', 'a'))
+
+
+@pytest.mark.parametrize('scan_angle', [None, 'beta'])
+def test_chunked_conversion_is_exact(scan_angle):
+    arr = synthetic_map(scan_angle)
+
+    converted = convert_to_kspace(arr)
+    chunked = convert_to_kspace(arr, memory_budget=2e5)
+
+    assert np.array_equal(np.isnan(converted.values), np.isnan(chunked.values))
+    assert np.array_equal(converted.values[~np.isnan(converted.values)], chunked.values[~np.isnan(chunked.values)])
+
+
+def test_cached_plan_conversion():
+    arr = synthetic_map('beta')
+
+    converted = convert_to_kspace(arr)
+    planned = convert_to_kspace(arr, cache_plan=True)
+    planned_again = convert_to_kspace(arr * 2, cache_plan=True)
+
+    assert np.allclose(converted.values, planned.values, equal_nan=True)
+    assert np.allclose(2 * converted.values, planned_again.values, equal_nan=True)
+
+
+def test_plans_are_checked_against_the_geometry_of_spectra():
+    arr = synthetic_map('beta')
+    plan = build_conversion_plan(arr)
+    converted = convert_to_kspace(arr)
+
+    assert np.allclose(2 * converted.values, convert_to_kspace(arr * 2, plan=plan).values, equal_nan=True)
+
+    # the same target grid, but a different offset
+    shifted = arr.copy()
+    shifted.attrs['phi_offset'] = 0.05
+    with pytest.raises(ValueError):
+        convert_to_kspace(shifted, plan=plan, coords={d: converted.coords[d].values for d in plan.target_dims})
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parallel_conversion_is_exact(executor):
+    arr = synthetic_map('beta')
+
+    converted = convert_to_kspace(arr)
+    parallel = convert_to_kspace(arr, n_workers=2, executor=executor)
+
+    assert np.array_equal(np.isnan(converted.values), np.isnan(parallel.values))
+    assert np.array_equal(converted.values[~np.isnan(converted.values)], parallel.values[~np.isnan(parallel.values)])
+
+
+def test_separable_cut_conversion_matches_grid_interpolation(monkeypatch):
+    import arpes.utilities.conversion.core
+
+    cut = synthetic_map()
+    arr = xr.concat([cut * (i + 1) for i in range(3)], 'delay').assign_coords(delay=[0., 1., 2.])
+    arr = arr.transpose('delay', 'eV', 'phi')
+    arr.attrs = cut.attrs
+
+    converted = convert_to_kspace(arr)
+    monkeypatch.setattr(arpes.utilities.conversion.core, '_is_separable', lambda *args: False)
+    interpolated = convert_to_kspace(arr)
+
+    assert converted.dims == interpolated.dims == ('eV', 'kp', 'delay')
+    assert np.allclose(converted.values, interpolated.values, equal_nan=True)
+
+
+def test_photon_energy_map_conversion():
+    import arpes.constants
+    from arpes.utilities.conversion.kz_conversion import ConvertKxKyKz
+
+    rng = np.random.RandomState(0)
+    coords = {'eV': np.linspace(-0.5, 0.1, 12), 'hv': np.linspace(50, 80, 16),
+              'phi': np.linspace(-0.2, 0.25, 30), 'beta': np.linspace(-0.1, 0.1, 14)}
+    arr = xr.DataArray(rng.normal(size=(12, 16, 30, 14)), coords, list(coords.keys()))
+    arr = arr.assign_coords(alpha=0., psi=0., theta=0., chi=0.)
+
+    # invert a forward conversion at a single point
+    binding_energy, hv, phi, beta = -0.1, 60., 0.1, 0.05
+    kinetic_energy = hv - arr.S.work_function + binding_energy
+    k_tot = arpes.constants.K_INV_ANGSTROM * np.sqrt(kinetic_energy)
+    kx, ky = k_tot * np.sin(phi), -k_tot * np.cos(phi) * np.sin(beta)
+    kz = np.sqrt(arpes.constants.K_INV_ANGSTROM ** 2 * (kinetic_energy + arr.S.inner_potential) - kx ** 2 - ky ** 2)
+
+    converter = ConvertKxKyKz(arr, ['eV', 'kx', 'ky', 'kz'])
+    assert converter.kspace_to_hv(binding_energy, kx, ky, kz) == pytest.approx(hv, rel=1e-3)
+    assert converter.kspace_to_phi(binding_energy, kx, ky, kz) == pytest.approx(phi, rel=1e-3)
+    assert converter.kspace_to_perp_angle(binding_energy, kx, ky, kz) == pytest.approx(beta, rel=1e-3)
+
+    resolution = {'kx': 0.04, 'ky': 0.04, 'kz': 0.04}
+    converted = convert_to_kspace(arr, resolution=resolution)
+    chunked = convert_to_kspace(arr, resolution=resolution, memory_budget=1e6)
+    assert converted.dims == ('eV', 'kx', 'ky', 'kz')
+    assert np.isfinite(converted.values).any()
+    assert np.allclose(converted.values, chunked.values, equal_nan=True)
@@ -0,0 +1,94 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+import arpes.config
+import arpes.io
+import xarray as xr
+from arpes.pipeline import compose, pipeline, run_pipeline
+from arpes.utilities.normalize import normalize_to_spectrum
+
+
+@pipeline('add_one')
+def add_one(arr: xr.DataArray):
+    return xr.DataArray(arr.values + 1, arr.coords, arr.dims, attrs=arr.attrs)
+
+
+@pipeline('double')
+def double(arr: xr.DataArray):
+    if arr.values.sum() < 0:
+        raise ValueError('negative scan')
+
+    return xr.DataArray(arr.values * 2, arr.coords, arr.dims, attrs=arr.attrs)
+
+
+@pytest.fixture
+def interned_scans(tmpdir, monkeypatch):
+    monkeypatch.setattr(arpes.config, 'RECORD_DATABASE', str(tmpdir.join('records.sqlite')))
+    monkeypatch.setattr(arpes.io, 'DATASET_CACHE_PATH', str(tmpdir))
+
+    scans = []
+    for i in range(4):
+        scan = xr.DataArray(np.arange(5.) + i, {'eV': np.linspace(-1, 0, 5)}, ['eV'],
+                            attrs={'id': str(uuid.uuid1()), 'spectrum_type': 'cut'})
+        arpes.io.save_dataset(scan)
+        scans.append(scan)
+
+    return scans
+
+
+@pytest.mark.parametrize('executor', ['process', 'thread', None])
+def test_batches_run_every_scan_and_resume(interned_scans, executor):
+    ids = [s.attrs['id'] for s in interned_scans]
+    runs = run_pipeline(compose(add_one, double), ids, n_workers=2, executor=executor)
+
+    assert list(runs.stage) == ['add_one', 'double'] * 4
+    assert list(runs.scan) == [i for i in ids for _ in range(2)]
+    assert runs.error.isnull().all() and not runs.cached.any()
+
+    for scan, result in zip(interned_scans, runs.result[1::2]):
+        assert result not in ids
+        assert np.array_equal(normalize_to_spectrum(result).values, (scan.values + 1) * 2)
+
+    arpes.io.delete_dataset(runs.result.iloc[-1])
+    resumed = run_pipeline(compose(add_one, double), ids, n_workers=2, executor=executor)
+    assert list(resumed.cached) == [True] * 7 + [False]
+    assert list(resumed.result) == list(runs.result)
+
+
+def test_failing_scans_are_reported(interned_scans):
+    negative = interned_scans[0].copy()
+    negative.values[:] = -10
+    negative.attrs['id'] = str(uuid.uuid1())
+    arpes.io.save_dataset(negative)
+
+    runs = run_pipeline(compose(add_one, double), [negative.attrs['id'], interned_scans[1].attrs['id']],
+                        executor=None)
+    assert list(runs.stage) == ['add_one', 'double', 'add_one', 'double']
+    assert 'negative scan' in runs.error.iloc[1]
+    assert runs.result.iloc[1] is None and runs.error.iloc[3] is None
+
+
+@pipeline('unchanged')
+def unchanged(arr: xr.DataArray):
+    return arr
+
+
+def test_unchanged_scans_are_not_copied(interned_scans, tmpdir):
+    ids = [s.attrs['id'] for s in interned_scans]
+    files = set(os.listdir(str(tmpdir)))
+
+    runs = run_pipeline(compose(unchanged, add_one), ids, executor=None)
+    assert list(runs.result[::2]) == ids
+    assert len(set(os.listdir(str(tmpdir))) - files) == len(ids)
+
+    # an array which differs from the interned scan of the same id is interned as a result
+    modified = interned_scans[0].copy(deep=True)
+    modified.values[:] = -1
+    assert unchanged(modified, verbose=False).attrs['id'] != ids[0]
+
+    # flushing the cached result of an unchanged scan keeps the scan
+    unchanged(ids[1], verbose=False, flush=True)
+    assert arpes.io.dataset_exists(ids[1])
@@ -0,0 +1,193 @@
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import arpes.config
+import arpes.io
+import arpes.utilities
+import xarray as xr
+from arpes.pipeline import data_fingerprint, evict_pipeline_results, pipeline, result_id
+from arpes.records import records
+
+SCALE = 2
+
+
+def scale_by(arr, factor):
+    return arr * factor
+
+
+@pytest.fixture
+def cache(tmpdir, monkeypatch):
+    monkeypatch.setattr(arpes.config, 'RECORD_DATABASE', str(tmpdir.join('records.sqlite')))
+    monkeypatch.setattr(arpes.io, 'DATASET_CACHE_PATH', str(tmpdir))
+    return tmpdir
+
+
+def make_scan(offset=0.):
+    return xr.DataArray(np.arange(5.) + offset, {'eV': np.linspace(-1, 0, 5)}, ['eV'],
+                        attrs={'id': str(uuid.uuid1()), 'spectrum_type': 'cut'})
+
+
+def test_keys_follow_the_contents_of_data(cache):
+    @pipeline('shift')
+    def shift(arr, amount=1):
+        return arr + amount
+
+    scan = make_scan()
+    same = scan.copy(deep=True)
+    same.attrs['id'] = str(uuid.uuid1())
+
+    assert shift.cache_key(scan) == shift.cache_key(same)
+    assert shift.cache_key(scan) != shift.cache_key(make_scan(1.))
+    assert shift.cache_key(scan) != shift.cache_key(scan, amount=2)
+    assert shift.cache_key(scan, 1) != shift.cache_key(scan, 2)
+
+    arpes.io.save_dataset(scan)
+    assert data_fingerprint(scan.attrs['id']) == data_fingerprint(scan)
+
+    filename = str(cache.join(scan.attrs['id'] + '.nc'))
+    stat = os.stat(filename)
+    assert records().fingerprint(filename, stat.st_size, stat.st_mtime_ns) == data_fingerprint(scan)
+
+
+def test_keys_follow_the_code_of_stages(cache):
+    def stage(factor):
+        @pipeline('scale')
+        def scale(arr):
+            return scale_by(arr, factor)
+
+        return scale
+
+    scan = make_scan()
+    assert stage(2).cache_key(scan) == stage(2).cache_key(scan)
+    assert stage(2).cache_key(scan) != stage(3).cache_key(scan)
+
+    @pipeline('scale')
+    def scale_constant(arr):
+        return scale_by(arr, SCALE)
+
+    @pipeline('scale')
+    def scale_constant_plus_one(arr):
+        return scale_by(arr, SCALE) + 1
+
+    assert scale_constant.cache_key(scan) != scale_constant_plus_one.cache_key(scan)
+
+    def configured(params):
+        @pipeline('configured')
+        def stage(arr):
+            return arr * params['factor']
+
+        return stage
+
+    params = {'factor': 2}
+    key = configured(params).cache_key(scan)
+    params['factor'] = 3
+    assert configured(params).cache_key(scan) != key
+
+
+def test_unchanged_stages_are_cached(cache):
+    calls = []
+
+    @pipeline('shift', unhashed_names=('calls',))
+    def shift(arr):
+        calls.append(arr)
+        return arr + 1
+
+    scan = make_scan()
+    arpes.io.save_dataset(scan)
+
+    result, cached = shift.run(scan.attrs['id'], verbose=False)
+    assert not cached and result.attrs['id'] == result_id(shift.cache_key(scan))
+
+    assert shift(scan, verbose=False) == result.attrs['id']
+    assert shift.run(scan.attrs['id'], verbose=False) == (result.attrs['id'], True)
+    assert len(calls) == 1
+
+    # the result is fingerprinted as it was computed, so that later stages find the same keys from its id
+    assert data_fingerprint(result.attrs['id']) == data_fingerprint(result)
+
+
+def test_results_are_evicted_by_age_and_size(cache):
+    @pipeline('shift')
+    def shift(arr):
+        return arr + 1
+
+    scans = [make_scan(i) for i in range(3)]
+    results = [shift(scan, verbose=False) for scan in scans]
+    keys = [shift.cache_key(scan) for scan in scans]
+    sizes = {r.key: r.size for r in records().pipeline_results()}
+    assert all(sizes[k] > 0 for k in keys)
+
+    # using the first result makes the second the least recently used
+    time.sleep(0.01)
+    assert shift.run(scans[0], verbose=False)[1]
+
+    assert evict_pipeline_results(max_bytes=sizes[keys[0]] + sizes[keys[2]]) == [keys[1]]
+    assert not arpes.io.dataset_exists(results[1].attrs['id'])
+    assert not arpes.io.available_datasets().get(results[1].attrs['id'])
+    assert arpes.io.dataset_exists(results[0].attrs['id'])
+
+    assert evict_pipeline_results(max_age=0) == [keys[2], keys[0]]
+    assert records().pipeline_results() == []
+
+
+def test_results_are_evicted_when_recorded(cache, monkeypatch):
+    monkeypatch.setitem(arpes.config.SETTINGS, 'pipeline_cache', {'max_bytes': 1, 'max_age': None})
+
+    @pipeline('shift')
+    def shift(arr):
+        return arr + 1
+
+    first, second = make_scan(), make_scan(1.)
+    shift(first, verbose=False)
+    shift(second, verbose=False)
+
+    assert [r.key for r in records().pipeline_results()] == [shift.cache_key(second)]
+
+
+def test_keys_of_times_empty_arrays_and_frames(cache):
+    @pipeline('select')
+    def select(arr, rows=None, times=None):
+        return arr
+
+    scan = make_scan()
+    times = np.array(['2020-01-01', '2020-01-02'], dtype='datetime64[ns]')
+    assert select.cache_key(scan, times=times) != select.cache_key(scan, times=times + np.timedelta64(1, 's'))
+    assert select.cache_key(scan, times=np.zeros((0, 3))) != select.cache_key(scan, times=np.zeros((3, 0)))
+
+    # the reprs of large frames are truncated, and would be the same for both of these
+    rows = pd.DataFrame({'x': np.arange(1000.)})
+    changed = rows.copy()
+    changed.loc[500, 'x'] = -1
+    assert repr(rows) == repr(changed)
+    assert select.cache_key(scan, rows=rows) == select.cache_key(scan, rows=rows.copy())
+    assert select.cache_key(scan, rows=rows) != select.cache_key(scan, rows=changed)
+    assert select.cache_key(scan, rows=rows['x']) != select.cache_key(scan, rows=changed['x'])
+
+    with pytest.warns(UserWarning):
+        select.cache_key(scan, rows=(i for i in range(3)))
+
+
+def test_keys_of_workspace_scans_follow_their_raw_files(cache, monkeypatch):
+    @pipeline('shift')
+    def shift(arr):
+        return arr + 1
+
+    scan = make_scan()
+    raw = cache.join('scan_1.fits')
+    raw.write('first export')
+    monkeypatch.setattr(arpes.utilities, 'default_dataset', lambda *args, **kwargs: pd.DataFrame({
+        'id': [scan.attrs['id']], 'path': [str(raw)],
+    }))
+
+    prepared_key = shift.cache_key(scan.attrs['id'])
+    arpes.io.save_dataset(scan)
+    key = shift.cache_key(scan.attrs['id'])
+    assert key != prepared_key and shift.cache_key(scan.attrs['id']) == key
+
+    raw.write('reprocessed export')
+    assert shift.cache_key(scan.attrs['id']) != key
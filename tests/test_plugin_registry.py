@@ -0,0 +1,50 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import arpes.config # pylint: disable=unused-import
+from arpes.endstations.plugin import PLUGIN_MANIFEST
+
+PLUGIN_DIRECTORY = Path(arpes.config.SOURCE_ROOT) / 'endstations' / 'plugin'
+PLUGIN_MODULES = sorted(os.path.splitext(p.name)[0] for p in PLUGIN_DIRECTORY.glob('*.py') if p.name != '__init__.py')
+
+
+def test_manifest_matches_plugins():
+    listed = {(entry.module, entry.endstation) for entry in PLUGIN_MANIFEST}
+
+    for module_name in PLUGIN_MODULES:
+        module = importlib.import_module('arpes.endstations.plugin.{}'.format(module_name))
+        for item in module.__all__:
+            assert (module_name, item) in listed
+
+    for entry in PLUGIN_MANIFEST:
+        endstation_cls = getattr(importlib.import_module('arpes.endstations.plugin.{}'.format(entry.module)),
+                                 entry.endstation)
+        assert set(entry.names) <= {endstation_cls.PRINCIPAL_NAME} | set(endstation_cls.ALIASES)
+        assert set(entry.extensions) == endstation_cls._TOLERATED_EXTENSIONS
+
+
+def test_importing_arpes_defers_plugins_and_plotting():
+    script = """
+import json, sys
+import arpes.config
+import arpes.xarray_extensions
+before = set(sys.modules)
+
+from arpes.endstations import endstation_from_alias
+endstation_cls = endstation_from_alias('BL4')
+print(json.dumps([sorted(before), sorted(set(sys.modules) - before), endstation_cls.__name__]))
+"""
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', script], stderr=subprocess.DEVNULL,
+                                     cwd=str(Path(arpes.config.SOURCE_ROOT).parent))
+    before, imported, name = json.loads(output.decode().strip().splitlines()[-1])
+
+    assert name == 'BL403ARPESEndstation'
+    for module in ['matplotlib.pyplot', 'arpes.plotting', 'lmfit', 'pint', 'astropy']:
+        assert module not in before
+
+    assert not any(m.startswith('arpes.endstations.plugin.') for m in before)
+    assert [m for m in imported if m.startswith('arpes.endstations.plugin.')] == ['arpes.endstations.plugin.merlin']
@@ -0,0 +1,84 @@
+import json
+import multiprocessing
+
+import arpes.config
+import arpes.io
+from arpes.pipeline import pipeline
+from arpes.records import RecordStore, records
+
+
+def add_records(path, worker):
+    store = RecordStore(path)
+    for i in range(25):
+        store.add_dataset('{}-{}'.format(worker, i), {'file': 'f', 'sample': 'worker-{}'.format(worker)})
+        store.set_pipeline_result('count', worker)
+
+
+def test_dataset_records_are_indexed_by_whitelisted_attributes(tmpdir):
+    store = RecordStore(str(tmpdir.join('records.sqlite')))
+
+    assert store.add_dataset('a', {'file': 'a.nc', 'sample': 'S1', 'scan_mode': 'cut'})
+    assert store.add_dataset('b', {'file': 'b.nc', 'sample': 'S1', 'scan_mode': 'map'})
+    assert store.add_dataset('c', {'file': 'c.nc', 'sample': 'S2', 'scan_mode': 'map'})
+    assert not store.add_dataset('a', {'file': 'other.nc'})
+
+    assert store.has_dataset('a') and not store.has_dataset('d')
+    assert store.dataset('a') == {'file': 'a.nc', 'sample': 'S1', 'scan_mode': 'cut'}
+    assert sorted(store.datasets()) == ['a', 'b', 'c']
+    assert sorted(store.datasets(sample='S1')) == ['a', 'b']
+    assert sorted(store.datasets(sample='S1', scan_mode='map')) == ['b']
+
+    store.remove_datasets(['a', 'c'])
+    assert sorted(store.datasets()) == ['b']
+    assert store.datasets(scan_mode='cut') == {}
+
+
+def test_concurrent_writers_keep_every_record(tmpdir):
+    path = str(tmpdir.join('records.sqlite'))
+    RecordStore(path)
+
+    workers = [multiprocessing.Process(target=add_records, args=(path, w)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    store = RecordStore(path)
+    assert len(store.datasets()) == 100
+    assert len(store.datasets(sample='worker-2')) == 25
+    assert store.pipeline_result('count') in range(4)
+
+
+def test_json_records_are_migrated(tmpdir, monkeypatch):
+    tmpdir.join('cache.json').write(json.dumps({'a': {'file': 'a.nc', 'sample': 'S1'}}))
+    tmpdir.join('pipeline.shelf.json').write(json.dumps({'key': 'a'}))
+    monkeypatch.setattr(arpes.config, 'DATASET_CACHE_RECORD', str(tmpdir.join('cache.json')))
+    monkeypatch.setattr(arpes.config, 'PIPELINE_JSON_SHELF', str(tmpdir.join('pipeline.shelf.json')))
+    monkeypatch.setattr(arpes.config, 'RECORD_DATABASE', str(tmpdir.join('records.sqlite')))
+
+    store = records()
+    assert store.datasets(sample='S1') == {'a': {'file': 'a.nc', 'sample': 'S1'}}
+    assert store.pipeline_result('key') == 'a'
+
+    store.remove_datasets(['a'])
+    store.migrate(arpes.config.DATASET_CACHE_RECORD)
+    assert store.datasets() == {}
+
+
+def test_pipeline_results_are_cached(tmpdir, monkeypatch):
+    monkeypatch.setattr(arpes.config, 'RECORD_DATABASE', str(tmpdir.join('records.sqlite')))
+    monkeypatch.setattr(arpes.io, 'DATASET_CACHE_PATH', str(tmpdir))
+    calls = []
+
+    @pipeline('length', unhashed_names=('calls',))
+    def length(data):
+        calls.append(data)
+        return str(len(data))
+
+    assert length('abc', verbose=False) == '3'
+    assert length('abc', verbose=False) == '3'
+    assert length('abc', verbose=False, force=True) == '3'
+    assert calls == ['abc', 'abc']
+
+    length('abc', verbose=False, flush=True)
+    assert records().pipeline_result(length.cache_key('abc')) is None
@@ -0,0 +1,37 @@
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+import arpes.config # pylint: disable=unused-import
+import xarray as xr
+from arpes.utilities.shared_arrays import map_with_shared_dataarrays
+
+
+def summed_row(shared, row):
+    return row, float(shared['arr'].values[row].sum()), shared['missing'] is None
+
+
+@pytest.fixture
+def temporary_directory(tmpdir, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmpdir))
+    return tmpdir
+
+
+def test_shared_arrays_are_deleted_after_every_task(temporary_directory):
+    arr = xr.DataArray(np.arange(20.).reshape(4, 5), {'x': np.arange(4), 'y': np.arange(5)}, ['x', 'y'])
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        results = sorted(map_with_shared_dataarrays(pool, summed_row, {'arr': arr, 'missing': None},
+                                                    [(row,) for row in range(4)]))
+        assert results == [(row, float(arr.values[row].sum()), True) for row in range(4)]
+        assert temporary_directory.listdir() == []
+
+        # stopping early waits for the remaining tasks before deleting the arrays
+        rows = map_with_shared_dataarrays(pool, summed_row, {'arr': arr, 'missing': None},
+                                          [(row % 4,) for row in range(32)])
+        next(rows)
+        rows.close()
+        assert temporary_directory.listdir() == []
+
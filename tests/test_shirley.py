@@ -0,0 +1,89 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import arpes.config # pylint: disable=unused-import
+import xarray as xr
+from arpes.analysis.shirley import (calculate_shirley_background, calculate_shirley_background_full_range,
+                                    remove_shirley_background)
+
+
+def synthetic_xps_map():
+    rng = np.random.RandomState(0)
+    eV = np.linspace(-10, 0, 200)
+    centers = np.linspace(-6, -4, 6).reshape(2, 3)
+
+    peaks = 100 / (1 + ((eV - centers[..., None]) / 0.3) ** 2)
+    steps = 20 * (1 + np.tanh(-(eV - centers[..., None]) / 0.5))
+    values = peaks + steps + 5 + rng.normal(0, 0.5, peaks.shape)
+
+    return xr.DataArray(values.transpose(0, 2, 1), {'x': np.arange(2), 'eV': eV, 'y': np.arange(3)},
+                        ['x', 'eV', 'y'])
+
+
+def reference_shirley_background(edc, eps=1e-7, max_iters=50, n_samples=5):
+    """
+    The direct, one spectrum at a time form of the iteration.
+    """
+    values = edc.values
+    i_left, i_right = np.mean(values[:n_samples]), np.mean(values[-n_samples:])
+    background = values.copy()
+
+    for _ in range(max_iters):
+        total_background = np.sum(background)
+        new_background = np.array([
+            i_right + (i_left - i_right) * (
+                (np.sum(values) - np.sum(values[:i + 1]) - (total_background - np.sum(background[:i + 1]))) /
+                (np.sum(values) - total_background + 1e-5))
+            for i in range(len(values))
+        ])
+
+        rel_error = np.abs(np.sum(new_background) - total_background) / total_background
+        background = new_background
+        if rel_error < eps:
+            break
+
+    return background
+
+
+def test_shirley_backgrounds_of_maps_match_single_spectra():
+    data = synthetic_xps_map()
+
+    background = calculate_shirley_background_full_range(data)
+    assert background.dims == data.dims
+
+    for x in range(2):
+        for y in range(3):
+            edc = data.isel(x=x, y=y)
+            assert np.allclose(background.isel(x=x, y=y).values, reference_shirley_background(edc))
+            assert np.allclose(calculate_shirley_background_full_range(edc).values,
+                               background.isel(x=x, y=y).values)
+
+
+def test_limited_range_shirley_background_of_maps():
+    data = synthetic_xps_map()
+
+    background = calculate_shirley_background(data, slice(-8, -2))
+    in_range = calculate_shirley_background_full_range(data.sel(eV=slice(-8, -2)))
+
+    assert np.allclose(background.sel(eV=slice(-8, -2)).values, in_range.values)
+    assert np.allclose(background.sel(eV=slice(None, -8.1)).values,
+                       in_range.isel(eV=slice(0, 1)).values)
+
+    corrected = remove_shirley_background(data.isel(x=0, y=0))
+    assert np.allclose(corrected.values, data.isel(x=0, y=0).values - calculate_shirley_background(
+        data.isel(x=0, y=0)).values)
+
+
+def test_shirley_convergence_is_tracked_per_spectrum():
+    data = synthetic_xps_map()
+
+    with pytest.warns(UserWarning, match='for 6 of 6 spectra'):
+        calculate_shirley_background_full_range(data, max_iters=1)
+
+    with warnings.catch_warnings(record=True) as record:
+        warnings.simplefilter('always')
+        calculate_shirley_background_full_range(data)
+
+    assert not [w for w in record if 'converge' in str(w.message)]
@@ -1,6 +1,10 @@
+import numpy as np
+import pandas as pd
 import pytest
 
-from arpes.utilities import default_dataset
+import arpes.config
+import arpes.utilities.dataset
+from arpes.utilities import clean_xlsx_dataset, clear_dataset_tables, default_dataset
 
 
 def test_multiple_spreadsheets_throws_assertion_error(sandbox_configuration):
@@ -66,3 +70,79 @@ def test_normalize_and_complete_data(sandbox_configuration):
     assert (list(df['hv']) == [5.93] + [4.2] * 5)
 
     assert(sorted(list(df.columns)) == ['hv', 'id', 'location', 'path'])
+
+
+def write_spreadsheet(path, descriptions):
+    pd.DataFrame({
+        'file': list(range(1, len(descriptions) + 1)),
+        'location': ['BL4'] + [np.nan] * (len(descriptions) - 1),
+        'description': descriptions,
+    }).to_excel(str(path), index=False)
+
+
+def test_spreadsheets_are_cleaned_once_and_updated_by_row(sandbox_configuration, tmpdir, monkeypatch):
+    inferred, reads = [], []
+    read = arpes.utilities.dataset.safe_read
+    monkeypatch.setattr(arpes.utilities.dataset, 'safe_read', lambda *args, **kwargs: reads.append(1) or read(
+        *args, **kwargs))
+    data = tmpdir.mkdir('data')
+    for i in range(1, 6):
+        data.join('scan_{}.fits'.format(i)).write('')
+
+    monkeypatch.setattr(arpes.utilities.dataset, 'infer_data_path', lambda file, scan_desc, *args: inferred.append(
+        file) or str(data.join('scan_{}.fits'.format(file))))
+
+    path = tmpdir.join('scans.xlsx')
+    write_spreadsheet(path, ['a', 'b', 'c', 'd'])
+
+    for _ in range(20):
+        df = clean_xlsx_dataset(str(path), write=False)
+
+    assert len(reads) == 1
+    assert sorted(inferred) == [1, 2, 3, 4]
+    assert list(df['location']) == ['BL4'] * 4
+    assert list(df['path']) == [str(data.join('scan_{}.fits'.format(i))) for i in range(1, 5)]
+
+    write_spreadsheet(path, ['a', 'b', 'changed', 'd', 'e'])
+    updated = clean_xlsx_dataset(str(path), write=False)
+
+    assert len(reads) == 2
+    assert sorted(inferred) == [1, 2, 3, 3, 4, 5]
+    assert list(updated['id']) == list(df['id']) + [df['id'].iloc[0]]
+
+    clear_dataset_tables()
+    assert clean_xlsx_dataset(str(path), write=False).equals(updated)
+    assert len(reads) == 2
+
+
+def test_spreadsheets_are_cleaned_again_when_data_moves(sandbox_configuration, tmpdir, monkeypatch):
+    inferred, reads = [], []
+    read = arpes.utilities.dataset.safe_read
+    monkeypatch.setattr(arpes.utilities.dataset, 'safe_read', lambda *args, **kwargs: reads.append(1) or read(
+        *args, **kwargs))
+
+    def infer_data_path(file, scan_desc, *args):
+        inferred.append(file)
+        return str(tmpdir.join(str(arpes.config.DATA_PATH), 'scan_{}.fits'.format(file)))
+
+    monkeypatch.setattr(arpes.utilities.dataset, 'infer_data_path', infer_data_path)
+    for root in ['old', 'new']:
+        for i in range(1, 4):
+            tmpdir.join(root, 'scan_{}.fits'.format(i)).write('', ensure=True)
+
+    monkeypatch.setattr(arpes.config, 'DATA_PATH', 'old')
+    path = tmpdir.join('scans.xlsx')
+    write_spreadsheet(path, ['a', 'b', 'c'])
+    clean_xlsx_dataset(str(path), write=False)
+
+    # the data root is part of the key of cleaned tables
+    monkeypatch.setattr(arpes.config, 'DATA_PATH', 'new')
+    df = clean_xlsx_dataset(str(path), write=False)
+    assert list(df['path']) == [str(tmpdir.join('new', 'scan_{}.fits'.format(i))) for i in range(1, 4)]
+    assert sorted(inferred) == [1, 1, 2, 2, 3, 3]
+
+    # moved files are looked up again, files which are still in place are not
+    tmpdir.join('new', 'scan_3.fits').remove()
+    clean_xlsx_dataset(str(path), write=False)
+    assert sorted(inferred) == [1, 1, 2, 2, 3, 3, 3]
+    assert len(reads) == 3
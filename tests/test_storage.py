@@ -0,0 +1,55 @@
+import uuid
+
+import netCDF4
+import numpy as np
+
+import arpes.config
+import arpes.io
+import xarray as xr
+from arpes.storage import interned_chunks, open_interned
+
+
+def synthetic_map():
+    rng = np.random.RandomState(0)
+    coords = {'x': np.linspace(-1, 1, 12), 'y': np.linspace(-1, 1, 10), 'phi': np.linspace(-0.2, 0.2, 64),
+              'eV': np.linspace(-0.5, 0.1, 120)}
+    return xr.DataArray(rng.poisson(10, (12, 10, 64, 120)).astype(np.float32), coords, ['x', 'y', 'phi', 'eV'],
+                        attrs={'id': str(uuid.uuid1()), 'spectrum_type': 'map', 'sample': 'S1', 'hv': 5.93})
+
+
+def test_chunks_follow_natural_axes():
+    assert interned_chunks(['phi', 'eV'], [100, 50], 8) == [100, 50]
+    assert interned_chunks(['cycle', 'phi', 'eV'], [20, 100, 50], 8) == [1, 100, 50]
+
+    chunks = interned_chunks(['x', 'y', 'phi', 'eV'], [100, 100, 500, 300], 4, chunk_bytes=1024 ** 2)
+    assert 4 * np.prod(chunks) <= 1024 ** 2
+    assert chunks[3] == 10 and chunks[2] > chunks[0]
+
+    assert interned_chunks(['delay', 'eV'], [10, 4], 8, chunk_bytes=1) == [1, 1]
+
+
+def test_interned_datasets_are_chunked_compressed_and_lazy(tmpdir, monkeypatch):
+    monkeypatch.setattr(arpes.config, 'RECORD_DATABASE', str(tmpdir.join('records.sqlite')))
+    monkeypatch.setattr(arpes.io, 'DATASET_CACHE_PATH', str(tmpdir))
+
+    data = synthetic_map()
+    arpes.io.save_dataset(data)
+    filename = str(tmpdir.join(data.attrs['id'] + '.nc'))
+
+    with netCDF4.Dataset(filename) as f:
+        variable = f.variables['__xarray_dataarray_variable__']
+        assert variable.filters()['zlib']
+        assert variable.chunking() == interned_chunks(list(data.dims), data.shape, 4)
+        assert variable.getncattr('sample') == 'S1'
+
+    assert not tmpdir.join(data.attrs['id'] + '.nc.attrs.json').exists()
+    attrs = arpes.io.load_dataset_attrs(data.attrs['id'])
+    assert attrs['sample'] == 'S1' and attrs['hv'] == 5.93
+
+    loaded = arpes.io.load_dataset(data.attrs['id'])['__xarray_dataarray_variable__']
+    assert not isinstance(loaded.variable._data, np.ndarray)
+    region = loaded.sel(eV=slice(-0.1, 0))
+    assert np.array_equal(region.values, data.sel(eV=slice(-0.1, 0)).values)
+
+    with open_interned(filename) as opened:
+        assert np.array_equal(opened['__xarray_dataarray_variable__'].values, data.values)
@@ -0,0 +1,54 @@
+import itertools
+
+import numpy as np
+
+import arpes.config # pylint: disable=unused-import
+import xarray as xr
+from arpes.utilities.summed_area import SummedAreaTables
+
+
+def synthetic_volume(shape, with_nans=False):
+    rng = np.random.RandomState(0)
+    names = ['x', 'y', 'phi', 'eV'][-len(shape):]
+    values = rng.rand(*shape) * 1000
+    if with_nans:
+        values[rng.rand(*shape) < 0.2] = np.nan
+
+    return xr.DataArray(values, {name: np.linspace(-1, 1, n) for name, n in zip(names, shape)}, names)
+
+
+def check_windows(tables, data, axes):
+    for starts in itertools.product(*[range(0, data.shape[a], 3) for a in axes]):
+        for widths in itertools.product(*[(1, 2, 5) for _ in axes]):
+            windows = {a: slice(s, min(s + w, data.shape[a])) for a, s, w in zip(axes, starts, widths)}
+            dims = [data.dims[a] for a in axes]
+
+            expected = data.isel(**{data.dims[a]: w for a, w in windows.items()}).mean(dims)
+            binned = tables.binned_mean(windows)
+            assert binned.dims == expected.dims
+            assert np.allclose(binned.values, expected.values, equal_nan=True)
+            for d in binned.dims:
+                assert np.array_equal(binned.coords[d].values, expected.coords[d].values)
+
+
+def test_binned_means_match_direct_means():
+    for shape, with_nans in [((7, 8, 9), False), ((4, 5, 6, 7), False), ((7, 8, 9), True)]:
+        data = synthetic_volume(shape, with_nans)
+        tables = SummedAreaTables(data)
+
+        for n_axes in [1, 2]:
+            for axes in itertools.combinations(range(len(shape)), n_axes):
+                check_windows(tables, data, axes)
+
+
+def test_summed_area_tables_stay_within_budget():
+    data = synthetic_volume((10, 11, 12))
+    tables = SummedAreaTables(data, max_bytes=SummedAreaTables(data).table_bytes([0]) * 2)
+
+    tables.prepare([[0], [1], [2]])
+    assert sum(tables.table_bytes(k) for k in tables._tables) <= tables.max_bytes
+    assert list(tables._tables) == [(1,), (2,)]
+
+    tables = SummedAreaTables(data, max_bytes=tables.table_bytes([0]))
+    assert tables.table([0, 1, 2]) is None
+    check_windows(tables, data, [0, 1, 2])
@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+import arpes.config # pylint: disable=unused-import
+import arpes.constants
+import xarray as xr
+from arpes.preparation.tof_preparation import convert_to_kinetic_energy
+
+
+def reference_kinetic_energy_rebinning(values, timing, kinetic_energy_axis):
+    """
+    Rebins one time spectrum, one energy bin at a time.
+    """
+    spectrometer = arpes.constants.SPECTROMETER_SPIN_TOF
+    c = 0.5 * 9.11e6 * spectrometer['mstar'] * (spectrometer['length'] ** 2) / 1.6
+    d_energy = kinetic_energy_axis[1] - kinetic_energy_axis[0]
+    t_min, t_max = np.min(timing), np.max(timing)
+
+    rebinned = np.zeros(len(kinetic_energy_axis))
+    for i, energy in enumerate(kinetic_energy_axis):
+        t_L = min(math.sqrt(c / (energy + d_energy / 2)), t_max)
+        t_S = max(math.sqrt(c / (energy - d_energy / 2)), t_min)
+        t_L_idx, t_S_idx = np.searchsorted(timing, t_L), np.searchsorted(timing, t_S)
+
+        rebinned[i] = np.sum(values[t_L_idx:t_S_idx]) + (timing[t_L_idx] - t_L) * values[t_L_idx] + \
+            ((t_S - timing[t_S_idx - 1]) * values[t_S_idx - 1]) / d_energy
+
+    return rebinned
+
+
+def synthetic_tof_volume():
+    rng = np.random.RandomState(0)
+    timing = np.linspace(600, 1500, 900)
+    values = rng.poisson(5, (4, 900, 3)) * rng.uniform(0.5, 1.5, (4, 900, 3))
+    return xr.DataArray(values, {'x': np.arange(4.), 'time': timing, 'delay': np.arange(3.)},
+                        ['x', 'time', 'delay'], attrs={'spectrometer_name': 'SToF'})
+
+
+@pytest.mark.parametrize('chunk_bytes', [None, 1, 8 * 900 * 3])
+def test_kinetic_energy_rebinning_matches_per_bin_rebinning(chunk_bytes):
+    data = synthetic_tof_volume()
+    kinetic_energy_axis = np.linspace(0.5, 8, 400)
+
+    rebinned = convert_to_kinetic_energy(data, kinetic_energy_axis, chunk_bytes=chunk_bytes)
+    assert rebinned.dims == ('eV', 'x', 'delay')
+    assert np.array_equal(rebinned.coords['eV'].values, kinetic_energy_axis)
+
+    for x in range(4):
+        for delay in range(3):
+            expected = reference_kinetic_energy_rebinning(data.isel(x=x, delay=delay).values,
+                                                          data.coords['time'].values, kinetic_energy_axis)
+            assert np.allclose(rebinned.isel(x=x, delay=delay).values, expected)
+
+
+def test_kinetic_energy_rebinning_requires_positive_energies():
+    with pytest.raises(ValueError):
+        convert_to_kinetic_energy(synthetic_tof_volume(), np.linspace(0, 8, 400))